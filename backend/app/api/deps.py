@@ -1,7 +1,7 @@
 from typing import Generator, Optional
 
-from fastapi import Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
+from fastapi import Depends, Header, HTTPException, Request, Response, status
+from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import jwt
 from pydantic import ValidationError
 from sqlalchemy.orm import Session
@@ -9,7 +9,8 @@ from sqlalchemy.orm import Session
 from app import crud, models, schemas
 from app.core import security
 from app.core.config import settings
-from app.database import SessionLocal
+from app.core.ratelimit import login_failure_limiter, login_ip_limiter
+from app.database import SessionLocal, use_replica
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl="/api/v1/login/token"
@@ -22,6 +23,11 @@ def get_db() -> Generator:
     finally:
         db.close()
 
+def get_read_db(db: Session = Depends(get_db)) -> Session:
+    """The request's session, reading from a replica if any are configured (for read-only endpoints)."""
+    use_replica(db)
+    return db
+
 def get_current_user(
     db: Session = Depends(get_db), token: str = Depends(reusable_oauth2)
 ) -> models.User:
@@ -42,6 +48,44 @@ def get_current_user(
         raise credentials_exception
 
     user = crud.get_user_by_username(db, username=token_data.username)
-    if user is None:
+    if user is None or user.is_active is False: # Deactivation also ends existing sessions
         raise credentials_exception
     return user
+
+
+# --- Optimistic Concurrency ---
+# Single-row responses carry the row version as a strong ETag ("3"); a client sends it back
+# in If-Match so the update or delete only applies if nobody changed the row meanwhile.
+def if_match_version(if_match: Optional[str] = Header(None)) -> Optional[int]:
+    """Row version from an If-Match header, or None (unconditional) if absent or '*'."""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    value = if_match.strip().removeprefix("W/").strip('"')
+    if not value.isdigit():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='If-Match must be the ETag of the row version, e.g. "3".')
+    return int(value)
+
+def set_etag(response: Response, version: int):
+    response.headers["ETag"] = f'"{version}"'
+
+def version_conflict(error: crud.VersionConflictError, schema) -> HTTPException:
+    """409 carrying the row as currently stored (null if it was deleted), so clients can merge without refetching."""
+    current = schema.model_validate(error.current).model_dump(mode="json") if error.current is not None else None
+    headers = {"ETag": f'"{error.current.version}"'} if error.current is not None else None
+    return HTTPException(status_code=status.HTTP_409_CONFLICT, detail={"message": str(error), "current": current}, headers=headers)
+
+
+# --- Rate Limits ---
+def rate_limit_login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()) -> str:
+    """
+    Limits login attempts per client IP, and failed attempts per username from that IP, before
+    any bcrypt work is done. Returns the key to pass to `record_login_failure` if the password is wrong.
+    """
+    client_ip = request.client.host if request.client else "unknown"
+    login_ip_limiter.check(client_ip)
+    failure_key = f"{form_data.username.lower()}|{client_ip}"
+    login_failure_limiter.check(failure_key, spend=False)
+    return failure_key
+
+def record_login_failure(failure_key: str):
+    login_failure_limiter.check(failure_key)
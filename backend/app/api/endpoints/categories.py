@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from app import crud, models, schemas
+from app import crud, models, schemas, serializers
 from app.api import deps
+from app.core.config import settings
+from app.core.responses import FastJSONResponse
 
 router = APIRouter()
 
@@ -13,14 +15,11 @@ def get_shopping_list_for_check_access(
     db: Session = Depends(deps.get_db),
     current_user: models.User = Depends(deps.get_current_user)
 ) -> int:
-    """Dependency to get list and verify user access."""
+    """Dependency to verify user access to the list."""
+    # Membership rows only exist for existing lists, so no separate (eager loading) list fetch is needed
     if not crud.check_user_list_access(db=db, list_id=list_id, user_id=current_user.id):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to access this list")
-    db_list = crud.get_shopping_list(db, list_id=list_id) # Fetch list object if needed later, or just return list_id
-    if db_list is None: # Should not happen if check_user_list_access passed, but safety check
-         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="List not found")
-    # return db_list # Return the list object if needed by the endpoint
-    return list_id # Or just return the validated list_id
+    return list_id # Return the validated list_id
 
 
 # --- Category Routes (Now require list_id) ---
@@ -48,19 +47,23 @@ def create_category_for_list(
 
 @router.get("/", response_model=schemas.CategoryListResponse)
 def read_categories_for_list(
+    db: Session = Depends(deps.get_read_db), # First, so the access check reads the replica too
     list_id: int = Depends(get_shopping_list_for_check_access), # Use dependency
-    db: Session = Depends(deps.get_db)
     # current_user: models.User = Depends(deps.get_current_user) # Not needed if dependency handles access
 ):
     """
     Retrieve all categories for a specific list. User must be a member.
     """
-    categories = crud.get_categories_for_list(db, list_id=list_id)
-    return {"categories": categories}
+    rows = crud.get_category_rows_for_list(db, list_id=list_id) # Column-projected, untracked
+    response = {"categories": [serializers.category_row_to_dict(row) for row in rows]}
+    if settings.FAST_JSON_ENABLED:
+        return FastJSONResponse(response)
+    return response
 
 @router.get("/{category_id}", response_model=schemas.Category)
 def read_category(
     category_id: int,
+    response: Response,
     list_id: int = Depends(get_shopping_list_for_check_access), # Ensure user can access parent list
     db: Session = Depends(deps.get_db)
     # current_user: models.User = Depends(deps.get_current_user) # Not needed
@@ -71,47 +74,59 @@ def read_category(
     db_category = crud.get_category(db, category_id=category_id)
     if db_category is None or db_category.list_id != list_id:
         raise HTTPException(status_code=404, detail="Category not found in this list")
+    deps.set_etag(response, db_category.version)
     return db_category
 
 @router.put("/{category_id}", response_model=schemas.Category)
 def update_category(
     category_id: int,
     category_in: schemas.CategoryUpdate,
+    response: Response,
     list_id: int = Depends(get_shopping_list_for_check_access), # Check access to list
+    expected_version: Optional[int] = Depends(deps.if_match_version),
     db: Session = Depends(deps.get_db),
     current_user: models.User = Depends(deps.get_current_user) # Needed for updater ID
 ):
     """
     Update a category's name. User must have access to the list.
+    With `If-Match: "<version>"` it only applies if the category is unchanged (else 409).
     """
     db_category = crud.get_category(db, category_id=category_id)
     if db_category is None or db_category.list_id != list_id:
         raise HTTPException(status_code=404, detail="Category not found in this list")
     try:
-        return crud.update_category(
+        updated_category = crud.update_category(
             db=db,
             db_category=db_category,
             category_update=category_in,
-            user_id=current_user.id
+            user_id=current_user.id,
+            expected_version=expected_version
         )
+    except crud.VersionConflictError as e:
+        raise deps.version_conflict(e, schemas.Category)
     except ValueError as e: # Catches unique name error
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    deps.set_etag(response, updated_category.version)
+    return updated_category
 
 @router.delete("/{category_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_category(
     category_id: int,
     list_id: int = Depends(get_shopping_list_for_check_access), # Check access to list
+    expected_version: Optional[int] = Depends(deps.if_match_version),
     db: Session = Depends(deps.get_db)
     # current_user: models.User = Depends(deps.get_current_user) # Not strictly needed for delete access check
 ):
     """
-    Delete a category if it's empty. User must have access to the list.
+    Delete a category if it's empty. User must have access to the list. Honors If-Match.
     """
     db_category = crud.get_category(db, category_id=category_id)
     if db_category is None or db_category.list_id != list_id:
         raise HTTPException(status_code=404, detail="Category not found in this list")
     try:
-        crud.delete_category(db, db_category=db_category)
+        crud.delete_category(db, db_category=db_category, expected_version=expected_version)
         return None # 204 response
+    except crud.VersionConflictError as e:
+        raise deps.version_conflict(e, schemas.Category)
     except ValueError as e: # Catches "cannot delete with items" error
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
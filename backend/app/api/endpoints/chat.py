@@ -1,23 +1,50 @@
 import asyncio
 import json
+import logging
+import time
+from functools import lru_cache
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from openai import AsyncOpenAI
 from typing import Optional
 
 from app import schemas, models
 from app.api import deps
-from app import crud
 from app.core.config import settings
+from app.core import metrics
+from app.core.ratelimit import chat_concurrency, chat_limiter
 # Import tools and executor from the correct file
-from .chat_tools import tools, execute_function_call
+from .chat_tools import READ_ONLY_TOOLS, TOOL_SETS, execute_function_call, select_tools
+from .chat_cache import cache_key, chat_response_cache
+from .chat_intents import try_fast_path
+from .chat_context import list_summary_cache
 
 router = APIRouter()
-
-client = AsyncOpenAI(
-    api_key=settings.OPENROUTER_API_KEY,
-    base_url=settings.OPENROUTER_BASE_URL,
-) if settings.OPENROUTER_API_KEY else None
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=1)
+def get_chat_client():
+    """
+    Creates the LLM client on first use. Importing openai is the largest single
+    cost of importing the app, so it is deferred until a chat request needs it.
+    """
+    if not settings.OPENROUTER_API_KEY:
+        return None
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(
+        api_key=settings.OPENROUTER_API_KEY,
+        base_url=settings.OPENROUTER_BASE_URL,
+    )
+
+async def create_chat_completion(**kwargs):
+    """Calls the LLM provider and records latency and token usage."""
+    start = time.perf_counter()
+    response = await get_chat_client().chat.completions.create(model=settings.CHAT_MODEL, **kwargs)
+    metrics.chat_llm_request_duration_seconds.observe(time.perf_counter() - start, model=settings.CHAT_MODEL)
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        metrics.chat_llm_tokens_total.inc(usage.prompt_tokens or 0, model=settings.CHAT_MODEL, kind="prompt")
+        metrics.chat_llm_tokens_total.inc(usage.completion_tokens or 0, model=settings.CHAT_MODEL, kind="completion")
+    return response
 
 @router.post("/", response_model=schemas.ChatResponse)
 async def handle_chat(
@@ -25,69 +52,95 @@ async def handle_chat(
     db: Session = Depends(deps.get_db),
     current_user: models.User = Depends(deps.get_current_user)
 ):
-    if not client:
+    # Per-user cap on concurrent chats; extra requests queue briefly, then get a 429
+    async with chat_concurrency.slot(current_user.id):
+        return await process_chat(request, db, current_user)
+
+async def process_chat(request: schemas.ChatRequest, db: Session, current_user: models.User) -> schemas.ChatResponse:
+    if not get_chat_client():
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="Chat service is not configured."
         )
 
-    list_id_context = request.list_id
-    list_name_context = "the current list"
-    category_list_str = "No list specified."
-
-    # Check access and get context if list_id is provided
-    if list_id_context:
-        if not crud.check_user_list_access(db, list_id=list_id_context, user_id=current_user.id):
-             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to access the specified list for chat.")
-        # Get list details for the prompt
-        db_list = crud.get_shopping_list(db, list_id=list_id_context)
-        if db_list:
-            list_name_context = f"the list '{db_list.name}' (ID: {list_id_context})"
-            categories = crud.get_categories_for_list(db, list_id=list_id_context)
-            category_list_str = "\n".join([f"- {cat.name} (ID: {cat.id})" for cat in categories]) if categories else "No categories in this list yet."
-        else:
-             # Should not happen due to access check, but safety
-             list_name_context = f"the specified list (ID: {list_id_context}, but not found)"
-             category_list_str = "Specified list not found."
+    list_id_context = request.list_id # Optional: the list the user has open, used when a tool call names none
+
+    # One membership/version query per turn; lists and categories are reloaded only after a change
+    summary = list_summary_cache.get(db, current_user.id)
+    if list_id_context is not None and list_id_context not in summary.lists:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to access the specified list for chat.")
+
+    # Repeated read-only questions about unchanged lists are answered without calling the provider
+    response_cache_key = cache_key(
+        current_user.id, list_id_context, summary.version_key,
+        [msg.model_dump() for msg in request.messages],
+    )
+    cached_content = chat_response_cache.get(response_cache_key)
+    if cached_content is not None:
+        return schemas.ChatResponse(message=schemas.ChatMessageOutput(role="assistant", content=cached_content))
+    # Simple single-action commands ("add milk", "tick eggs") on the open list are executed without the LLM
+    last_message = request.messages[-1] if request.messages else None
+    if settings.CHAT_FAST_PATH_ENABLED and list_id_context is not None and last_message is not None and last_message.role == "user":
+        fast_path = try_fast_path(db, current_user, list_id_context, last_message.content)
+        if fast_path is not None:
+            return schemas.ChatResponse(message=schemas.ChatMessageOutput(role="assistant", content=fast_path.reply))
+
+    # Only turns that reach the LLM count against the chat rate limit
+    chat_limiter.check(str(current_user.id))
+
+    if list_id_context is not None:
+        current_list = summary.lists[list_id_context]
+        list_name_context = f"The user has the list '{current_list.name}' (ID: {list_id_context}) open; it is the default target of every function."
     else:
-        # No list context - AI should probably ask which list to use
-        # Or we disallow chat without a list_id context for now
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Please specify a 'list_id' in the chat request to provide context."
-        )
+        list_name_context = "No list is open: pass the target list to every function, and ask the user if it's unclear which one they mean."
 
 
     messages = [msg.model_dump() for msg in request.messages]
     system_message = f"""You are a helpful grocery list assistant for {current_user.username}.
-You are currently working with {list_name_context}.
-Use the provided functions to manage items and categories within this list.
-Current available categories in this list:
-{category_list_str}
+{list_name_context}
+Use the provided functions to manage items and categories. Every function takes an optional 'list' argument (list name or ID) to work on any of the user's lists.
+The user's lists and their categories (* marks the open list):
+{summary.prompt(list_id_context)}
 
 When adding items, if a suitable category isn't present, create it automatically unless the user specifies otherwise or the item type is ambiguous.
 When updating or deleting items/categories, refer to them by name if possible, but use the ID if the name is ambiguous or if the function requires it. Always confirm the item ID before updating if there's ambiguity.
-Inform the user about the success or failure of operations, mentioning item/category names and the list context.
+Inform the user about the success or failure of operations, mentioning item/category names and the list they are in.
 """
 
     messages.insert(0, {"role": "system", "content": system_message})
 
+    # Send only the tools this turn plausibly needs (fewer input tokens per call)
+    user_messages = [msg for msg in request.messages if msg.role == "user"]
+    assistant_messages = [msg for msg in request.messages if msg.role == "assistant"]
+    tool_set = select_tools(
+        user_messages[-1].content if user_messages else "",
+        assistant_messages[-1].content if assistant_messages else None,
+    )
+    tools = TOOL_SETS[tool_set]
+    logger.debug("Chat tool set selected", extra={"tool_set": tool_set, "tools": len(tools)})
+
     try:
-        response = await client.chat.completions.create(
-            model=settings.CHAT_MODEL,
+        response = await create_chat_completion(
             messages=messages,
             tools=tools,
             tool_choice="auto",
         )
         response_message = response.choices[0].message
         tool_calls = response_message.tool_calls
+        tool_rounds = 0
+        tools_used = set()
 
         while tool_calls:
+            if tool_rounds >= settings.CHAT_MAX_TOOL_ROUNDS:
+                logger.warning("Chat stopped after %d tool rounds", tool_rounds, extra={"list_id": list_id_context, "user_id": current_user.id})
+                break
+            tool_rounds += 1
+            tools_used.update(tool_call.function.name for tool_call in tool_calls)
             messages.append(response_message.model_dump(exclude_unset=True))
 
-            # Execute tool calls, passing the list_id context
+            # Execute tool calls on their target lists (the open list by default)
             function_responses = await asyncio.gather(
-                *[execute_function_call(tool_call, db, current_user, list_id_context) for tool_call in tool_calls]
+                *[execute_function_call(tool_call, db, current_user, list_id_context, summary) for tool_call in tool_calls]
             )
 
             for tool_call, function_response in zip(tool_calls, function_responses):
@@ -99,8 +152,7 @@ Inform the user about the success or failure of operations, mentioning item/cate
                 })
 
             # Get next response from AI
-            response = await client.chat.completions.create(
-                model=settings.CHAT_MODEL,
+            response = await create_chat_completion(
                 messages=messages,
                 tools=tools, # Provide tools again
             )
@@ -109,7 +161,12 @@ Inform the user about the success or failure of operations, mentioning item/cate
 
         # Final response from the assistant
         final_content = response_message.content
-        if not final_content and response.choices[0].finish_reason == 'tool_calls':
+        if final_content and not tool_calls and tools_used <= READ_ONLY_TOOLS:
+            chat_response_cache.set(response_cache_key, final_content)
+        if tool_calls:
+            # Tool round limit reached with calls still pending
+            final_content = "I've made some changes but stopped before finishing. Please check the list and ask again if something is missing."
+        elif not final_content and response.choices[0].finish_reason == 'tool_calls':
             # If the last action was just tool calls, provide a generic confirmation
              final_content = "OK, I've updated the list based on your request."
 
@@ -121,8 +178,7 @@ Inform the user about the success or failure of operations, mentioning item/cate
         )
 
     except Exception as e:
-        print(f"Chat Processing Error: {e}") # Log the error server-side
-        # Consider logging traceback: import traceback; traceback.print_exc()
+        logger.exception("Chat processing error", extra={"list_id": list_id_context, "user_id": current_user.id})
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"An error occurred during chat processing: {str(e)}"
@@ -0,0 +1,52 @@
+import hashlib
+import json
+import re
+from typing import List, Optional
+
+from app.core.cache import Cache
+from app.core.config import settings
+
+_NON_WORD = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(text: str) -> str:
+    """Case, punctuation and whitespace insensitive form of a message ("What's left?" == "whats left")."""
+    return _SPACES.sub(" ", _NON_WORD.sub("", (text or "").lower())).strip()
+
+def cache_key(user_id: int, list_id: Optional[int], lists_version: str, messages: List[dict]) -> Optional[str]:
+    """
+    Key for the last CHAT_CACHE_TAIL_MESSAGES messages of a conversation about the user's
+    lists at a given version (`UserListSummary.version_key`, which changes whenever any of
+    them does). The user is part of the key since replies address them by name.
+    Returns None when the conversation doesn't end with a user message.
+    """
+    if not messages or messages[-1]["role"] != "user":
+        return None
+    tail = [(m["role"], normalize(m["content"])) for m in messages[-settings.CHAT_CACHE_TAIL_MESSAGES:]]
+    raw = json.dumps([user_id, list_id, lists_version, tail], separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ChatResponseCache:
+    """
+    Assistant replies with a TTL, shared by the workers if a cache backend is configured.
+    Entries never need explicit invalidation: a mutation bumps a list version, so later
+    lookups use a different key and stale entries simply age out.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self._cache = Cache("chat_response", ttl, max_entries)
+
+    def get(self, key: Optional[str]) -> Optional[str]:
+        if key is None or not settings.CHAT_CACHE_ENABLED:
+            return None
+        return self._cache.get(key)
+
+    def set(self, key: Optional[str], content: str):
+        if key is None or not settings.CHAT_CACHE_ENABLED:
+            return
+        self._cache.set(key, content)
+
+
+chat_response_cache = ChatResponseCache(settings.CHAT_CACHE_MAX_ENTRIES, settings.CHAT_CACHE_TTL)
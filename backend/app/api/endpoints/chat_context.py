@@ -0,0 +1,111 @@
+import hashlib
+import json
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.core.cache import LIST_SUMMARIES, Cache
+from app.core.config import settings
+
+
+@dataclass
+class ListOutline:
+    id: int
+    name: str
+    list_type: str
+    categories: List[Tuple[int, str]] = field(default_factory=list) # (id, name)
+
+@dataclass
+class UserListSummary:
+    """Every list a user is a member of, with category names; the chat's multi-list context."""
+    fingerprint: Tuple[Tuple[int, int], ...] # ((list_id, version), ...) the summary was built from
+    lists: Dict[int, ListOutline]
+
+    @property
+    def version_key(self) -> str:
+        """Short stable digest of the fingerprint, for cache keys that depend on all of the user's lists."""
+        return hashlib.sha1(repr(self.fingerprint).encode("ascii")).hexdigest()[:16]
+
+    def resolve(self, target, default_list_id: Optional[int] = None) -> Tuple[Optional[int], Optional[str]]:
+        """
+        Resolves a tool call's list target (ID or name, case-insensitive) against the user's
+        memberships. Returns (list_id, None) or (None, error message for the model).
+        """
+        if target is None or str(target).strip() == "":
+            if default_list_id is not None:
+                return default_list_id, None
+            return None, f"Error: Specify which list to use (the 'list' argument). The user's lists: {self.names()}."
+        target = str(target).strip()
+        if target.isdigit() and int(target) in self.lists:
+            return int(target), None
+        matches = [outline.id for outline in self.lists.values() if outline.name.lower() == target.lower()]
+        if not matches: # "costco" for "Costco run"
+            matches = [outline.id for outline in self.lists.values() if target.lower() in outline.name.lower()]
+        if len(matches) == 1:
+            return matches[0], None
+        if matches:
+            return None, f"Error: '{target}' matches several lists; use the list ID. Candidates: {self.names(matches)}."
+        return None, f"Error: No list named '{target}' that the user can access. The user's lists: {self.names()}."
+
+    def names(self, list_ids=None) -> str:
+        ids = list_ids if list_ids is not None else self.lists
+        return ", ".join(f"'{self.lists[i].name}' (ID {i})" for i in ids) or "none"
+
+    def prompt(self, current_list_id: Optional[int] = None) -> str:
+        if not self.lists:
+            return "The user has no lists yet."
+        lines = []
+        for outline in self.lists.values():
+            marker = "*" if outline.id == current_list_id else "-"
+            categories = ", ".join(name for _, name in outline.categories) or "no categories yet"
+            lines.append(f"{marker} {outline.name} (ID {outline.id}, {outline.list_type}): {categories}")
+        return "\n".join(lines)
+
+
+def build_summary(db: Session, fingerprint: tuple) -> UserListSummary:
+    list_rows, category_rows = crud.get_list_outline_rows(db, [list_id for list_id, _ in fingerprint])
+    lists = {list_id: ListOutline(list_id, name, list_type) for list_id, name, list_type in list_rows}
+    for list_id, category_id, name in category_rows:
+        lists[list_id].categories.append((category_id, name))
+    return UserListSummary(fingerprint=fingerprint, lists=lists)
+
+
+def _dumps(summary: UserListSummary) -> str:
+    return json.dumps({
+        "fingerprint": summary.fingerprint,
+        "lists": [[o.id, o.name, o.list_type, o.categories] for o in summary.lists.values()],
+    }, separators=(",", ":"))
+
+def _loads(data: str) -> UserListSummary:
+    raw = json.loads(data)
+    lists = {
+        list_id: ListOutline(list_id, name, list_type, [tuple(category) for category in categories])
+        for list_id, name, list_type, categories in raw["lists"]
+    }
+    return UserListSummary(fingerprint=tuple(tuple(pair) for pair in raw["fingerprint"]), lists=lists)
+
+
+class UserListSummaryCache:
+    """
+    `UserListSummary` by user, shared by the workers if a cache backend is configured. Each
+    lookup runs one small query for the (list_id, version) pairs of the user's memberships;
+    the summary is rebuilt only when that changes, i.e. after joining/leaving a list or any
+    crud mutation bumping a list version. Membership changes also invalidate the entry.
+    """
+
+    def __init__(self, max_users: int, ttl: float):
+        self._cache = Cache(LIST_SUMMARIES, ttl, max_users, dumps=_dumps, loads=_loads)
+
+    def get(self, db: Session, user_id: int) -> UserListSummary:
+        fingerprint = tuple((list_id, version or 0) for list_id, version in crud.get_list_version_rows_for_user(db, user_id))
+        summary = self._cache.get(user_id)
+        if summary is not None and summary.fingerprint == fingerprint:
+            return summary
+        summary = build_summary(db, fingerprint)
+        self._cache.set(user_id, summary)
+        return summary
+
+
+list_summary_cache = UserListSummaryCache(settings.CHAT_SUMMARY_CACHE_USERS, settings.CHAT_SUMMARY_CACHE_TTL)
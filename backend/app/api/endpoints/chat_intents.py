@@ -0,0 +1,139 @@
+import logging
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app import crud, models
+from app.core.metrics import Counter
+from .chat_tools import run_tool
+
+logger = logging.getLogger(__name__)
+
+chat_fast_path_total = Counter(
+    "chat_fast_path_total", "Chat messages by fast-path outcome: the intent handled locally, or 'llm' when deferred.", ("intent",))
+
+# --- Command Grammar ---
+# Deliberately narrow: anything that doesn't match exactly one simple, single-item command
+# goes to the LLM. A false negative costs an LLM call; a false positive edits the wrong thing.
+_POLITE = r"(?:(?:please|pls|can you|could you)\s+)?"
+_ADD = re.compile(_POLITE + r"(?:add|put)\s+(?P<name>.+?)(?:\s+(?:to|in|into|under)\s+(?:the\s+)?(?P<category>.+?)(?:\s+category)?)?", re.I)
+_TICK = re.compile(_POLITE + r"(?:(?:tick|check|cross)(?:\s+off)?\s+(?P<name>.+?)(?:\s+off)?|mark\s+(?P<marked>.+?)\s+as\s+(?:done|bought|ticked|checked))", re.I)
+_UNTICK = re.compile(_POLITE + r"(?:(?:untick|uncheck)\s+(?P<name>.+?)|mark\s+(?P<marked>.+?)\s+as\s+(?:not\s+done|not\s+bought|unticked|unchecked))", re.I)
+_REMOVE = re.compile(_POLITE + r"(?:remove|delete)\s+(?P<name>.+?)", re.I)
+# "... to my shopping list" adds nothing when a list is already selected
+_LIST_SUFFIX = re.compile(r"\s+(?:to|on|onto|from|off|in)\s+(?:the|my|our)\s+(?:shopping\s+|grocery\s+)?list$", re.I)
+# Trailing courtesy words carry no meaning ("remove milk please", "add eggs too")
+_TRAILING = re.compile(r"(?:,?\s+(?:please|pls|thanks|thank you|too|as well))+$", re.I)
+# Several items, quantities spelled as clauses, references to earlier messages ("add it"),
+# questions ("check if we have milk") etc. are left to the LLM
+_UNCERTAIN = re.compile(
+    r"\b(?:and|or|then|also|but|all|every|everything|list|category"
+    r"|it|them|that|this|these|those|some|more|any|another|one"
+    r"|if|whether|do|does|did|we|us|our|i|you|have|got|what|which|how)\b|[,;?&%_*]", re.I)
+MAX_NAME_WORDS = 4
+
+
+@dataclass
+class Command:
+    intent: str # 'add', 'tick', 'untick' or 'remove'
+    name: str
+    category: Optional[str] = None
+
+@dataclass
+class FastPathResult:
+    intent: str
+    reply: str # Templated answer shown to the user
+
+
+def _clean(text: str) -> str:
+    text = re.sub(r"\s+", " ", text).strip().rstrip(".!")
+    text = _TRAILING.sub("", text)
+    return _LIST_SUFFIX.sub("", text).strip()
+
+def _valid_name(name: Optional[str]) -> bool:
+    # Names need a letter; punctuation-only names ("%", "...") go to the LLM
+    return (bool(name) and len(name.split()) <= MAX_NAME_WORDS and not _UNCERTAIN.search(name)
+            and any(c.isalpha() for c in name))
+
+def parse_command(text: str) -> Optional[Command]:
+    """Parses a single-action command ("add milk", "tick eggs", "remove bread"), or None if unsure."""
+    text = _clean(text or "")
+    if not text:
+        return None
+    for intent, pattern in (("untick", _UNTICK), ("tick", _TICK), ("remove", _REMOVE), ("add", _ADD)):
+        match = pattern.fullmatch(text)
+        if match is None:
+            continue
+        groups = match.groupdict()
+        name = (groups.get("name") or groups.get("marked") or "").strip(" '\"")
+        category = (groups.get("category") or "").strip(" '\"") or None
+        if not _valid_name(name) or (category is not None and not _valid_name(category)):
+            return None
+        if intent == "add" and any(c.isdigit() for c in name):
+            return None # Quantities ("2 litres of milk") are split into name and note by the LLM
+        return Command(intent=intent, name=name, category=category)
+    return None
+
+
+def _find_category(db: Session, list_id: int, name: str) -> Optional[models.Category]:
+    name = name.lower()
+    for category in crud.get_categories_for_list(db, list_id=list_id):
+        if category.name.lower() == name:
+            return category
+    return None
+
+def try_fast_path(db: Session, current_user: models.User, list_id: int, text: str) -> Optional[FastPathResult]:
+    """
+    Executes `text` directly through the chat tools when it is an unambiguous command
+    about something that exists in the list. Returns None to defer to the LLM.
+    """
+    command = parse_command(text)
+    if command is None:
+        chat_fast_path_total.inc(intent="llm")
+        return None
+
+    item = crud.find_item_by_name_in_list(db, list_id=list_id, item_name=command.name)
+    if command.intent == "add":
+        if item is not None:
+            # Re-adding something already on the list puts it back rather than duplicating it
+            if not item.is_ticked:
+                return _done("add", f"{item.name} is already on the list.")
+            function, arguments = "untick_item", {"name": item.name}
+            reply = f"Put {item.name} back on the list."
+        else:
+            if command.category is not None:
+                category = _find_category(db, list_id, command.category)
+            else:
+                categories = crud.get_categories_for_list(db, list_id=list_id)
+                category = categories[0] if len(categories) == 1 else None
+            if category is None:
+                chat_fast_path_total.inc(intent="llm") # Choosing or creating a category needs the LLM
+                return None
+            function, arguments = "add_item", {"name": command.name, "category_name": category.name}
+            reply = f"Added {command.name} to {category.name}."
+    else:
+        if item is None:
+            chat_fast_path_total.inc(intent="llm") # Probably a different spelling or a category; let the LLM resolve it
+            return None
+        function = {"tick": "tick_item", "untick": "untick_item", "remove": "delete_item"}[command.intent]
+        arguments = {"name": item.name}
+        reply = {
+            "tick": f"Ticked off {item.name}.",
+            "untick": f"Put {item.name} back on the list.",
+            "remove": f"Removed {item.name} from the list.",
+        }[command.intent]
+        if command.intent in ("tick", "untick") and item.is_ticked == (command.intent == "tick"):
+            return _done(command.intent, f"{item.name} is already {'ticked off' if item.is_ticked else 'on the list'}.")
+
+    result = run_tool(function, arguments, db, current_user, list_id)
+    if result.startswith("Error"):
+        logger.warning("Fast path %s failed, deferring to the LLM: %s", function, result)
+        chat_fast_path_total.inc(intent="llm")
+        return None
+    return _done(command.intent, reply)
+
+def _done(intent: str, reply: str) -> FastPathResult:
+    chat_fast_path_total.inc(intent=intent)
+    return FastPathResult(intent=intent, reply=reply)
@@ -1,144 +1,49 @@
 import json
+import logging
+import re
+from dataclasses import dataclass
+from typing import Callable, Dict, Tuple
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from app import crud, models, schemas
-import inspect # For debugging argument mismatches
+from app.core.metrics import chat_tool_calls_total
+from app.database import replica_reads
+from .chat_context import UserListSummary
 
-# --- Tool Definitions (Update descriptions slightly) ---
-tools = [
-    {
-        "type": "function",
-        "function": {
-            "name": "list_items",
-            "description": "List grocery items in the current list, optionally filtering by category name. Shows ticked status, category, and item ID.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "category_name": {
-                        "type": "string",
-                        "description": "The name of the category within the current list to filter by.",
-                    }
-                },
-                "required": [],
-            },
-        },
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "add_item",
-            "description": "Add a new item to the current grocery list. Specify item name and category name. If the category doesn't exist in the current list, it will be created. Items are added unticked by default.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "name": {"type": "string", "description": "The name of the item to add."},
-                    "category_name": {"type": "string", "description": "The name of the category for the item (will be created in the current list if needed)."},
-                    "note": {"type": "string", "description": "Optional note for the item."},
-                    "price_match": {"type": "boolean", "description": "Whether to flag the item for price matching.", "default": False}
-                },
-                "required": ["name", "category_name"],
-            },
-        },
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "delete_item",
-            "description": "Delete an item from the current grocery list by its name. Use item ID if name is ambiguous.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "name": {"type": "string", "description": "The name of the item to delete from the current list."},
-                    # Optional: Add ID parameter if needed for disambiguation
-                    # "id": {"type": "integer", "description": "The ID of the item to delete, if name is not unique."}
-                },
-                "required": ["name"],
-            },
-        },
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "update_item",
-            "description": "Update an existing item in the current grocery list, identified by its ID. Allows changing name, category, note, price match, or ticked status.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "id": {"type": "integer", "description": "The ID of the item in the current list to update."},
-                    "name": {"type": "string", "description": "New name for the item."},
-                    "category_name": {"type": "string", "description": "New category name for the item (must exist in the current list)."},
-                    "note": {"type": "string", "description": "New note for the item."},
-                    "price_match": {"type": "boolean", "description": "New price match status."},
-                    "is_ticked": {"type": "boolean", "description": "New ticked status (true/false)."}
-                },
-                "required": ["id"], # ID is mandatory to identify item
-            },
-        },
-    },
-     {
-        "type": "function",
-        "function": {
-            "name": "tick_item",
-            "description": "Mark a specific grocery item in the current list as ticked/acquired by its name. Use ID if ambiguous.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "name": {"type": "string", "description": "The exact name of the item in the current list to mark as ticked."}
-                },
-                "required": ["name"],
-            },
-        },
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "untick_item",
-            "description": "Mark a specific grocery item in the current list as unticked by its name. Use ID if ambiguous.",
-             "parameters": {
-                "type": "object",
-                "properties": {
-                    "name": {"type": "string", "description": "The exact name of the item in the current list to mark as unticked."}
-                },
-                "required": ["name"],
-            },
-        },
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "list_categories",
-            "description": "List all available grocery categories within the current list.",
-            "parameters": {"type": "object", "properties": {}},
-        },
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "add_category",
-            "description": "Add a new category to the current list.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "name": {"type": "string", "description": "The name of the new category for the current list."}
-                },
-                "required": ["name"],
-            },
-        },
-    },
-    {
+logger = logging.getLogger(__name__)
+
+# --- Tool Definitions ---
+# Descriptions are kept short: every schema sent is paid for in input tokens on every LLM call.
+# Every tool takes an optional `list` target, resolved against the user's lists in execute_function_call.
+_LIST = {"type": "string", "description": "List name or ID; default: current list."}
+
+def _tool(name: str, description: str, properties: dict = None, required: tuple = ()) -> dict:
+    return {
         "type": "function",
         "function": {
-            "name": "delete_category",
-            "description": "Delete a category from the current list if it's empty.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "name": {"type": "string", "description": "The name of the category in the current list to delete."}
-                },
-                "required": ["name"],
-            },
+            "name": name,
+            "description": description,
+            "parameters": {"type": "object", "properties": {**(properties or {}), "list": _LIST}, "required": list(required)},
         },
     }
+
+_STRING, _BOOL, _INT = {"type": "string"}, {"type": "boolean"}, {"type": "integer"}
+
+tools = [
+    _tool("list_items", "List items with ticked state, category and ID.",
+          {"category_name": {"type": "string", "description": "Only this category."}}),
+    _tool("add_item", "Add an item. The category is created if missing.",
+          {"name": _STRING, "category_name": _STRING, "note": _STRING, "price_match": _BOOL}, ("name", "category_name")),
+    _tool("delete_item", "Delete an item by name.", {"name": _STRING}, ("name",)),
+    _tool("update_item", "Update an item by ID: name, category (must exist), note, price_match, is_ticked.",
+          {"id": _INT, "name": _STRING, "category_name": _STRING, "note": _STRING, "price_match": _BOOL, "is_ticked": _BOOL}, ("id",)),
+    _tool("tick_item", "Mark an item as bought, by exact name.", {"name": _STRING}, ("name",)),
+    _tool("untick_item", "Mark an item as not bought, by exact name.", {"name": _STRING}, ("name",)),
+    _tool("list_categories", "List categories with IDs."),
+    _tool("add_category", "Add a category.", {"name": _STRING}, ("name",)),
+    _tool("delete_category", "Delete an empty category by name.", {"name": _STRING}, ("name",)),
 ]
+TOOLS_BY_NAME = {tool["function"]["name"]: tool for tool in tools}
 
 
 # --- Tool Implementation Functions (Accept list_id) ---
@@ -187,7 +92,7 @@ def _add_item_impl(db: Session, current_user: models.User, list_id: int, name: s
     # Check if item already exists in this category in this list
     existing_item = db.query(models.Item).filter(
          models.Item.category_id == category.id,
-         models.Item.name.ilike(name) # Case-insensitive check?
+         func.lower(models.Item.name) == name.lower() # Case-insensitive, without LIKE wildcards
     ).first()
     if existing_item:
          return f"Item '{name}' already exists in category '{category.name}' in this list (ID: {existing_item.id})."
@@ -272,10 +177,7 @@ def _update_item_impl(db: Session, current_user: models.User, list_id: int, id:
          return f"Error updating item ID {id}: {str(ve)}"
     except Exception as e:
         db.rollback()
-        # Log the full error for debugging
-        print(f"Unexpected error updating item {id}: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Unexpected error updating item %s", id)
         return f"Unexpected error updating item ID {id}: {str(e)}"
 
 
@@ -337,9 +239,9 @@ def _delete_category_impl(db: Session, list_id: int, name: str):
     if not category:
         return f"Error: Category '{name}' not found in this list."
 
-    # Check for items (using lazy dynamic count)
-    if category.items.count() > 0:
-        item_count = category.items.count() # Get count again if needed for message
+    # Check for items (using lazy dynamic count, once)
+    item_count = category.items.count()
+    if item_count > 0:
         return f"Cannot delete category '{name}' - it still contains {item_count} item(s)."
 
     category_id_deleted = category.id
@@ -354,67 +256,126 @@ def _delete_category_impl(db: Session, list_id: int, name: str):
         db.rollback()
         return f"Error deleting category '{category_name_deleted}': {str(e)}"
 
-available_functions = {
-    "list_items": _list_items_impl,
-    "add_item": _add_item_impl,
-    "delete_item": _delete_item_impl,
-    "update_item": _update_item_impl,
-    "tick_item": _tick_item_impl,
-    "untick_item": _untick_item_impl,
-    "list_categories": _list_categories_impl,
-    "add_category": _add_category_impl,
-    "delete_category": _delete_category_impl,
+# --- Dispatch Table ---
+# Built once at import: which context each implementation takes and which arguments the
+# schema requires, so tool calls don't reflect on function signatures per call.
+@dataclass(frozen=True)
+class ToolSpec:
+    func: Callable[..., str]
+    needs_user: bool # Takes `current_user` (tools that write record who changed what)
+    read_only: bool
+    required: Tuple[str, ...]
+
+def _spec(name: str, func, needs_user: bool, read_only: bool = False) -> ToolSpec:
+    return ToolSpec(func, needs_user, read_only, tuple(TOOLS_BY_NAME[name]["function"]["parameters"]["required"]))
+
+TOOL_DISPATCH: Dict[str, ToolSpec] = {
+    "list_items": _spec("list_items", _list_items_impl, needs_user=False, read_only=True),
+    "add_item": _spec("add_item", _add_item_impl, needs_user=True),
+    "delete_item": _spec("delete_item", _delete_item_impl, needs_user=False),
+    "update_item": _spec("update_item", _update_item_impl, needs_user=True),
+    "tick_item": _spec("tick_item", _tick_item_impl, needs_user=True),
+    "untick_item": _spec("untick_item", _untick_item_impl, needs_user=True),
+    "list_categories": _spec("list_categories", _list_categories_impl, needs_user=False, read_only=True),
+    "add_category": _spec("add_category", _add_category_impl, needs_user=True),
+    "delete_category": _spec("delete_category", _delete_category_impl, needs_user=False),
 }
+READ_ONLY_TOOLS = frozenset(name for name, spec in TOOL_DISPATCH.items() if spec.read_only)
+
 
-# Updated executor function
-async def execute_function_call(tool_call, db: Session, current_user: models.User, list_id: int | None):
+# --- Tool Selection ---
+# Only the tools a turn plausibly needs are sent. The subsets are built once here; an
+# unclear message gets every tool, so selection can cost tokens but never capability.
+_READ = ("list_items", "list_categories")
+_ITEM_WRITE = ("add_item", "delete_item", "update_item", "tick_item", "untick_item")
+_CATEGORY_WRITE = ("add_category", "delete_category")
+
+TOOL_SETS = {
+    "read": [TOOLS_BY_NAME[n] for n in _READ],
+    "items": [TOOLS_BY_NAME[n] for n in _READ + _ITEM_WRITE],
+    "all": tools,
+}
+
+_CATEGORY_WORDS = re.compile(r"\b(?:categor(?:y|ies)|aisles?|sections?)\b", re.I)
+_WRITE_WORDS = re.compile(
+    r"\b(?:add|put|need|buy|get|remove|delete|drop|clear|tick|check|cross|untick|uncheck|mark|rename|change|"
+    r"move|update|edit|set|note|price|bought|got|done)\b", re.I)
+_READ_WORDS = re.compile(r"\b(?:what|which|show|list|how many|is there|are there|do i|do we|anything|left|remaining)\b", re.I)
+
+def select_tools(text: str, previous_reply: str = None) -> str:
+    """Picks the tool set name for a user message: 'read', 'items' or 'all'."""
+    text = text or ""
+    if previous_reply and previous_reply.rstrip().endswith("?"):
+        return "all" # Answering the assistant's question; the message alone says little
+    if _CATEGORY_WORDS.search(text):
+        return "all"
+    if _WRITE_WORDS.search(text):
+        return "items"
+    if _READ_WORDS.search(text):
+        return "read"
+    return "all" # Short replies ("yes", "the second one") depend on earlier turns
+
+def run_tool(name: str, arguments: dict, db: Session, current_user: models.User, list_id: int, list_version: int | None = None) -> str:
+    """
+    Calls a tool implementation through the dispatch table with the request context injected.
+    Read-only tools read from a replica if it has caught up with `list_version` (the list
+    version the request started from) and nothing was written yet.
+    """
+    spec = TOOL_DISPATCH[name]
+    missing_args = [arg for arg in spec.required if arg not in arguments]
+    if missing_args:
+        return f"Error calling {name}: Missing required arguments: {', '.join(missing_args)}"
+    arguments = {k: v for k, v in arguments.items() if k not in ("db", "current_user", "list_id")} # Never taken from the model
+    if spec.needs_user:
+        arguments["current_user"] = current_user
+    if not spec.read_only:
+        return spec.func(db=db, list_id=list_id, **arguments)
+    caught_up = None
+    if list_version is not None:
+        caught_up = lambda replica_db: crud.get_list_version(replica_db, list_id) >= list_version
+    with replica_reads(db, caught_up):
+        return spec.func(db=db, list_id=list_id, **arguments)
+
+async def execute_function_call(tool_call, db: Session, current_user: models.User, list_id: int | None, summary: UserListSummary):
+    """
+    Runs one tool call from the model on its target list: the `list` argument if given,
+    else the chat's current list. Targets are access-checked against the user's cached
+    list summary, so only lists the user is a member of can be touched.
+    """
     function_name = tool_call.function.name
-    function_to_call = available_functions.get(function_name)
-    if not function_to_call:
+    spec = TOOL_DISPATCH.get(function_name)
+    chat_tool_calls_total.inc(function=function_name if spec else "unknown")
+    if not spec:
         return f"Error: Function {function_name} not found."
 
-    # Check if list_id context is required but missing
-    sig = inspect.signature(function_to_call)
-    requires_list_id = 'list_id' in sig.parameters
-    if requires_list_id and list_id is None:
-        return f"Error: Action '{function_name}' requires you to specify which list you are working with first."
-
     try:
         arguments_str = tool_call.function.arguments or "{}"
         function_args = json.loads(arguments_str)
     except json.JSONDecodeError as e:
         return f"Error: Invalid arguments format for function {function_name}. Expected JSON. Error: {e}"
 
-    print(f"Executing function: {function_name} with args: {function_args} in list context: {list_id}")
+    # Every tool works on a list
+    target_list_id, error = summary.resolve(function_args.pop("list", None), default_list_id=list_id)
+    if error:
+        return error
+
+    # Argument values can hold user content and are high volume, so only names are logged (at DEBUG)
+    logger.debug("Executing tool call", extra={"function": function_name, "arguments": sorted(function_args), "list_id": target_list_id})
 
     try:
-        # Inject context arguments
-        function_args['db'] = db
-        if 'current_user' in sig.parameters: # Pass user if function expects it
-             function_args['current_user'] = current_user
-        if requires_list_id: # Pass list_id if function expects it
-            function_args['list_id'] = list_id
-
-        # Validate required arguments before calling (basic check)
-        required_params = [p.name for p in sig.parameters.values() if p.default is p.empty and p.name not in ['db', 'current_user', 'list_id']]
-        missing_args = [rp for rp in required_params if rp not in function_args]
-        if missing_args:
-            return f"Error calling {function_name}: Missing required arguments: {', '.join(missing_args)}"
-
-        # Call the implementation function
-        result = function_to_call(**function_args)
+        list_version = dict(summary.fingerprint).get(target_list_id) or 0
+        result = run_tool(function_name, function_args, db, current_user, target_list_id, list_version)
+        if target_list_id != list_id:
+            # Results speak of "the current list"; name the list that was actually used
+            result = f"[List '{summary.lists[target_list_id].name}' (ID {target_list_id})] {result}"
         return result
-
     except TypeError as te:
-         # More detailed error for argument mismatch
-         print(f"Argument mismatch error executing function {function_name}: {te}")
-         expected_args = list(sig.parameters.keys())
-         provided_args = list(function_args.keys())
-         return f"Error calling {function_name}: Argument mismatch. Expected arguments like: {expected_args}. Provided: {provided_args}. Error details: {str(te)}"
+        # Unexpected argument names from the model
+        logger.warning("Argument mismatch executing tool %s: %s", function_name, te)
+        expected_args = list(TOOLS_BY_NAME[function_name]["function"]["parameters"]["properties"])
+        return f"Error calling {function_name}: Argument mismatch. Expected arguments like: {expected_args}. Provided: {list(function_args)}. Error details: {str(te)}"
     except Exception as e:
         # Catch-all for other errors during function execution
-        print(f"Error executing function {function_name}: {e}")
-        import traceback
-        traceback.print_exc() # Print full stack trace to server logs
+        logger.exception("Error executing tool %s", function_name)
         # Return a user-friendly error message
         return f"An unexpected error occurred while trying to execute '{function_name}': {str(e)}"
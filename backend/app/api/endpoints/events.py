@@ -0,0 +1,79 @@
+import asyncio
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app import crud, models
+from app.api import deps
+from app.core.config import settings
+from app.core.events import OVERFLOW, SHUTDOWN, TooManySubscribers, broker
+
+router = APIRouter()
+
+def _sse(event_type: str, data: dict) -> str:
+    return f"event: {event_type}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+def _current_version(db: Session, list_id: int, user_id: int) -> int:
+    """Access check and current version; run in the threadpool, like the rest of the DB work."""
+    try:
+        if not crud.check_user_list_access(db, list_id=list_id, user_id=user_id):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to access this list")
+        return crud.get_list_version(db, list_id=list_id)
+    finally:
+        db.close() # Don't hold a pooled connection for as long as the stream stays open
+
+@router.get("/")
+async def stream_list_events(
+    list_id: int,
+    db: Session = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_user)
+):
+    """
+    Server-sent events announcing changes to the list, from any user and any worker:
+
+    - `ready` with the current `version`, once connected;
+    - `changed` with the new `version` after each change (fetch it, e.g. through the sync
+      endpoint with the last version seen);
+    - `member_added` / `member_removed` with the `user_id`;
+    - `deleted`, `overflow` (the client fell behind), `shutdown` (the worker is stopping) or
+      `member_removed` for the current user end the stream. After `overflow`, `shutdown` or a
+      dropped connection, reconnect and resync.
+    """
+    user_id = current_user.id
+    version = await run_in_threadpool(_current_version, db, list_id, user_id)
+
+    try:
+        subscription = broker.subscribe(list_id, user_id)
+    except TooManySubscribers:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many open event streams; retry later.",
+            headers={"Retry-After": "30"},
+        )
+
+    async def stream():
+        try:
+            yield _sse("ready", {"list_id": list_id, "version": version})
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout=settings.EVENTS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is OVERFLOW or event is SHUTDOWN:
+                    yield _sse(event["type"], {"list_id": list_id})
+                    return
+                yield _sse(event["type"], event)
+                if event["type"] == "deleted" or (event["type"] == "member_removed" and event.get("user_id") == user_id):
+                    return
+        finally:
+            broker.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}, # No proxy buffering
+    )
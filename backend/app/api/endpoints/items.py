@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
-from app import crud, models, schemas
+from app import crud, models, schemas, serializers
 from app.api import deps
+from app.core.config import settings
+from app.core.responses import FastJSONResponse
 
 router = APIRouter()
 
@@ -52,7 +54,7 @@ def create_item(
 @router.get("/", response_model=schemas.ItemListResponse)
 def read_items(
     list_id: Optional[int] = None, # Allow filtering by list_id
-    db: Session = Depends(deps.get_db),
+    db: Session = Depends(deps.get_read_db),
     current_user: models.User = Depends(deps.get_current_user)
 ):
     """
@@ -66,49 +68,83 @@ def read_items(
     if not crud.check_user_list_access(db, list_id=list_id, user_id=current_user.id):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to access this list's items")
 
-    items = crud.get_items_for_list(db, list_id=list_id)
-    return {"items": items}
+    # Column-projected rows: one query, no ORM entities to hydrate or track
+    response = serializers.item_rows_to_dict(crud.get_item_rows_for_list(db, list_id=list_id))
+    if settings.FAST_JSON_ENABLED:
+        return FastJSONResponse(response)
+    return response
+
+
+@router.delete("/", status_code=status.HTTP_204_NO_CONTENT)
+def delete_items(
+    list_id: int,
+    ticked_only: bool = False,
+    db: Session = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_user)
+):
+    """
+    Bulk delete the items of a list, e.g. `ticked_only=true` to clear everything already bought.
+    User must have access to the specified list.
+    """
+    if not crud.check_user_list_access(db, list_id=list_id, user_id=current_user.id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to delete this list's items")
+    crud.delete_items_for_list(db, list_id=list_id, ticked_only=ticked_only)
+    return None # 204 response
 
 
 @router.get("/{item_id}", response_model=schemas.Item)
 async def read_item(
+    response: Response,
     item: models.Item = Depends(get_item_and_check_access) # Use dependency
 ):
     """
     Retrieve a specific item by ID. Access checked via dependency.
     """
+    deps.set_etag(response, item.version)
     return item
 
 
 @router.put("/{item_id}", response_model=schemas.Item)
 async def update_item(
     item_update: schemas.ItemUpdate,
+    response: Response,
     item: models.Item = Depends(get_item_and_check_access), # Use dependency
+    expected_version: Optional[int] = Depends(deps.if_match_version),
     db: Session = Depends(deps.get_db),
     current_user: models.User = Depends(deps.get_current_user) # Needed for updater ID
 ):
     """
     Update an item. Access checked via dependency.
+    With `If-Match: "<version>"` the update only applies if the item is still at that
+    version; otherwise 409 with the current item.
     """
     try:
         updated_item = crud.update_item(
             db=db,
             db_item=item,
             item_update=item_update,
-            user_id=current_user.id # Pass updater ID
+            user_id=current_user.id, # Pass updater ID
+            expected_version=expected_version
         )
-        return updated_item
+    except crud.VersionConflictError as e:
+        raise deps.version_conflict(e, schemas.Item)
     except ValueError as e: # Catches category not found or list mismatch
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    deps.set_etag(response, updated_item.version)
+    return updated_item
 
 
 @router.delete("/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_item(
     item: models.Item = Depends(get_item_and_check_access), # Use dependency
+    expected_version: Optional[int] = Depends(deps.if_match_version),
     db: Session = Depends(deps.get_db)
 ):
     """
-    Delete an item. Access checked via dependency.
+    Delete an item. Access checked via dependency. Honors If-Match like updates.
     """
-    crud.delete_item(db=db, db_item=item)
+    try:
+        crud.delete_item(db=db, db_item=item, expected_version=expected_version)
+    except crud.VersionConflictError as e:
+        raise deps.version_conflict(e, schemas.Item)
     return None # 204 response
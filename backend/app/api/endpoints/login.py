@@ -14,7 +14,8 @@ router = APIRouter()
 @router.post("/token", response_model=schemas.Token)
 def login_for_access_token(
     db: Session = Depends(deps.get_db),
-    form_data: OAuth2PasswordRequestForm = Depends()
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    failure_key: str = Depends(deps.rate_limit_login)
 ):
     """
     OAuth2 compatible token login, get an access token for future requests.
@@ -23,6 +24,7 @@ def login_for_access_token(
         db, username=form_data.username, password=form_data.password
     )
     if not user:
+        deps.record_login_failure(failure_key)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -1,13 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel
 
-from app import crud, models, schemas
+from app import crud, models, schemas, serializers
 from app.api import deps
+from app.core.background import job_queue
+from app.core.config import settings
+from app.core.responses import FastJSONResponse
 
 router = APIRouter()
 
+def _get_owned_list(db: Session, list_id: int, user_id: int, forbidden_detail: str) -> models.ShoppingList:
+    """The list, if `user_id` owns it; 404 for lists that don't exist or are deleted (detached, awaiting the purge)."""
+    db_list = crud.get_shopping_list(db, list_id=list_id)
+    # The owner's membership is only removed by delete_list
+    if db_list is None or not crud.check_user_list_access(db, list_id=list_id, user_id=db_list.owner_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="List not found")
+    if db_list.owner_id != user_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=forbidden_detail)
+    return db_list
+
 # --- List Management ---
 
 @router.post("/", response_model=schemas.ShoppingList, status_code=status.HTTP_201_CREATED)
@@ -38,18 +51,25 @@ def create_list(
 
 @router.get("/", response_model=List[schemas.ShoppingList])
 def read_lists(
-    db: Session = Depends(deps.get_db),
+    db: Session = Depends(deps.get_read_db),
     current_user: models.User = Depends(deps.get_current_user)
 ):
     """
     Retrieve all lists the current user is a member of.
     """
-    return crud.get_shopping_lists_for_user(db=db, user_id=current_user.id)
+    # Column-projected rows: two queries (lists + owners, members + users), no ORM entities
+    list_rows = crud.get_shopping_list_rows_for_user(db=db, user_id=current_user.id)
+    member_rows = crud.get_member_rows_for_lists(db, [row.id for row in list_rows])
+    response = serializers.shopping_list_rows_to_dicts(list_rows, member_rows)
+    if settings.FAST_JSON_ENABLED:
+        return FastJSONResponse(response)
+    return response
 
 @router.get("/{list_id}", response_model=schemas.ShoppingList)
 def read_list(
     list_id: int,
-    db: Session = Depends(deps.get_db),
+    response: Response,
+    db: Session = Depends(deps.get_read_db),
     current_user: models.User = Depends(deps.get_current_user)
 ):
     """
@@ -60,26 +80,23 @@ def read_list(
     db_list = crud.get_shopping_list(db, list_id=list_id)
     if db_list is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="List not found")
+    deps.set_etag(response, db_list.version)
     return db_list
 
 @router.put("/{list_id}", response_model=schemas.ShoppingList)
 def update_list(
     list_id: int,
     list_in: schemas.ShoppingListUpdate,
+    response: Response,
+    expected_version: Optional[int] = Depends(deps.if_match_version),
     db: Session = Depends(deps.get_db),
     current_user: models.User = Depends(deps.get_current_user)
 ):
     """
     Update a list's details (name, type). Only the list owner can update.
+    With `If-Match: "<version>"` it only applies if the list is unchanged (else 409).
     """
-    """
-    Update a list's details (name, type). Only the list owner can update.
-    """
-    db_list = crud.get_list(db, list_id=list_id)
-    if db_list is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="List not found")
-    if db_list.owner_id != current_user.id:
-         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only the list owner can update the list")
+    db_list = _get_owned_list(db, list_id, current_user.id, "Only the list owner can update the list")
 
     # Prevent changing type from shared to private if there are other members? (Optional check)
     # if list_in.list_type == 'private' and db_list.list_type == 'shared':
@@ -87,7 +104,12 @@ def update_list(
     #     if member_count > 1:
     #         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot change list to private when other members exist.")
 
-    return crud.update_list(db=db, db_list=db_list, list_update=list_in)
+    try:
+        updated_list = crud.update_shopping_list(db=db, db_list=db_list, list_update=list_in, expected_version=expected_version)
+    except crud.VersionConflictError as e:
+        raise deps.version_conflict(e, schemas.ShoppingList)
+    deps.set_etag(response, updated_list.version)
+    return updated_list
 
 
 @router.delete("/{list_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -98,14 +120,13 @@ def delete_list(
 ):
     """
     Delete a list. Only the list owner can delete.
-    This will cascade delete all categories and items within the list.
+    The list disappears for all members right away; its categories and items
+    are cascade deleted by a background job.
     """
-    db_list = crud.get_list(db, list_id=list_id) # Fetch to check ownership
-    if db_list is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="List not found")
-    if db_list.owner_id != current_user.id:
-         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only the list owner can delete the list")
-    crud.delete_list(db=db, db_list=db_list)
+    _get_owned_list(db, list_id, current_user.id, "Only the list owner can delete the list")
+    # Queued in the detach's transaction: both happen or neither does
+    job_queue.enqueue("purge_shopping_list", db=db, list_id=list_id)
+    crud.detach_shopping_list(db=db, list_id=list_id)
     return None # Return 204
 
 
@@ -124,11 +145,7 @@ def add_list_member(
     """
     Add a user as a member to a list. Only the list owner can add members.
     """
-    db_list = crud.get_list(db, list_id=list_id)
-    if db_list is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="List not found")
-    if db_list.owner_id != current_user.id:
-         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only the list owner can add members")
+    db_list = _get_owned_list(db, list_id, current_user.id, "Only the list owner can add members")
 
     user_to_add = crud.get_user_by_username(db, username=member_request.username)
     if not user_to_add:
@@ -151,11 +168,7 @@ def remove_list_member(
     Remove a member from a list. Only the list owner can remove members.
     The owner cannot remove themselves.
     """
-    db_list = crud.get_list(db, list_id=list_id) # Fetch to check ownership
-    if db_list is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="List not found")
-    if db_list.owner_id != current_user.id:
-         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only the list owner can remove members")
+    db_list = _get_owned_list(db, list_id, current_user.id, "Only the list owner can remove members")
 
     if db_list.owner_id == user_id_to_remove:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot remove the list owner")
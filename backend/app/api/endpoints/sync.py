@@ -0,0 +1,58 @@
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+
+from app import crud, models, schemas, serializers, sync
+from app.api import deps
+from app.core.config import settings
+from app.core.responses import FastJSONResponse
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+@router.post("/", response_model=schemas.SyncResponse)
+def sync_list(
+    list_id: int,
+    sync_in: schemas.SyncRequest,
+    db: Session = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_user)
+):
+    """
+    Applies a batch of operations queued by an offline client to the list, in order and in
+    one transaction. Returns a result per operation, the new list version to send as the next
+    `base_version`, and the list's current categories and items if others changed it since
+    `base_version` (the client's own operations are not echoed back).
+    """
+    if not crud.check_user_list_access(db, list_id=list_id, user_id=current_user.id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to access this list")
+    if len(sync_in.operations) > settings.SYNC_MAX_OPERATIONS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.SYNC_MAX_OPERATIONS} operations per sync; send the rest in another batch."
+        )
+
+    try:
+        results, changed_by_ops = sync.apply_operations(db, current_user, list_id, sync_in.operations)
+        if changed_by_ops:
+            crud.bump_list_version(db, list_id) # Once per batch
+        sync.prune_operations(db, current_user.id)
+        db.commit()
+    except (IntegrityError, StaleDataError):
+        # A concurrent request created the same row or op id, or changed a row being written; nothing was applied
+        db.rollback()
+        logger.warning("Sync batch conflicted with a concurrent change", extra={"list_id": list_id, "user_id": current_user.id})
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="The list changed during sync; please retry the batch.")
+
+    version = crud.get_list_version(db, list_id=list_id)
+    # Any increment beyond our own bump was made by someone else
+    changed = sync_in.base_version is None or version != sync_in.base_version + (1 if changed_by_ops else 0)
+    response = {"version": version, "results": results, "changed": changed, "categories": None, "items": None}
+    if changed:
+        response["categories"] = [serializers.category_row_to_dict(row) for row in crud.get_category_rows_for_list(db, list_id=list_id)]
+        response["items"] = serializers.item_rows_to_dict(crud.get_item_rows_for_list(db, list_id=list_id))["items"]
+    if settings.FAST_JSON_ENABLED:
+        return FastJSONResponse(response)
+    return response
@@ -0,0 +1,111 @@
+import csv
+import io
+import logging
+import tempfile
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import crud, models, schemas, transfer
+from app.api import deps
+from app.core.config import settings
+from app.database import SessionLocal, use_replica
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+@router.get("/export")
+def export_list(
+    list_id: int,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    db: Session = Depends(deps.get_read_db),
+    current_user: models.User = Depends(deps.get_current_user)
+):
+    """
+    Downloads the list's categories and items as NDJSON or CSV (the formats accepted by the
+    import endpoint), streamed from a database cursor so large lists are never held in memory.
+    """
+    if not crud.check_user_list_access(db, list_id=list_id, user_id=current_user.id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to access this list")
+    db.close() # The stream outlives the request's session; it reads through its own
+
+    def stream():
+        export_db = SessionLocal()
+        use_replica(export_db)
+        try:
+            db_list = crud.get_shopping_list(export_db, list_id=list_id)
+            if db_list is None: # Deleted since the access check
+                return
+            export = transfer.export_csv if format == "csv" else transfer.export_ndjson
+            yield from export(export_db, db_list, settings.LIST_TRANSFER_CHUNK_SIZE)
+        finally:
+            export_db.close()
+
+    return StreamingResponse(
+        stream(),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="list-{list_id}.{format}"'},
+    )
+
+
+@router.post("/import", response_model=schemas.ListImportResult)
+async def import_list(
+    list_id: int,
+    request: Request,
+    format: Optional[Literal["ndjson", "csv"]] = None,
+    db: Session = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_user)
+):
+    """
+    Adds the categories and items of an export (the request body, NDJSON or CSV; the format
+    defaults from the Content-Type) to the list, in one transaction. Categories are matched by
+    name; items already in their category are skipped, so an import can safely be repeated.
+    Nothing is imported if any line is invalid.
+    """
+    if format is None:
+        format = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+    user_id = current_user.id
+    # All database work happens in the threadpool, never on the event loop; access is checked
+    # before the body is read
+    await run_in_threadpool(_check_access, db, list_id, user_id)
+
+    # Spooled to disk past 1 MB, so the body is read line by line instead of held in memory
+    with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as body:
+        size = 0
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > settings.LIST_IMPORT_MAX_BYTES:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"Imports are limited to {settings.LIST_IMPORT_MAX_BYTES} bytes."
+                )
+            body.write(chunk)
+        body.seek(0)
+        text = io.TextIOWrapper(body, encoding="utf-8-sig", newline="")
+        records = transfer.read_csv(text) if format == "csv" else transfer.read_ndjson(text)
+        return await run_in_threadpool(_apply_import, db, list_id, user_id, records)
+
+
+def _check_access(db: Session, list_id: int, user_id: int):
+    if not crud.check_user_list_access(db, list_id=list_id, user_id=user_id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to access this list")
+
+def _apply_import(db: Session, list_id: int, user_id: int, records) -> dict:
+    try:
+        result = transfer.import_records(db, list_id, user_id, records, settings.LIST_TRANSFER_CHUNK_SIZE)
+        db.commit()
+    except (ValueError, csv.Error) as e: # Includes undecodable bytes; read_csv names the line of CSV errors
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Nothing was imported. {e}")
+    except IntegrityError:
+        db.rollback()
+        logger.warning("List import conflicted with a concurrent change", extra={"list_id": list_id, "user_id": user_id})
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="The list changed during import; please retry.")
+    result["version"] = crud.get_list_version(db, list_id=list_id)
+    return result
@@ -0,0 +1,279 @@
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import delete, event, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from app import models
+from app.core.config import settings
+from app.core.metrics import Gauge
+from app.core.profiler import unprofiled
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+PURGE_INTERVAL = 3600 # Seconds between purges of old finished jobs, per process
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes; everything we write is UTC
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class JobQueue:
+    """
+    In-process background job runner backed by the `background_jobs` table.
+
+    Jobs are persisted on enqueue, so they survive restarts and can be picked up
+    by any worker process sharing the database. A fixed pool of worker threads
+    claims due jobs with a compare-and-swap UPDATE and retries failures with
+    exponential backoff until `max_attempts` is reached.
+    """
+
+    def __init__(self, workers: int, poll_interval: float, lease_seconds: int):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.handlers: Dict[str, Callable] = {}
+        self._threads: list[threading.Thread] = []
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._purge_lock = threading.Lock()
+        self._next_purge = 0.0
+
+    # --- Registration / Enqueueing ---
+    def task(self, name: str) -> Callable:
+        """Decorator registering `func(db, **payload)` as the handler for jobs called `name`."""
+        def decorator(func: Callable) -> Callable:
+            self.handlers[name] = func
+            return func
+        return decorator
+
+    def enqueue(self, name: str, max_attempts: Optional[int] = None, delay: float = 0, db: Optional[Session] = None, **payload) -> int:
+        """
+        Persists a job and wakes an idle worker. Payload must be JSON serializable.
+        With `db`, the job is only added to that session: it is saved by the caller's commit
+        (and dropped by a rollback), so it can't be lost or run without the caller's changes.
+        """
+        if name not in self.handlers:
+            raise ValueError(f"No background handler registered for '{name}'.")
+        job = models.BackgroundJob(
+            name=name,
+            payload=json.dumps(payload),
+            max_attempts=max_attempts or settings.BACKGROUND_MAX_ATTEMPTS,
+            run_at=_utcnow() + timedelta(seconds=delay),
+        )
+        if db is not None:
+            db.add(job)
+            db.flush()
+            db.info["background_jobs_enqueued"] = True # Workers are woken after the commit
+            return job.id
+        db = SessionLocal()
+        try:
+            db.add(job)
+            db.commit()
+            job_id = job.id
+        finally:
+            db.close()
+        self._wakeup.set()
+        return job_id
+
+    # --- Lifecycle ---
+    @property
+    def running(self) -> bool:
+        return any(t.is_alive() for t in self._threads)
+
+    def start(self):
+        if self.running or self.workers <= 0:
+            return
+        self._stopping.clear()
+        self._threads = [
+            threading.Thread(target=self._worker_loop, name=f"background-worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+        logger.info("Started %d background worker(s).", self.workers)
+
+    def stop(self, timeout: float = 10.0):
+        """Signals workers to exit after their current job and waits for them."""
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    # --- Metrics ---
+    def stats(self) -> dict:
+        """Queue depth per status and lag (age in seconds of the oldest due pending job)."""
+        db = SessionLocal()
+        try:
+            counts = dict(db.execute(
+                select(models.BackgroundJob.status, func.count())
+                .group_by(models.BackgroundJob.status)
+            ).all())
+            oldest_due = db.execute(
+                select(func.min(models.BackgroundJob.run_at)).where(
+                    models.BackgroundJob.status == 'pending',
+                    models.BackgroundJob.run_at <= _utcnow(),
+                )
+            ).scalar()
+        finally:
+            db.close()
+        return {
+            "pending": counts.get('pending', 0),
+            "running": counts.get('running', 0),
+            "done": counts.get('done', 0),
+            "failed": counts.get('failed', 0),
+            "lag_seconds": (_utcnow() - _as_utc(oldest_due)).total_seconds() if oldest_due else 0.0,
+        }
+
+    # --- Retention ---
+    def purge_finished(self) -> int:
+        """Deletes 'done' jobs finished more than BACKGROUND_JOB_RETENTION_DAYS ago; failed ones are kept for inspection."""
+        cutoff = _utcnow() - timedelta(days=settings.BACKGROUND_JOB_RETENTION_DAYS)
+        db = SessionLocal()
+        try:
+            result = db.execute(
+                delete(models.BackgroundJob).where(models.BackgroundJob.status == 'done', models.BackgroundJob.finished_at < cutoff),
+                execution_options={"synchronize_session": False},
+            )
+            db.commit()
+            return result.rowcount
+        finally:
+            db.close()
+
+    def _maybe_purge(self):
+        # One idle worker per process purges, at most every PURGE_INTERVAL seconds
+        if not self._purge_lock.acquire(blocking=False):
+            return
+        try:
+            if time.monotonic() < self._next_purge:
+                return
+            self._next_purge = time.monotonic() + PURGE_INTERVAL
+            purged = self.purge_finished()
+            if purged:
+                logger.info("Purged %d finished background job(s).", purged)
+        except Exception:
+            logger.exception("Failed to purge finished background jobs.")
+        finally:
+            self._purge_lock.release()
+
+    # --- Worker internals ---
+    def _worker_loop(self):
+        with unprofiled():
+            self._poll_until_stopped()
+
+    def _poll_until_stopped(self):
+        while not self._stopping.is_set():
+            try:
+                ran_job = self._run_next()
+            except Exception:
+                logger.exception("Background worker failed to claim a job.")
+                ran_job = False
+            if not ran_job:
+                self._maybe_purge()
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def _claim(self, db) -> Optional[models.BackgroundJob]:
+        now = _utcnow()
+        abandoned_before = now - timedelta(seconds=self.lease_seconds)
+        candidates = db.execute(
+            select(models.BackgroundJob.id).where(or_(
+                (models.BackgroundJob.status == 'pending') & (models.BackgroundJob.run_at <= now),
+                (models.BackgroundJob.status == 'running') & (models.BackgroundJob.started_at < abandoned_before),
+            )).order_by(models.BackgroundJob.run_at, models.BackgroundJob.id).limit(self.workers)
+        ).scalars().all()
+
+        for job_id in candidates:
+            # Compare-and-swap so concurrent workers (threads or processes) never run the same job twice
+            claimed = db.execute(
+                update(models.BackgroundJob)
+                .where(
+                    models.BackgroundJob.id == job_id,
+                    or_(
+                        models.BackgroundJob.status == 'pending',
+                        (models.BackgroundJob.status == 'running') & (models.BackgroundJob.started_at < abandoned_before),
+                    ),
+                )
+                .values(status='running', started_at=now, attempts=models.BackgroundJob.attempts + 1)
+            )
+            db.commit()
+            if claimed.rowcount == 1:
+                return db.get(models.BackgroundJob, job_id)
+        return None
+
+    def _run_next(self) -> bool:
+        db = SessionLocal()
+        try:
+            job = self._claim(db)
+            if job is None:
+                return False
+
+            handler = self.handlers.get(job.name)
+            try:
+                if handler is None:
+                    raise LookupError(f"No background handler registered for '{job.name}'.")
+                handler(db, **json.loads(job.payload or "{}"))
+            except Exception as e:
+                db.rollback()
+                job = db.get(models.BackgroundJob, job.id)
+                job.last_error = f"{type(e).__name__}: {e}"
+                if job.attempts >= job.max_attempts:
+                    job.status = 'failed'
+                    job.finished_at = _utcnow()
+                    logger.exception("Background job %s (%s) failed permanently after %d attempt(s).", job.id, job.name, job.attempts)
+                else:
+                    job.status = 'pending'
+                    job.run_at = _utcnow() + timedelta(seconds=2 ** job.attempts)
+                    logger.warning("Background job %s (%s) failed, retrying: %s", job.id, job.name, e)
+            else:
+                job.status = 'done'
+                job.last_error = None
+                job.finished_at = _utcnow()
+            db.commit()
+            return True
+        finally:
+            db.close()
+
+
+job_queue = JobQueue(
+    workers=settings.BACKGROUND_WORKERS,
+    poll_interval=settings.BACKGROUND_POLL_INTERVAL,
+    lease_seconds=settings.BACKGROUND_LEASE_SECONDS,
+)
+
+@event.listens_for(Session, "after_commit")
+def _wake_workers(session: Session):
+    if session.info.pop("background_jobs_enqueued", False):
+        job_queue._wakeup.set()
+
+@event.listens_for(Session, "after_rollback")
+def _forget_enqueued(session: Session):
+    session.info.pop("background_jobs_enqueued", None)
+
+# Both gauges below come from one stats() query per scrape
+_stats_cache = {"at": 0.0, "stats": None}
+
+def _scrape_stats() -> dict:
+    now = time.monotonic()
+    if _stats_cache["stats"] is None or now - _stats_cache["at"] > 1.0:
+        _stats_cache["stats"], _stats_cache["at"] = job_queue.stats(), now
+    return _stats_cache["stats"]
+
+def _collect_queue_depth():
+    stats = _scrape_stats()
+    for status in ('pending', 'running', 'failed'):
+        yield (status,), stats[status]
+
+Gauge("background_jobs", "Background jobs by status.", ("status",), collect=_collect_queue_depth)
+Gauge("background_job_lag_seconds", "Age of the oldest due pending background job.",
+      collect=lambda: [((), _scrape_stats()["lag_seconds"])])
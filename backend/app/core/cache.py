@@ -0,0 +1,271 @@
+"""
+Namespaced caches (chat replies, chat list summaries, ...) that stay correct with several workers.
+
+Each `Cache` keeps entries in a per-process LRU. With CACHE_BACKEND_URL pointing at Redis (or
+any server speaking its protocol, e.g. Valkey or a local stand-in), entries are also stored
+there, shared by all workers, and invalidations are published on a channel every worker
+listens to, so no worker keeps serving its local copy. Requires the optional `redis` package.
+
+Invalidations queued with `invalidate_on_commit` (from crud mutations) are sent once the
+session commits, so other workers can't re-cache the old rows in between.
+
+The shared backend is connected by `start()` from the app lifespan (in each worker, not at
+import); until then, and in processes that never call it, caches are per-process only.
+"""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import Counter, record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+# Namespaces invalidated by crud mutations
+LIST_SUMMARIES = "chat_list_summary" # Chat's summary of a user's lists, by user id
+
+cache_invalidations_total = Counter(
+    "cache_invalidations_total", "Cache entries invalidated, by cache.", ("cache",))
+
+
+# --------------------------
+# Backends
+# --------------------------
+class LRUStore:
+    """Per-process entries with a TTL, evicting the least recently used beyond `max_entries`."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict() # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, entry[1]
+
+    def set(self, key: str, value: Any, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisBackend:
+    """
+    Entries shared by all workers and instances, plus an invalidation channel. Errors are
+    logged and treated as misses: an unavailable cache must not fail requests.
+    """
+
+    CHANNEL = "cache:invalidate"
+
+    def __init__(self, url: str, prefix: str = "cache:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("CACHE_BACKEND_URL is set but the 'redis' package is not installed") from e
+        self.url = url
+        self.prefix = prefix
+        self._redis = redis
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5)
+        self._listener: Optional[threading.Thread] = None
+        self._pubsub = None
+        self._stopping = threading.Event()
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            return self._client.get(self.prefix + key)
+        except Exception:
+            logger.warning("Cache backend unavailable; treating as a miss", exc_info=True)
+            return None
+
+    def set(self, key: str, data: bytes, ttl: float):
+        try:
+            self._client.set(self.prefix + key, data, px=max(1, int(ttl * 1000)))
+        except Exception:
+            logger.warning("Cache backend unavailable; entry not stored", exc_info=True)
+
+    def invalidate(self, keys: list):
+        """Deletes the entries and tells every worker to drop its local copies."""
+        try:
+            pipe = self._client.pipeline(transaction=False)
+            pipe.delete(*[self.prefix + key for key in keys])
+            for key in keys:
+                pipe.publish(self.CHANNEL, key)
+            pipe.execute()
+        except Exception:
+            logger.warning("Cache backend unavailable; invalidation not sent", exc_info=True)
+
+    def listen(self, on_message: Callable[[Optional[str]], None]):
+        """
+        Calls `on_message(key)` for every invalidation, from a daemon thread. After losing the
+        connection it calls `on_message(None)` (messages may have been missed) and reconnects.
+        """
+        if self._listener is not None:
+            return
+
+        def _run():
+            retry_delay = 1
+            while not self._stopping.is_set():
+                try:
+                    # No socket timeout: the subscription is idle most of the time
+                    self._pubsub = self._redis.Redis.from_url(self.url, health_check_interval=30).pubsub(ignore_subscribe_messages=True)
+                    self._pubsub.subscribe(self.CHANNEL)
+                    retry_delay = 1
+                    for message in self._pubsub.listen():
+                        if message["type"] == "message":
+                            on_message(message["data"].decode("utf-8"))
+                except Exception:
+                    if self._stopping.is_set():
+                        break
+                    logger.warning("Cache invalidation channel lost; dropping local copies and reconnecting in %ss", retry_delay, exc_info=True)
+                    on_message(None)
+                    time.sleep(retry_delay)
+                    retry_delay = min(retry_delay * 2, 30)
+
+        self._listener = threading.Thread(target=_run, name="cache-invalidation", daemon=True)
+        self._listener.start()
+
+    def close(self):
+        """Stops the listener and closes the connections."""
+        self._stopping.set()
+        if self._pubsub is not None:
+            try:
+                self._pubsub.close() # Ends the blocking listen()
+            except Exception:
+                pass
+        if self._listener is not None:
+            self._listener.join(timeout=2)
+        self._client.close()
+
+
+def create_backend(url: str = "") -> Optional[RedisBackend]:
+    """None (per-process caches only) unless `url` (CACHE_BACKEND_URL) points at a shared store."""
+    return RedisBackend(url) if url else None
+
+backend: Optional[RedisBackend] = None # Set by start()
+
+def start(shared: Optional[RedisBackend]):
+    """Connects the caches to a shared backend (from the app lifespan) and listens for invalidations."""
+    global backend
+    backend = shared
+    if backend is not None:
+        backend.listen(_drop_local)
+
+def stop():
+    global backend
+    if backend is not None:
+        shared, backend = backend, None
+        shared.close()
+
+
+# --------------------------
+# Caches
+# --------------------------
+_caches: Dict[str, "Cache"] = {}
+
+def _drop_local(message: Optional[str]):
+    if message is None:
+        for cache in list(_caches.values()):
+            cache._local.clear()
+        return
+    namespace, _, key = message.partition(":")
+    cache = _caches.get(namespace)
+    if cache is not None:
+        cache._local.delete(key)
+
+
+class Cache:
+    """
+    A namespace of cached values with a TTL. Keys are strings (or anything `str()` makes
+    unique); with a shared backend, values must round-trip through `dumps`/`loads` (JSON
+    by default). Lookups are counted in `cache_requests_total{cache=namespace}`.
+    """
+
+    def __init__(self, namespace: str, ttl: float, max_entries: int,
+                 dumps: Callable[[Any], str] = json.dumps, loads: Callable[[str], Any] = json.loads):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.dumps = dumps
+        self.loads = loads
+        self._local = LRUStore(max_entries)
+        _caches[namespace] = self
+
+    def _backend_key(self, key) -> str:
+        return f"{self.namespace}:{key}"
+
+    def get(self, key) -> Any:
+        found, value = self._local.get(str(key))
+        if not found and backend is not None:
+            data = backend.get(self._backend_key(key))
+            if data is not None:
+                found, value = True, self.loads(data.decode("utf-8"))
+                self._local.set(str(key), value, min(self.ttl, settings.CACHE_LOCAL_TTL))
+        record_cache_lookup(self.namespace, found)
+        return value if found else None
+
+    def set(self, key, value: Any):
+        if backend is not None:
+            backend.set(self._backend_key(key), self.dumps(value).encode("utf-8"), self.ttl)
+            # Other workers may hold an older copy until an invalidation reaches them
+            self._local.set(str(key), value, min(self.ttl, settings.CACHE_LOCAL_TTL))
+        else:
+            self._local.set(str(key), value, self.ttl)
+
+    def invalidate(self, *keys):
+        """Drops the entries here, in the shared store and in every other worker."""
+        invalidate(self.namespace, *keys)
+
+
+def invalidate(namespace: str, *keys):
+    if not keys:
+        return
+    cache = _caches.get(namespace)
+    if cache is not None:
+        for key in keys:
+            cache._local.delete(str(key))
+    if backend is not None:
+        backend.invalidate([f"{namespace}:{key}" for key in keys])
+    cache_invalidations_total.inc(len(keys), cache=namespace)
+
+
+# --- Invalidation on Commit ---
+def invalidate_on_commit(db: Session, namespace: str, *keys):
+    """Queues invalidations to send when `db` commits (dropped if it rolls back)."""
+    db.info.setdefault("cache_invalidations", []).extend((namespace, key) for key in keys)
+
+@event.listens_for(Session, "after_commit")
+def _send_invalidations(session: Session):
+    queued = session.info.pop("cache_invalidations", None)
+    if not queued:
+        return
+    by_namespace: Dict[str, set] = {}
+    for namespace, key in queued:
+        by_namespace.setdefault(namespace, set()).add(key)
+    for namespace, keys in by_namespace.items():
+        invalidate(namespace, *keys)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_invalidations(session: Session):
+    session.info.pop("cache_invalidations", None)
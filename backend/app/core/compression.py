@@ -0,0 +1,134 @@
+import zlib
+
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError: # Optional: without it responses are gzip-only
+    brotli = None
+
+# Content types worth compressing; images, fonts etc. are already compressed
+COMPRESSIBLE_TYPES = ("application/json", "application/javascript", "application/xml", "image/svg+xml", "text/")
+# Never compressed: buffering or re-chunking would delay events the client is waiting for
+STREAMING_TYPES = ("text/event-stream", "application/x-ndjson")
+
+
+def _header(headers, name: bytes):
+    for key, value in headers:
+        if key.lower() == name:
+            return value.decode("latin-1")
+    return None
+
+def parse_accept_encoding(value: str) -> set:
+    """Returns the codings an Accept-Encoding header allows (entries with q=0 are refused)."""
+    accepted = set()
+    for part in value.split(","):
+        token, *params = [p.strip() for p in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if token and quality > 0:
+            accepted.add(token.lower())
+    return accepted
+
+def choose_encoding(accept_encoding: str):
+    """Picks 'br' or 'gzip' for a dynamically compressed response, or None."""
+    accepted = parse_accept_encoding(accept_encoding)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._br = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._gz = zlib.compressobj(gzip_level, zlib.DEFLATED, 31) # 31 = gzip container
+
+    def compress(self, data: bytes, finish: bool) -> bytes:
+        if self.encoding == "br":
+            out = self._br.process(data)
+            return out + (self._br.finish() if finish else self._br.flush())
+        out = self._gz.compress(data)
+        return out + self._gz.flush(zlib.Z_FINISH if finish else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    """
+    Pure ASGI middleware compressing responses with brotli (if installed) or gzip.
+
+    Responses below `minimum_size`, non-text content types, responses that already carry a
+    Content-Encoding (e.g. precompressed static files) and streaming responses are passed
+    through untouched, as are requests under `exclude_paths` (chat).
+    """
+
+    def __init__(self, app, minimum_size: int = None, gzip_level: int = None, brotli_quality: int = None, exclude_paths: tuple = None):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MINIMUM_SIZE if minimum_size is None else minimum_size
+        self.gzip_level = settings.COMPRESSION_GZIP_LEVEL if gzip_level is None else gzip_level
+        self.brotli_quality = settings.COMPRESSION_BROTLI_QUALITY if brotli_quality is None else brotli_quality
+        self.exclude_paths = tuple(settings.COMPRESSION_EXCLUDE_PATHS) if exclude_paths is None else exclude_paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.exclude_paths):
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(_header(scope["headers"], b"accept-encoding") or "")
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None # Set once we've decided to compress
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message # Held back until the first body chunk decides the encoding
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                headers = start_message.get("headers", [])
+                content_type = (_header(headers, b"content-type") or "").lower()
+                if (
+                    start_message["status"] in (204, 304)
+                    or _header(headers, b"content-encoding") is not None
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                    or content_type.startswith(STREAMING_TYPES)
+                    or (not more_body and len(body) < self.minimum_size)
+                ):
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                compressor = _Compressor(encoding, self.gzip_level, self.brotli_quality)
+                headers = [(k, v) for k, v in headers if k.lower() not in (b"content-length", b"vary")]
+                vary = _header(start_message.get("headers", []), b"vary")
+                headers.append((b"vary", (f"{vary}, Accept-Encoding" if vary else "Accept-Encoding").encode("latin-1")))
+                headers.append((b"content-encoding", encoding.encode("latin-1")))
+                compressed = compressor.compress(body, finish=not more_body)
+                if not more_body:
+                    headers.append((b"content-length", str(len(compressed)).encode("latin-1")))
+                await send({**start_message, "headers": headers})
+                await send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+                return
+
+            await send({"type": "http.response.body", "body": compressor.compress(body, finish=not more_body), "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
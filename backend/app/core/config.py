@@ -1,3 +1,4 @@
+import logging
 import os
 from dotenv import load_dotenv
 from pathlib import Path
@@ -10,11 +11,16 @@ PROJECT_ROOT = BACKEND_DIR.parent
 env_path = BACKEND_DIR / '.env'
 load_dotenv(dotenv_path=env_path)
 
+logger = logging.getLogger(__name__)
+
 class Settings:
     PROJECT_NAME: str = "Grocery List API"
     PROJECT_VERSION: str = "0.1.0"
 
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./grocery_app.db")
+    # Comma separated read replica URLs. Read-only endpoints and chat tools use one of them;
+    # writes (and reads after a write in the same request) use DATABASE_URL
+    DATABASE_REPLICA_URLS: list = [u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
     JWT_SECRET_KEY: str = os.getenv("JWT_SECRET_KEY", "default_secret_key")
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     # Token expires in 30 minutes
@@ -25,13 +31,129 @@ class Settings:
     OPENROUTER_BASE_URL: str = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
     CHAT_MODEL: str = os.getenv("CHAT_MODEL", "google/gemini-2.0-flash-001")
 
-    # Check if secret key is set, raise error if not for production environments
-    if not JWT_SECRET_KEY or JWT_SECRET_KEY == "default_secret_key":
-        print("WARNING: JWT_SECRET_KEY is not set or using default. Please set a strong secret key in .env")
-        # raise ValueError("JWT_SECRET_KEY must be set in the environment variables")
+    # Run the schema migrations (alembic upgrade head) at startup. The production launcher
+    # (run.py --prod) does this once before forking workers and disables it for them.
+    DB_INIT_ON_STARTUP: bool = os.getenv("DB_INIT_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+    # Refuse to start if the database schema differs from the models/migrations
+    DB_SCHEMA_CHECK_ON_STARTUP: bool = os.getenv("DB_SCHEMA_CHECK_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+
+    # --- Rate Limiting ---
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+    # Empty: per-process buckets. Set to e.g. redis://localhost:6379/0 to share limits across workers
+    RATE_LIMIT_BACKEND_URL: str = os.getenv("RATE_LIMIT_BACKEND_URL", "")
+    # Token buckets: up to BURST requests at once, refilled at PER_MINUTE requests per minute.
+    # Login is limited per client IP and per username; chat per user.
+    LOGIN_RATE_LIMIT_BURST: int = int(os.getenv("LOGIN_RATE_LIMIT_BURST", 5))
+    LOGIN_RATE_LIMIT_PER_MINUTE: float = float(os.getenv("LOGIN_RATE_LIMIT_PER_MINUTE", 10))
+    CHAT_RATE_LIMIT_BURST: int = int(os.getenv("CHAT_RATE_LIMIT_BURST", 5))
+    CHAT_RATE_LIMIT_PER_MINUTE: float = float(os.getenv("CHAT_RATE_LIMIT_PER_MINUTE", 20))
+    # Chat requests one user may have in flight (per worker); more wait up to CHAT_QUEUE_TIMEOUT seconds
+    CHAT_MAX_CONCURRENT_PER_USER: int = int(os.getenv("CHAT_MAX_CONCURRENT_PER_USER", 2))
+    CHAT_QUEUE_TIMEOUT: float = float(os.getenv("CHAT_QUEUE_TIMEOUT", 10))
+    # Upper bound on LLM round trips spent executing tool calls for one chat message
+    CHAT_MAX_TOOL_ROUNDS: int = int(os.getenv("CHAT_MAX_TOOL_ROUNDS", 5))
+
+    # Execute unambiguous single-action commands ("add milk", "tick eggs") without calling the LLM
+    CHAT_FAST_PATH_ENABLED: bool = os.getenv("CHAT_FAST_PATH_ENABLED", "true").lower() in ("1", "true", "yes")
+
+    # --- Shared Cache ---
+    # Empty: per-process caches. Set to e.g. redis://localhost:6379/1 to share cached entries
+    # across workers and instances, with invalidations broadcast to all of them
+    CACHE_BACKEND_URL: str = os.getenv("CACHE_BACKEND_URL", "")
+    # With a shared backend, seconds a worker reuses its local copy of an entry without asking
+    # the backend (bounds staleness should an invalidation message be lost)
+    CACHE_LOCAL_TTL: float = float(os.getenv("CACHE_LOCAL_TTL", 5))
+
+    # --- Chat Response Cache ---
+    # Replays answers to repeated read-only questions while the list is unchanged
+    CHAT_CACHE_ENABLED: bool = os.getenv("CHAT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+    CHAT_CACHE_TTL: float = float(os.getenv("CHAT_CACHE_TTL", 600))
+    CHAT_CACHE_MAX_ENTRIES: int = int(os.getenv("CHAT_CACHE_MAX_ENTRIES", 1000))
+    # How many trailing messages (including the new question) identify a conversation
+    CHAT_CACHE_TAIL_MESSAGES: int = int(os.getenv("CHAT_CACHE_TAIL_MESSAGES", 3))
+    # Users whose list/category summary (the multi-list chat context) is kept per worker
+    CHAT_SUMMARY_CACHE_USERS: int = int(os.getenv("CHAT_SUMMARY_CACHE_USERS", 1000))
+    CHAT_SUMMARY_CACHE_TTL: float = float(os.getenv("CHAT_SUMMARY_CACHE_TTL", 3600))
+
+    # --- Offline Sync ---
+    # Operations accepted in one sync batch, and days op ids are remembered to make retries safe
+    SYNC_MAX_OPERATIONS: int = int(os.getenv("SYNC_MAX_OPERATIONS", 500))
+    SYNC_OP_RETENTION_DAYS: int = int(os.getenv("SYNC_OP_RETENTION_DAYS", 30))
+
+    # --- Live List Events ---
+    # How change events reach the other workers: empty for in-process only (one worker),
+    # "postgres" for LISTEN/NOTIFY on DATABASE_URL, or e.g. redis://localhost:6379/2
+    EVENTS_BACKEND_URL: str = os.getenv("EVENTS_BACKEND_URL", "")
+    # Events buffered per stream; a client falling further behind is disconnected to resync
+    EVENTS_QUEUE_SIZE: int = int(os.getenv("EVENTS_QUEUE_SIZE", 100))
+    # Open event streams per worker (more get 503)
+    EVENTS_MAX_SUBSCRIBERS: int = int(os.getenv("EVENTS_MAX_SUBSCRIBERS", 1000))
+    # Seconds between keep-alive comments on idle streams (keeps proxies from closing them)
+    EVENTS_HEARTBEAT_SECONDS: float = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", 15))
+
+    # --- List Export/Import ---
+    # Rows fetched from the cursor per export chunk, and items inserted per statement on import
+    LIST_TRANSFER_CHUNK_SIZE: int = int(os.getenv("LIST_TRANSFER_CHUNK_SIZE", 1000))
+    LIST_IMPORT_MAX_BYTES: int = int(os.getenv("LIST_IMPORT_MAX_BYTES", 50 * 1024 * 1024))
+
+    # --- Fast JSON Responses (opt-in) ---
+    # Render responses with orjson (if installed) and serialize the list/item collection
+    # endpoints straight from the ORM rows instead of through their pydantic response models
+    FAST_JSON_ENABLED: bool = os.getenv("FAST_JSON_ENABLED", "false").lower() in ("1", "true", "yes")
+
+    # --- Frontend Static Files ---
+    # Seconds browsers may cache index.html and non-hashed files (hashed Vite assets are immutable)
+    INDEX_HTML_MAX_AGE: int = int(os.getenv("INDEX_HTML_MAX_AGE", 60))
+    STATIC_MAX_AGE: int = int(os.getenv("STATIC_MAX_AGE", 3600))
+
+    # --- Response Compression ---
+    COMPRESSION_ENABLED: bool = os.getenv("COMPRESSION_ENABLED", "true").lower() in ("1", "true", "yes")
+    # Responses smaller than this many bytes are sent as-is (compression costs more than it saves)
+    COMPRESSION_MINIMUM_SIZE: int = int(os.getenv("COMPRESSION_MINIMUM_SIZE", 1024))
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", 6))
+    # Brotli is used when the `brotli` package is installed and the client accepts it
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 4))
+    # Comma separated path prefixes never compressed (chat replies are small and latency sensitive)
+    COMPRESSION_EXCLUDE_PATHS: list = [p.strip() for p in os.getenv("COMPRESSION_EXCLUDE_PATHS", "/api/v1/chat").split(",") if p.strip()]
+
+    # --- Metrics ---
+    # Exposes Prometheus-style metrics at /metrics
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+    # --- SQL Profiler (development aid, off by default) ---
+    SQL_PROFILER_ENABLED: bool = os.getenv("SQL_PROFILER_ENABLED", "false").lower() in ("1", "true", "yes")
+    # Requests slower than this are logged with their query breakdown
+    SQL_PROFILER_SLOW_REQUEST_MS: float = float(os.getenv("SQL_PROFILER_SLOW_REQUEST_MS", 200))
+    # Same statement executed this many times in one request is reported as a likely N+1
+    SQL_PROFILER_REPEAT_THRESHOLD: int = int(os.getenv("SQL_PROFILER_REPEAT_THRESHOLD", 5))
+
+    # --- Background Jobs ---
+    BACKGROUND_WORKERS: int = int(os.getenv("BACKGROUND_WORKERS", 2))
+    BACKGROUND_MAX_ATTEMPTS: int = int(os.getenv("BACKGROUND_MAX_ATTEMPTS", 3))
+    # Seconds an idle worker waits before polling the job table again
+    BACKGROUND_POLL_INTERVAL: float = float(os.getenv("BACKGROUND_POLL_INTERVAL", 1.0))
+    # Seconds after which a 'running' job is considered abandoned (e.g. worker crashed) and can be reclaimed
+    BACKGROUND_LEASE_SECONDS: int = int(os.getenv("BACKGROUND_LEASE_SECONDS", 300))
+    # Finished jobs are deleted after this many days (failed jobs are kept)
+    BACKGROUND_JOB_RETENTION_DAYS: int = int(os.getenv("BACKGROUND_JOB_RETENTION_DAYS", 7))
+
+    # --- Logging ---
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO").upper()
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json").lower() # 'json' or 'text'
+    # Keep only a fraction of DEBUG/INFO records of chatty loggers, e.g. "app.api.endpoints.chat_tools=0.1"
+    LOG_SAMPLING: str = os.getenv("LOG_SAMPLING", "")
+    # Records are dropped rather than blocking requests once this many are waiting to be written
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+
+    def log_warnings(self):
+        """Warns about insecure or missing configuration. Called once logging is set up."""
+        # Check if secret key is set, raise error if not for production environments
+        if not self.JWT_SECRET_KEY or self.JWT_SECRET_KEY == "default_secret_key":
+            logger.warning("JWT_SECRET_KEY is not set or using default. Please set a strong secret key in .env")
+            # raise ValueError("JWT_SECRET_KEY must be set in the environment variables")
 
-    if not OPENROUTER_API_KEY:
-        print("WARNING: OPENROUTER_API_KEY is not set in .env. Chat functionality will not work.")
+        if not self.OPENROUTER_API_KEY:
+            logger.warning("OPENROUTER_API_KEY is not set in .env. Chat functionality will not work.")
 
 
 settings = Settings()
@@ -0,0 +1,344 @@
+"""
+Live list change events, fanned out to subscribers in every worker (see the list events endpoint).
+
+Crud mutations queue events with `publish_on_commit`; once the session commits they go to
+the backend selected by EVENTS_BACKEND_URL, which delivers them to the broker of every worker:
+
+- empty: in-process only (a single worker);
+- "postgres": LISTEN/NOTIFY on the application database (requires PostgreSQL);
+- a redis:// URL: pub/sub on Redis or any server speaking its protocol (requires the
+  optional `redis` package).
+
+Events are small hints ({"type": "changed", "list_id": 3, "version": 42}); clients fetch the
+change itself, e.g. through the sync endpoint with their last version. Each subscriber has a
+bounded queue: publishing never waits, and a subscriber that falls EVENTS_QUEUE_SIZE events
+behind is dropped with an 'overflow' event, so it reconnects and resyncs. On shutdown every
+stream ends with a 'shutdown' event (reconnect to another worker).
+"""
+import asyncio
+import json
+import logging
+import signal
+import threading
+from typing import Callable, Dict, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "list_events"
+OVERFLOW = {"type": "overflow"} # Delivered in place of the events a slow subscriber missed
+SHUTDOWN = {"type": "shutdown"} # Last event of every stream when the worker shuts down
+
+events_published_total = Counter(
+    "events_published_total", "List change events published, by type.", ("type",))
+events_dropped_subscribers_total = Counter(
+    "events_dropped_subscribers_total", "Event subscribers disconnected for falling behind.")
+
+
+# --------------------------
+# Backends
+# --------------------------
+# A backend sends an event to the broker of every worker, including this one, by calling
+# `deliver(event)` there (from any thread).
+
+class LocalBackend:
+    """Delivers to this process only."""
+
+    def start(self, deliver: Callable[[dict], None]):
+        self._deliver = deliver
+
+    def publish(self, event: dict):
+        self._deliver(event)
+
+    def stop(self):
+        pass
+
+
+class RedisBackend:
+    def __init__(self, url: str):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("EVENTS_BACKEND_URL is a Redis URL but the 'redis' package is not installed") from e
+        self.url = url
+        self._redis = redis
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5)
+        self._pubsub = None
+        self._listener: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    def start(self, deliver: Callable[[dict], None]):
+        def _run():
+            retry_delay = 1
+            while not self._stopping.is_set():
+                try:
+                    self._pubsub = self._redis.Redis.from_url(self.url, health_check_interval=30).pubsub(ignore_subscribe_messages=True)
+                    self._pubsub.subscribe(CHANNEL)
+                    retry_delay = 1
+                    for message in self._pubsub.listen():
+                        if message["type"] == "message":
+                            deliver(json.loads(message["data"]))
+                except Exception:
+                    if self._stopping.wait(0):
+                        break
+                    logger.warning("Event channel lost; reconnecting in %ss", retry_delay, exc_info=True)
+                    self._stopping.wait(retry_delay)
+                    retry_delay = min(retry_delay * 2, 30)
+
+        self._listener = threading.Thread(target=_run, name="events-listener", daemon=True)
+        self._listener.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._pubsub is not None:
+            try:
+                self._pubsub.close() # Ends the blocking listen()
+            except Exception:
+                pass
+        if self._listener is not None:
+            self._listener.join(timeout=2)
+        self._client.close()
+
+    def publish(self, event: dict):
+        try:
+            self._client.publish(CHANNEL, json.dumps(event))
+        except Exception:
+            logger.warning("Event backend unavailable; event not sent", exc_info=True)
+
+
+class PostgresBackend:
+    """NOTIFY on publish; a dedicated connection per worker LISTENs (psycopg2 or psycopg 3)."""
+
+    def __init__(self, engine):
+        if engine.dialect.name != "postgresql":
+            raise RuntimeError("EVENTS_BACKEND_URL=postgres requires a PostgreSQL DATABASE_URL")
+        self.engine = engine
+        self._raw = None
+        self._listener: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    def start(self, deliver: Callable[[dict], None]):
+        def _run():
+            retry_delay = 1
+            while not self._stopping.is_set():
+                try:
+                    self._raw = self.engine.raw_connection()
+                    self._raw.detach() # Held for good; not returned to the pool
+                    connection = self._raw.driver_connection
+                    connection.autocommit = True
+                    connection.cursor().execute(f"LISTEN {CHANNEL}")
+                    retry_delay = 1
+                    for payload in self._notifications(connection):
+                        deliver(json.loads(payload))
+                except Exception:
+                    if self._stopping.is_set():
+                        break
+                    logger.warning("Event channel lost; reconnecting in %ss", retry_delay, exc_info=True)
+                    self._stopping.wait(retry_delay)
+                    retry_delay = min(retry_delay * 2, 30)
+            self._close_connection()
+
+        self._listener = threading.Thread(target=_run, name="events-listener", daemon=True)
+        self._listener.start()
+
+    def _notifications(self, connection):
+        # Wakes up every second to notice stop()
+        if hasattr(connection, "poll"): # psycopg2
+            import select
+            while not self._stopping.is_set():
+                select.select([connection], [], [], 1)
+                connection.poll()
+                while connection.notifies:
+                    yield connection.notifies.pop(0).payload
+        else: # psycopg 3 (3.2+ for the timeout)
+            while not self._stopping.is_set():
+                for notify in connection.notifies(timeout=1):
+                    yield notify.payload
+
+    def _close_connection(self):
+        if self._raw is not None:
+            try:
+                self._raw.close()
+            except Exception:
+                pass
+            self._raw = None
+
+    def stop(self):
+        self._stopping.set()
+        if self._listener is not None:
+            self._listener.join(timeout=3)
+
+    def publish(self, event: dict):
+        from sqlalchemy import func, select
+        try:
+            with self.engine.connect() as connection:
+                connection.execute(select(func.pg_notify(CHANNEL, json.dumps(event))))
+                connection.commit()
+        except Exception:
+            logger.warning("Event backend unavailable; event not sent", exc_info=True)
+
+
+def create_backend(url: str = ""):
+    if not url:
+        return LocalBackend()
+    if url == "postgres":
+        from app.database import engine
+        return PostgresBackend(engine)
+    return RedisBackend(url)
+
+
+# --------------------------
+# Broker
+# --------------------------
+class TooManySubscribers(Exception):
+    pass
+
+
+class Subscription:
+    """One client's stream of a list's events; consumed with `await queue.get()` on its event loop."""
+
+    def __init__(self, list_id: int, user_id: int, max_queue: int):
+        self.list_id = list_id
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.loop = asyncio.get_running_loop()
+        self.dropped = False
+
+    def _offer(self, event: dict):
+        # Runs on the subscriber's loop
+        if self.dropped:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            events_dropped_subscribers_total.inc()
+            self._end(OVERFLOW)
+
+    def _end(self, last_event: dict):
+        # Replaces anything still queued with the stream's final event
+        if self.dropped:
+            return
+        self.dropped = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(last_event)
+
+
+class EventBroker:
+    """Per-process registry of subscriptions by list, fed by the backend."""
+
+    def __init__(self, max_subscribers: int, queue_size: int):
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self.backend = None
+        self._subscriptions: Dict[int, Set[Subscription]] = {}
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def start(self, backend):
+        """Connects to the backend (from the app lifespan); until then events are only delivered locally."""
+        self.backend = backend
+        backend.start(self.deliver)
+
+    def stop(self):
+        """Ends every open stream with a 'shutdown' event and disconnects from the backend."""
+        self.end_streams()
+        if self.backend is not None:
+            backend, self.backend = self.backend, None
+            backend.stop()
+
+    def end_streams(self):
+        """Ends every open stream in this worker with a 'shutdown' event (callable from any thread)."""
+        with self._lock:
+            subscriptions = [subscription for group in self._subscriptions.values() for subscription in group]
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._end, SHUTDOWN)
+            except RuntimeError: # Loop closed
+                pass
+
+    def subscribe(self, list_id: int, user_id: int) -> Subscription:
+        """Call from the event loop that will consume the subscription."""
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                raise TooManySubscribers()
+            subscription = Subscription(list_id, user_id, self.queue_size)
+            self._subscriptions.setdefault(list_id, set()).add(subscription)
+            self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.list_id)
+            if subscriptions is not None and subscription in subscriptions:
+                subscriptions.remove(subscription)
+                self._count -= 1
+                if not subscriptions:
+                    del self._subscriptions[subscription.list_id]
+
+    def publish(self, event: dict):
+        events_published_total.inc(type=event["type"])
+        if self.backend is None:
+            self.deliver(event)
+        else:
+            self.backend.publish(event)
+
+    def deliver(self, event: dict):
+        """Hands an event to this worker's subscribers of its list; never blocks (callable from any thread)."""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(event.get("list_id"), ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._offer, event)
+            except RuntimeError: # Loop closed (shutting down)
+                pass
+
+    def subscriber_count(self) -> int:
+        return self._count
+
+
+broker = EventBroker(settings.EVENTS_MAX_SUBSCRIBERS, settings.EVENTS_QUEUE_SIZE)
+
+Gauge("events_subscribers", "Open list event streams in this worker.", collect=lambda: [((), broker.subscriber_count())])
+
+
+def end_streams_on_exit_signal():
+    """
+    Ends open streams as soon as SIGINT/SIGTERM arrives. uvicorn waits for open responses
+    before running the shutdown half of the lifespan, so without this every stream would hold
+    shutdown until the graceful timeout. Call from the lifespan, after the server installed
+    its handlers (it restores the originals itself on exit).
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        previous = signal.getsignal(signum)
+
+        def _handler(received, frame, previous=previous):
+            # Deferred to the loop: the interrupted code may be holding the broker's lock
+            loop.call_soon_threadsafe(broker.end_streams)
+            if callable(previous):
+                previous(received, frame)
+
+        signal.signal(signum, _handler)
+
+
+# --- Publishing on Commit ---
+def publish_on_commit(db: Session, event: dict):
+    """Queues an event to publish when `db` commits (dropped if it rolls back)."""
+    db.info.setdefault("list_events", []).append(event)
+
+@event.listens_for(Session, "after_commit")
+def _publish_events(session: Session):
+    for queued in session.info.pop("list_events", ()):
+        broker.publish(queued)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_events(session: Session):
+    session.info.pop("list_events", None)
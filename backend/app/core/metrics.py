@@ -0,0 +1,255 @@
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# --------------------------
+# Metric Types
+# --------------------------
+# Minimal, dependency-free metrics with Prometheus text exposition.
+# All metrics register themselves in REGISTRY and are rendered by `render_metrics`.
+
+REGISTRY: list["_Metric"] = []
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> Tuple:
+        return tuple(labels.get(n, "") for n in self.labelnames)
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Gauge(_Metric):
+    """Gauge set explicitly or, if `collect` is given, computed at scrape time."""
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 collect: Optional[Callable[[], Iterable[Tuple[Tuple, float]]]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._collect = collect
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def samples(self):
+        if self._collect is not None:
+            items = list(self._collect())
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._values: Dict[Tuple, list] = {} # key -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(state[-2])}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {state[-1]}"
+
+
+def render_metrics() -> str:
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+# --------------------------
+# Application Metrics
+# --------------------------
+http_requests_total = Counter(
+    "http_requests_total", "HTTP requests by method, route template and status code.", ("method", "route", "status"))
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route"))
+http_request_db_queries = Histogram(
+    "http_request_db_queries", "Database statements executed per HTTP request.", ("method", "route"),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100))
+http_request_db_seconds = Histogram(
+    "http_request_db_seconds", "Time spent in database statements per HTTP request.", ("method", "route"))
+
+db_queries_total = Counter("db_queries_total", "Database statements executed.")
+db_query_duration_seconds = Histogram("db_query_duration_seconds", "Database statement latency.")
+
+chat_llm_request_duration_seconds = Histogram(
+    "chat_llm_request_duration_seconds", "Latency of chat completion calls to the LLM provider.", ("model",),
+    buckets=(0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 64.0))
+chat_llm_tokens_total = Counter(
+    "chat_llm_tokens_total", "Tokens reported by the LLM provider.", ("model", "kind"))
+chat_tool_calls_total = Counter(
+    "chat_tool_calls_total", "Chat tool calls executed, by function name.", ("function",))
+
+cache_requests_total = Counter(
+    "cache_requests_total", "Cache lookups by cache name and result (hit/miss).", ("cache", "result"))
+
+def record_cache_lookup(cache: str, hit: bool):
+    cache_requests_total.inc(cache=cache, result="hit" if hit else "miss")
+
+
+# --------------------------
+# Per-request Database Accounting
+# --------------------------
+class RequestDBStats:
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+# Holds the stats object of the request being served. Sync endpoints run in the
+# threadpool with a copy of the context, so they still update the same object.
+current_request_db_stats: ContextVar[Optional[RequestDBStats]] = ContextVar("current_request_db_stats", default=None)
+
+def instrument_engine(engine: Engine, pool_gauge: bool = True):
+    """
+    Counts and times every statement executed on `engine`, globally and per request.
+    `pool_gauge` also exports its pool usage (done for the primary engine only).
+    """
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        # Kept on the execution context, so a statement that raises leaves nothing behind on the connection
+        context._metrics_query_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._metrics_query_start
+        db_queries_total.inc()
+        db_query_duration_seconds.observe(elapsed)
+        stats = current_request_db_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.seconds += elapsed
+
+    def _collect_pool():
+        pool = engine.pool
+        for state, getter in (("checked_out", "checkedout"), ("size", "size"), ("overflow", "overflow")):
+            if hasattr(pool, getter):
+                yield (state,), getattr(pool, getter)()
+
+    if pool_gauge:
+        Gauge("db_pool_connections", "Connection pool usage of the primary engine.", ("state",), collect=_collect_pool)
+
+
+# --------------------------
+# Middleware
+# --------------------------
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return route.path # Template, e.g. /api/v1/items/{item_id}, keeps cardinality bounded
+    return "unmatched"
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency, status and DB usage per route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestDBStats()
+        token = current_request_db_stats.set(stats)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            current_request_db_stats.reset(token)
+            method, route = scope["method"], _route_label(scope)
+            http_requests_total.inc(method=method, route=route, status=status_code)
+            http_request_duration_seconds.observe(elapsed, method=method, route=route)
+            http_request_db_queries.observe(stats.queries, method=method, route=route)
+            http_request_db_seconds.observe(stats.seconds, method=method, route=route)
@@ -0,0 +1,170 @@
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# --------------------------
+# Query Profiles
+# --------------------------
+class QueryProfile:
+    """Statements executed while the profile was active, with their durations."""
+
+    def __init__(self):
+        self.statements: List[Tuple[str, float]] = []
+        self._identical: Counter = Counter() # (statement, parameters) -> executions
+
+    def record(self, statement: str, parameters, duration: float):
+        self.statements.append((statement, duration))
+        try:
+            self._identical[(statement, repr(parameters))] += 1
+        except Exception: # Unrepresentable parameters are not worth failing a query over
+            pass
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(duration for _, duration in self.statements)
+
+    def by_statement(self) -> List[Tuple[str, int, float]]:
+        """(statement, executions, total seconds), most frequent first."""
+        grouped = {}
+        for statement, duration in self.statements:
+            count, seconds = grouped.get(statement, (0, 0.0))
+            grouped[statement] = (count + 1, seconds + duration)
+        return sorted(((s, c, t) for s, (c, t) in grouped.items()), key=lambda row: (-row[1], -row[2]))
+
+    def repeated(self, threshold: int = None) -> List[Tuple[str, int]]:
+        """Statement shapes executed at least `threshold` times: the usual N+1 signature."""
+        threshold = threshold or settings.SQL_PROFILER_REPEAT_THRESHOLD
+        return [(s, c) for s, c, _ in self.by_statement() if c >= threshold]
+
+    def duplicates(self) -> List[Tuple[str, int]]:
+        """Statements executed more than once with identical parameters (pure waste)."""
+        return [(s, c) for (s, _), c in self._identical.most_common() if c > 1]
+
+    def report(self, limit: int = 10) -> str:
+        lines = [f"{self.count} statement(s), {self.total_seconds * 1000:.1f} ms in database"]
+        for statement, count, seconds in self.by_statement()[:limit]:
+            lines.append(f"  {count:>4}x {seconds * 1000:>8.1f} ms  {' '.join(statement.split())[:200]}")
+        for statement, count in self.duplicates()[:limit]:
+            lines.append(f"  duplicate {count}x with identical parameters: {' '.join(statement.split())[:200]}")
+        return "\n".join(lines)
+
+
+_active_profile: ContextVar[Optional[QueryProfile]] = ContextVar("active_query_profile", default=None)
+
+@contextmanager
+def profile_queries() -> Iterator[QueryProfile]:
+    """Records every statement executed in this context (including threadpool calls made from it)."""
+    profile = QueryProfile()
+    token = _active_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _active_profile.reset(token)
+
+_suppressed: ContextVar[bool] = ContextVar("query_profiling_suppressed", default=False)
+
+@contextmanager
+def unprofiled() -> Iterator[None]:
+    """Excludes statements from all profiles, e.g. for background workers polling the database."""
+    token = _suppressed.set(True)
+    try:
+        yield
+    finally:
+        _suppressed.reset(token)
+
+# Profiles collecting statements from every thread. Test clients run the app in their own
+# thread, so a context-local profile opened by the test would never see the app's queries.
+_global_profiles: List[QueryProfile] = []
+
+@contextmanager
+def query_budget(max_queries: int, allow_duplicates: bool = True) -> Iterator[QueryProfile]:
+    """Fails with the query breakdown when the block executes more than `max_queries` statements."""
+    profile = QueryProfile()
+    _global_profiles.append(profile)
+    try:
+        yield profile
+    finally:
+        _global_profiles.remove(profile)
+    if profile.count > max_queries:
+        raise AssertionError(f"Query budget exceeded: {profile.count} > {max_queries}\n{profile.report()}")
+    if not allow_duplicates and profile.duplicates():
+        raise AssertionError(f"Duplicate queries executed\n{profile.report()}")
+
+_instrumented_engines = set()
+
+def install_profiler(engine: Engine):
+    """Feeds statements executed on `engine` into the active profiles, if any. Idempotent."""
+    if id(engine) in _instrumented_engines:
+        return
+    _instrumented_engines.add(id(engine))
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if (_active_profile.get() is not None or _global_profiles) and not _suppressed.get():
+            context._profiler_query_start = time.perf_counter() # Per execution, so failed statements leave nothing behind
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_profiler_query_start", None)
+        if started is None:
+            return
+        duration = time.perf_counter() - started
+        profile = _active_profile.get()
+        if profile is not None:
+            profile.record(statement, parameters, duration)
+        for global_profile in _global_profiles:
+            global_profile.record(statement, parameters, duration)
+
+
+# --------------------------
+# Middleware
+# --------------------------
+class QueryProfilerMiddleware:
+    """
+    Profiles the statements of every HTTP request. Adds `X-DB-Queries` / `X-DB-Time-Ms`
+    response headers and logs the breakdown of slow requests and suspected N+1 patterns.
+    """
+
+    def __init__(self, app, slow_request_ms: float = None):
+        self.app = app
+        self.slow_request_ms = slow_request_ms if slow_request_ms is not None else settings.SQL_PROFILER_SLOW_REQUEST_MS
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        with profile_queries() as profile:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-db-queries", str(profile.count).encode()))
+                    headers.append((b"x-db-time-ms", f"{profile.total_seconds * 1000:.2f}".encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        repeated = profile.repeated()
+        if elapsed_ms >= self.slow_request_ms or repeated or profile.duplicates():
+            reason = "slow request" if elapsed_ms >= self.slow_request_ms else "repeated queries"
+            logger.warning(
+                "%s: %s %s took %.1f ms\n%s",
+                reason, scope["method"], scope["path"], elapsed_ms, profile.report(),
+            )
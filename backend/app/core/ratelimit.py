@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import math
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Tuple
+
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+from app.core.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+rate_limited_total = Counter(
+    "rate_limited_total", "Requests rejected with 429, by limiter name.", ("limiter",))
+
+
+# --------------------------
+# Token Bucket Backends
+# --------------------------
+# A backend answers one question: may `key` spend `cost` tokens from a bucket holding at most
+# `capacity` tokens that refills at `rate` tokens per second? It returns (allowed, retry_after_seconds).
+# With spend=False the tokens are only looked at, not taken.
+
+class MemoryBackend:
+    """Per-process buckets. Limits are per worker when running several workers."""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: Dict[str, Tuple[float, float]] = {} # key -> (tokens, last refill time)
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: float, rate: float, cost: float = 1, spend: bool = True) -> Tuple[bool, float]:
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - last) * rate)
+            allowed = tokens >= cost
+            if allowed and spend:
+                tokens -= cost
+            if key not in self._buckets and len(self._buckets) >= self.max_keys:
+                self._prune(now, capacity, rate)
+            self._buckets[key] = (tokens, now)
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+    def _prune(self, now: float, capacity: float, rate: float):
+        # Buckets that have refilled completely carry no state worth keeping
+        full_after = capacity / rate
+        for key, (_, last) in list(self._buckets.items()):
+            if now - last >= full_after:
+                del self._buckets[key]
+
+
+class RedisBackend:
+    """
+    Buckets shared by all workers and instances, kept in Redis (or any server speaking its
+    protocol) and updated atomically by a Lua script. Requires the optional `redis` package.
+    """
+
+    SCRIPT = """
+    local capacity, rate, cost, now, spend = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4]), ARGV[5] == '1'
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens, ts = tonumber(state[1]) or capacity, tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    local allowed = 0
+    if tokens >= cost then allowed = 1; if spend then tokens = tokens - cost end end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("RATE_LIMIT_BACKEND_URL is set but the 'redis' package is not installed") from e
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5)
+        self._script = self._client.register_script(self.SCRIPT)
+
+    def take(self, key: str, capacity: float, rate: float, cost: float = 1, spend: bool = True) -> Tuple[bool, float]:
+        try:
+            allowed, tokens = self._script(keys=[self.prefix + key], args=[capacity, rate, cost, time.time(), int(spend)])
+        except Exception:
+            # Fail open: an unavailable limiter store must not take login and chat down with it
+            logger.warning("Rate limit backend unavailable; allowing request", exc_info=True)
+            return True, 0.0
+        return bool(allowed), 0.0 if allowed else (cost - float(tokens)) / rate
+
+
+def create_backend(url: str = ""):
+    """In-memory buckets unless `url` (RATE_LIMIT_BACKEND_URL) points at a shared store."""
+    return RedisBackend(url) if url else MemoryBackend()
+
+backend = create_backend(settings.RATE_LIMIT_BACKEND_URL)
+
+
+# --------------------------
+# Limiters
+# --------------------------
+def _too_many_requests(limiter: str, retry_after: float, detail: str) -> HTTPException:
+    rate_limited_total.inc(limiter=limiter)
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class RateLimiter:
+    """
+    Token bucket: allows bursts of `burst` requests, then `per_minute` requests per minute.
+    `check(key)` raises a 429 with Retry-After once the key's bucket is empty; with spend=False
+    it only checks, so callers can charge the bucket later (e.g. only for failed attempts).
+    """
+
+    def __init__(self, name: str, burst: int, per_minute: float):
+        self.name = name
+        self.capacity = burst
+        self.rate = per_minute / 60
+
+    def check(self, key: str, spend: bool = True):
+        if not settings.RATE_LIMIT_ENABLED or self.rate <= 0:
+            return
+        allowed, retry_after = backend.take(f"{self.name}:{key}", self.capacity, self.rate, spend=spend)
+        if not allowed:
+            raise _too_many_requests(self.name, retry_after, "Too many requests, please try again later.")
+
+
+class ConcurrencyLimiter:
+    """
+    Caps in-flight operations per key (per process). Callers beyond the cap wait up to
+    `queue_timeout` seconds for a slot, then get a 429 with Retry-After.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._waiters: Dict[str, int] = {} # key -> holders + waiters, to drop idle semaphores
+
+    @asynccontextmanager
+    async def slot(self, key):
+        if not settings.RATE_LIMIT_ENABLED or self.max_concurrent <= 0:
+            yield
+            return
+        key = str(key)
+        semaphore = self._semaphores.setdefault(key, asyncio.Semaphore(self.max_concurrent))
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            try:
+                await asyncio.wait_for(semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                raise _too_many_requests(self.name, self.queue_timeout,
+                                         "Too many requests in progress, please wait for the previous ones to finish.")
+            try:
+                yield
+            finally:
+                semaphore.release()
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+                self._semaphores.pop(key, None)
+
+
+login_ip_limiter = RateLimiter("login_ip", settings.LOGIN_RATE_LIMIT_BURST, settings.LOGIN_RATE_LIMIT_PER_MINUTE)
+# Failed logins per (username, client IP): charged only when the password check fails, so
+# nobody can lock an account out by sending attempts for it from elsewhere
+login_failure_limiter = RateLimiter("login_failure", settings.LOGIN_RATE_LIMIT_BURST, settings.LOGIN_RATE_LIMIT_PER_MINUTE)
+chat_limiter = RateLimiter("chat", settings.CHAT_RATE_LIMIT_BURST, settings.CHAT_RATE_LIMIT_PER_MINUTE)
+chat_concurrency = ConcurrencyLimiter("chat_concurrency", settings.CHAT_MAX_CONCURRENT_PER_USER, settings.CHAT_QUEUE_TIMEOUT)
@@ -0,0 +1,169 @@
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional
+
+from starlette.responses import FileResponse, JSONResponse, PlainTextResponse, Response
+
+from app.core.compression import parse_accept_encoding
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError: # Optional: .br siblings are still served, the in-memory shell is just gzip-only
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+ONE_YEAR = 31536000
+
+# Vite emits content-hashed names like assets/index-BzX1a2_c.js; such files never change in place
+HASHED_NAME = re.compile(r"[.-][A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$")
+# Entry points that must always be revalidated, or clients keep running an old build
+REVALIDATE_ALWAYS = {"sw.js", "registerSW.js", "manifest.webmanifest"}
+# Precompressed siblings, in order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+mimetypes.add_type("application/manifest+json", ".webmanifest")
+
+
+@dataclass
+class _Variant:
+    path: Path
+    size: int
+    etag: str
+
+@dataclass
+class _Asset:
+    media_type: str
+    cache_control: str
+    variants: Dict[str, _Variant] = field(default_factory=dict) # encoding ('identity', 'br', 'gzip') -> file
+
+
+def cache_control_for(rel_path: str) -> str:
+    name = rel_path.rsplit("/", 1)[-1]
+    if name in REVALIDATE_ALWAYS:
+        return "no-cache"
+    if rel_path.startswith("assets/") or HASHED_NAME.search(name):
+        return f"public, max-age={ONE_YEAR}, immutable"
+    return f"public, max-age={settings.STATIC_MAX_AGE}"
+
+def _accepted_encodings(scope) -> set:
+    for name, value in scope["headers"]:
+        if name == b"accept-encoding":
+            return parse_accept_encoding(value.decode("latin-1"))
+    return set()
+
+def _if_none_match(scope) -> Optional[str]:
+    for name, value in scope["headers"]:
+        if name == b"if-none-match":
+            return value.decode("latin-1")
+    return None
+
+
+class FrontendFiles:
+    """
+    ASGI app serving the Vite build.
+
+    - Files are indexed once at startup; requests never stat or list the directory.
+    - Prebuilt `.br`/`.gz` siblings (see scripts/precompress_static.py) are served when the
+      client accepts them.
+    - Hashed assets are cached as immutable for a year, entry points are revalidated.
+    - The SPA shell (index.html) is kept in memory, precompressed, and returned for every
+      unknown path without a file extension so client-side routes work on reload.
+    """
+
+    def __init__(self, directory: Path, index: str = "index.html", exclude_prefixes: tuple = ("/api/",)):
+        self.directory = Path(directory).resolve()
+        self.index_name = index
+        self.exclude_prefixes = exclude_prefixes
+        self.assets: Dict[str, _Asset] = {}
+        self.shell: Dict[str, bytes] = {}
+        self.shell_etag = ""
+        self._scan()
+        self._load_shell()
+
+    def _scan(self):
+        siblings = {suffix for _, suffix in ENCODINGS}
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = Path(root) / name
+                if path.suffix in siblings and path.with_suffix("").exists():
+                    continue # Registered as a variant of the original below
+                rel = path.relative_to(self.directory).as_posix()
+                media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+                if media_type.startswith("text/") or media_type in ("application/javascript", "application/json"):
+                    media_type += "; charset=utf-8"
+                asset = _Asset(media_type=media_type, cache_control=cache_control_for(rel))
+                for encoding, candidate in [("identity", path)] + [(e, Path(f"{path}{s}")) for e, s in ENCODINGS]:
+                    if candidate.is_file():
+                        stat = candidate.stat()
+                        asset.variants[encoding] = _Variant(candidate, stat.st_size, f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"')
+                self.assets[rel] = asset
+        logger.info("Indexed %d frontend files in %s", len(self.assets), self.directory)
+
+    def _load_shell(self):
+        index_path = self.directory / self.index_name
+        if not index_path.is_file():
+            logger.warning("No %s in %s; client-side routes will 404.", self.index_name, self.directory)
+            return
+        raw = index_path.read_bytes()
+        self.shell = {"identity": raw, "gzip": gzip.compress(raw, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            self.shell["br"] = brotli.compress(raw, quality=11)
+        self.shell_etag = f'"{hashlib.sha1(raw).hexdigest()[:16]}"'
+
+    def _pick(self, available, accepted) -> str:
+        for encoding, _ in ENCODINGS:
+            if encoding in available and encoding in accepted:
+                return encoding
+        return "identity"
+
+    async def __call__(self, scope, receive, send):
+        if scope["method"] not in ("GET", "HEAD"):
+            response = PlainTextResponse("Method Not Allowed", status_code=405, headers={"Allow": "GET, HEAD"})
+            await response(scope, receive, send)
+            return
+
+        path = scope["path"]
+        rel = path.lstrip("/")
+        asset = self.assets.get(rel) if rel and rel != self.index_name else None
+        accepted = _accepted_encodings(scope)
+
+        if asset is not None:
+            encoding = self._pick(asset.variants, accepted)
+            variant = asset.variants[encoding]
+            headers = {"Cache-Control": asset.cache_control, "ETag": variant.etag}
+            if len(asset.variants) > 1:
+                headers["Vary"] = "Accept-Encoding"
+            if _if_none_match(scope) == variant.etag:
+                response = Response(status_code=304, headers=headers)
+            else:
+                if encoding != "identity":
+                    headers["Content-Encoding"] = encoding
+                response = FileResponse(variant.path, media_type=asset.media_type, headers=headers)
+        elif self.shell and not path.startswith(self.exclude_prefixes) and (rel == self.index_name or "." not in rel.rsplit("/", 1)[-1]):
+            # SPA shell for "/", "/index.html" and client-side routes
+            encoding = self._pick(self.shell, accepted)
+            headers = {
+                "Cache-Control": f"public, max-age={settings.INDEX_HTML_MAX_AGE}, must-revalidate",
+                "ETag": self.shell_etag,
+                "Vary": "Accept-Encoding",
+            }
+            if _if_none_match(scope) == self.shell_etag:
+                response = Response(status_code=304, headers=headers)
+            else:
+                if encoding != "identity":
+                    headers["Content-Encoding"] = encoding
+                response = Response(self.shell[encoding], media_type="text/html; charset=utf-8", headers=headers)
+        elif path.startswith(self.exclude_prefixes):
+            response = JSONResponse({"detail": "Not Found"}, status_code=404) # Same shape as FastAPI's own 404s
+        else:
+            response = PlainTextResponse("Not Found", status_code=404)
+
+        await response(scope, receive, send)
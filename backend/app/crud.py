@@ -1,10 +1,38 @@
-from sqlalchemy.orm import Session, joinedload, contains_eager, selectinload
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, aliased, joinedload, contains_eager, selectinload
 from sqlalchemy.exc import IntegrityError
-from typing import List, Optional
+from sqlalchemy.orm.exc import StaleDataError
+from typing import Callable, List, Optional
 
 from . import models, schemas
+from app.core import cache, events
 from app.core.security import get_password_hash, verify_password
 
+# --- Optimistic Concurrency ---
+class VersionConflictError(Exception):
+    """
+    The row's version no longer matches the one the change was based on (If-Match or a
+    concurrent writer). `current` is the row as now stored, or None if it was deleted.
+    """
+    def __init__(self, current):
+        super().__init__("The record was changed by someone else. Review the current version and try again.")
+        self.current = current
+
+def _check_version(db_obj, expected_version: Optional[int]):
+    if expected_version is not None and db_obj.version != expected_version:
+        raise VersionConflictError(db_obj)
+
+def _commit_versioned(db: Session, reload: Callable):
+    """Commits; if a versioned UPDATE/DELETE matched no row (compare-and-swap lost), reports the current row."""
+    try:
+        db.commit()
+    except StaleDataError:
+        db.rollback()
+        raise VersionConflictError(reload())
+
+
 # --- User CRUD (mostly unchanged, add helpers) ---
 def get_user(db: Session, user_id: int) -> Optional[models.User]:
     return db.query(models.User).filter(models.User.id == user_id).first()
@@ -24,6 +52,8 @@ def authenticate_user(db: Session, username: str, password: str) -> Optional[mod
     user = get_user_by_username(db, username=username)
     if not user or not verify_password(password, user.hashed_password):
         return None
+    if user.is_active is False: # Deactivated (e.g. scripts/manage_users.py deactivate)
+        return None
     return user
 
 def get_users_by_usernames(db: Session, usernames: List[str]) -> List[models.User]:
@@ -33,6 +63,15 @@ def get_users_by_usernames(db: Session, usernames: List[str]) -> List[models.Use
     return db.query(models.User).filter(models.User.username.in_(usernames)).all()
 
 
+# --- Cache Invalidation ---
+def _memberships_changed(db: Session, user_ids):
+    """Drops the users' cached list summaries once the caller's transaction commits."""
+    cache.invalidate_on_commit(db, cache.LIST_SUMMARIES, *user_ids)
+
+def _list_member_ids(db: Session, list_id: int) -> List[int]:
+    return list(db.scalars(select(models.ListMember.user_id).where(models.ListMember.list_id == list_id)))
+
+
 # --- ShoppingList CRUD ---
 def create_shopping_list(db: Session, list_data: schemas.ShoppingListCreate, owner_id: int) -> models.ShoppingList:
     """Creates a new shopping list and adds the owner as a member."""
@@ -47,6 +86,7 @@ def create_shopping_list(db: Session, list_data: schemas.ShoppingListCreate, own
     # Add owner as the first member
     owner_member = models.ListMember(list_id=db_list.id, user_id=owner_id)
     db.add(owner_member)
+    member_ids = [owner_id]
 
     # Add other initial members if provided
     if list_data.share_with_usernames:
@@ -55,15 +95,12 @@ def create_shopping_list(db: Session, list_data: schemas.ShoppingListCreate, own
             if user.id != owner_id: # Don't add owner twice
                 member = models.ListMember(list_id=db_list.id, user_id=user.id)
                 db.add(member)
+                member_ids.append(user.id)
 
+    _memberships_changed(db, member_ids)
     db.commit()
-    db.refresh(db_list)
-    # Eager load members and owner for the response
-    db.refresh(db_list, attribute_names=['members', 'owner'])
-    for member in db_list.members:
-        db.refresh(member, attribute_names=['user'])
-
-    return db_list
+    # Reload with owner and members eager loaded (two selectin queries) instead of refreshing each member
+    return get_shopping_list(db, list_id=db_list.id)
 
 def get_shopping_list(db: Session, list_id: int) -> Optional[models.ShoppingList]:
     """Gets a single shopping list by ID, eager loading owner and members."""
@@ -79,22 +116,72 @@ def get_shopping_lists_for_user(db: Session, user_id: int) -> List[models.Shoppi
          selectinload(models.ShoppingList.members).selectinload(models.ListMember.user)
     ).filter(models.ListMember.user_id == user_id).order_by(models.ShoppingList.name).all()
 
-def update_shopping_list(db: Session, db_list: models.ShoppingList, list_update: schemas.ShoppingListUpdate) -> models.ShoppingList:
-    """Updates list properties."""
+def get_shopping_list_rows_for_user(db: Session, user_id: int) -> list:
+    """
+    Read-only variant of `get_shopping_lists_for_user`: one query selecting just the columns
+    `schemas.ShoppingList` needs, joined to the owner. Returns untracked `Row`s; fetch the
+    members with `get_member_rows_for_lists`.
+    """
+    Owner = aliased(models.User)
+    return db.execute(
+        select(
+            models.ShoppingList.id, models.ShoppingList.name, models.ShoppingList.list_type,
+            models.ShoppingList.created_at, models.ShoppingList.updated_at, models.ShoppingList.version,
+            Owner.id.label("owner_id"), Owner.username.label("owner_username"),
+        )
+        .join(models.ListMember, models.ListMember.list_id == models.ShoppingList.id)
+        .join(Owner, Owner.id == models.ShoppingList.owner_id)
+        .where(models.ListMember.user_id == user_id)
+        .order_by(models.ShoppingList.name)
+    ).all()
+
+def get_member_rows_for_lists(db: Session, list_ids: List[int]) -> list:
+    """Members (list_id, user_id, username, added_at) of the given lists as untracked `Row`s."""
+    if not list_ids:
+        return []
+    return db.execute(
+        select(models.ListMember.list_id, models.ListMember.added_at, models.User.id.label("user_id"), models.User.username)
+        .join(models.User, models.User.id == models.ListMember.user_id)
+        .where(models.ListMember.list_id.in_(list_ids))
+    ).all()
+
+def update_shopping_list(db: Session, db_list: models.ShoppingList, list_update: schemas.ShoppingListUpdate, expected_version: Optional[int] = None) -> models.ShoppingList:
+    """Updates list properties. Raises VersionConflictError if `expected_version` is stale."""
+    _check_version(db_list, expected_version)
     update_data = list_update.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_list, key, value)
-    db.commit()
-    db.refresh(db_list)
-    # Eager load again after refresh if needed for response
-    db.refresh(db_list, attribute_names=['owner', 'members'])
-    for member in db_list.members:
-        db.refresh(member, attribute_names=['user'])
-    return db_list
+    bump_list_version(db, db_list.id)
+    _commit_versioned(db, lambda: get_shopping_list(db, list_id=db_list.id))
+    # Eager load again for the response
+    return get_shopping_list(db, list_id=db_list.id)
 
 def delete_shopping_list(db: Session, db_list: models.ShoppingList):
-    """Deletes a list and its cascaded members/categories/items."""
-    db.delete(db_list)
+    """
+    Deletes a list and its members/categories/items.
+    Uses one set-based DELETE per table instead of the ORM cascade, which would
+    load and delete every category and item row individually.
+    """
+    list_id = db_list.id
+    _memberships_changed(db, _list_member_ids(db, list_id))
+    events.publish_on_commit(db, {"type": "deleted", "list_id": list_id})
+    list_category_ids = select(models.Category.id).where(models.Category.list_id == list_id)
+    db.execute(delete(models.Item).where(models.Item.category_id.in_(list_category_ids)), execution_options={"synchronize_session": False})
+    db.execute(delete(models.Category).where(models.Category.list_id == list_id), execution_options={"synchronize_session": False})
+    db.execute(delete(models.ListMember).where(models.ListMember.list_id == list_id), execution_options={"synchronize_session": False})
+    db.execute(delete(models.ListVersion).where(models.ListVersion.list_id == list_id), execution_options={"synchronize_session": False})
+    db.execute(delete(models.ShoppingList).where(models.ShoppingList.id == list_id), execution_options={"synchronize_session": False})
+    db.commit()
+    db.expunge(db_list)
+
+def detach_shopping_list(db: Session, list_id: int):
+    """
+    Removes every membership of a list so it immediately disappears for all users.
+    The list row and its categories/items are left for a background purge.
+    """
+    _memberships_changed(db, _list_member_ids(db, list_id))
+    events.publish_on_commit(db, {"type": "deleted", "list_id": list_id})
+    db.query(models.ListMember).filter(models.ListMember.list_id == list_id).delete(synchronize_session=False)
     db.commit()
 
 def add_list_member(db: Session, db_list: models.ShoppingList, user_id: int) -> Optional[models.ListMember]:
@@ -108,6 +195,8 @@ def add_list_member(db: Session, db_list: models.ShoppingList, user_id: int) ->
 
     member = models.ListMember(list_id=db_list.id, user_id=user_id)
     db.add(member)
+    _memberships_changed(db, [user_id])
+    events.publish_on_commit(db, {"type": "member_added", "list_id": db_list.id, "user_id": user_id})
     db.commit()
     db.refresh(member)
     db.refresh(member, attribute_names=['user']) # Load user for response if needed
@@ -125,10 +214,70 @@ def remove_list_member(db: Session, db_list: models.ShoppingList, user_id: int)
 
     if member:
         db.delete(member)
+        _memberships_changed(db, [user_id])
+        events.publish_on_commit(db, {"type": "member_removed", "list_id": db_list.id, "user_id": user_id})
         db.commit()
         return True
     return False
 
+def get_list_version(db: Session, list_id: int) -> int:
+    """Current content version of a list (0 if it was never changed)."""
+    version = db.query(models.ListVersion.version).filter(models.ListVersion.list_id == list_id).scalar()
+    return version or 0
+
+def bump_list_version(db: Session, list_id: int) -> int:
+    """
+    Increments the list's content version in the caller's transaction (the caller commits)
+    and returns it. Called by every mutation below, which implicitly invalidates caches keyed
+    by the version, and announces the change to live subscribers once committed.
+    (Per-row `version` columns are separate: they guard individual rows against lost updates.)
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        insert_ = sqlite_insert if dialect == "sqlite" else postgresql_insert
+        stmt = insert_(models.ListVersion).values(list_id=list_id, version=1)
+        version = db.execute(stmt.on_conflict_do_update(
+            index_elements=[models.ListVersion.list_id], set_={"version": models.ListVersion.version + 1}
+        ).returning(models.ListVersion.version)).scalar_one()
+    else:
+        updated = db.execute(
+            update(models.ListVersion).where(models.ListVersion.list_id == list_id).values(version=models.ListVersion.version + 1)
+        ).rowcount
+        if not updated:
+            db.add(models.ListVersion(list_id=list_id, version=1))
+        db.flush()
+        version = get_list_version(db, list_id)
+    events.publish_on_commit(db, {"type": "changed", "list_id": list_id, "version": version})
+    return version
+
+def get_list_version_rows_for_user(db: Session, user_id: int) -> list:
+    """(list_id, version) of every list the user is a member of; version is None if never bumped."""
+    return db.execute(
+        select(models.ListMember.list_id, models.ListVersion.version)
+        .outerjoin(models.ListVersion, models.ListVersion.list_id == models.ListMember.list_id)
+        .where(models.ListMember.user_id == user_id)
+        .order_by(models.ListMember.list_id)
+    ).all()
+
+def get_list_outline_rows(db: Session, list_ids: List[int]) -> tuple:
+    """
+    Names of the given lists and of their categories, as untracked `Row`s:
+    ([(id, name, list_type)], [(list_id, category_id, category_name)]).
+    """
+    if not list_ids:
+        return [], []
+    lists = db.execute(
+        select(models.ShoppingList.id, models.ShoppingList.name, models.ShoppingList.list_type)
+        .where(models.ShoppingList.id.in_(list_ids))
+        .order_by(models.ShoppingList.name)
+    ).all()
+    categories = db.execute(
+        select(models.Category.list_id, models.Category.id, models.Category.name)
+        .where(models.Category.list_id.in_(list_ids))
+        .order_by(models.Category.name)
+    ).all()
+    return lists, categories
+
 def check_user_list_access(db: Session, list_id: int, user_id: int) -> bool:
     """Checks if a user is a member of a specific list."""
     return db.query(models.ListMember).filter(
@@ -165,6 +314,25 @@ def get_categories_for_list(db: Session, list_id: int) -> List[models.Category]:
         selectinload(models.Category.updater)  # Eager load updater
         ).filter(models.Category.list_id == list_id).order_by(models.Category.name).all()
 
+def get_category_rows_for_list(db: Session, list_id: int) -> list:
+    """
+    Read-only variant of `get_categories_for_list`: the columns `schemas.Category` needs,
+    with creator/updater joined in the same query, as untracked `Row`s.
+    """
+    Creator, Updater = aliased(models.User), aliased(models.User)
+    return db.execute(
+        select(
+            models.Category.id, models.Category.name, models.Category.list_id,
+            models.Category.created_at, models.Category.updated_at, models.Category.version,
+            Creator.id.label("creator_id"), Creator.username.label("creator_username"),
+            Updater.id.label("updater_id"), Updater.username.label("updater_username"),
+        )
+        .join(Creator, Creator.id == models.Category.created_by_user_id)
+        .outerjoin(Updater, Updater.id == models.Category.updated_by_user_id)
+        .where(models.Category.list_id == list_id)
+        .order_by(models.Category.name)
+    ).all()
+
 def create_category(db: Session, category_data: schemas.CategoryCreate, list_id: int, user_id: int) -> models.Category:
     """Creates a category within a list."""
     db_category = models.Category(
@@ -174,6 +342,7 @@ def create_category(db: Session, category_data: schemas.CategoryCreate, list_id:
         updated_by_user_id=user_id # Initially set updater same as creator
     )
     db.add(db_category)
+    bump_list_version(db, list_id)
     try:
         db.commit()
         db.refresh(db_category)
@@ -183,8 +352,9 @@ def create_category(db: Session, category_data: schemas.CategoryCreate, list_id:
         db.rollback()
         raise ValueError(f"Category name '{category_data.name}' already exists in this list.")
 
-def update_category(db: Session, db_category: models.Category, category_update: schemas.CategoryUpdate, user_id: int) -> models.Category:
-    """Updates a category's name."""
+def update_category(db: Session, db_category: models.Category, category_update: schemas.CategoryUpdate, user_id: int, expected_version: Optional[int] = None) -> models.Category:
+    """Updates a category's name. Raises VersionConflictError if `expected_version` is stale."""
+    _check_version(db_category, expected_version)
     update_data = category_update.model_dump(exclude_unset=True)
     if not update_data:
          return db_category # No changes
@@ -192,9 +362,10 @@ def update_category(db: Session, db_category: models.Category, category_update:
     for key, value in update_data.items():
         setattr(db_category, key, value)
     db_category.updated_by_user_id = user_id # Track who updated
+    bump_list_version(db, db_category.list_id)
 
     try:
-        db.commit()
+        _commit_versioned(db, lambda: get_category(db, category_id=db_category.id))
         db.refresh(db_category)
         db.refresh(db_category, attribute_names=['creator', 'updater']) # Refresh relations
         return db_category
@@ -202,13 +373,26 @@ def update_category(db: Session, db_category: models.Category, category_update:
         db.rollback()
         raise ValueError(f"Category name '{category_update.name}' already exists in this list.")
 
-def delete_category(db: Session, db_category: models.Category):
-    """Deletes a category if it has no items."""
-    # Check items - using lazy='dynamic' allows efficient count
-    if db_category.items.count() > 0:
+def category_has_items(db: Session, category_id: int) -> bool:
+    """Checks for at least one item without counting them all."""
+    return db.query(models.Item.id).filter(models.Item.category_id == category_id).first() is not None
+
+def delete_category(db: Session, db_category: models.Category, expected_version: Optional[int] = None):
+    """Deletes a category if it has no items. Raises VersionConflictError if `expected_version` is stale."""
+    _check_version(db_category, expected_version)
+    if category_has_items(db, db_category.id):
         raise ValueError("Cannot delete category: it has associated items.")
-    db.delete(db_category)
+    # Set-based delete skips the ORM cascade loading the (empty) dynamic items relationship
+    deleted = db.execute(
+        delete(models.Category).where(models.Category.id == db_category.id, models.Category.version == db_category.version),
+        execution_options={"synchronize_session": False},
+    ).rowcount
+    if not deleted: # Renamed or deleted since it was loaded
+        db.rollback()
+        raise VersionConflictError(get_category(db, category_id=db_category.id))
+    bump_list_version(db, db_category.list_id)
     db.commit()
+    db.expunge(db_category)
 
 
 # --- Item CRUD (Updated) ---
@@ -229,6 +413,47 @@ def get_items_for_list(db: Session, list_id: int) -> List[models.Item]:
         selectinload(models.Item.updater)
         ).filter(models.Category.list_id == list_id).order_by(models.Category.name, models.Item.name).all() # Order by cat then item
 
+def get_item_rows_for_list(db: Session, list_id: int) -> list:
+    """
+    Read-only variant of `get_items_for_list`: one query selecting the columns `schemas.Item`
+    needs (including its category and the four creator/updater users), as untracked `Row`s.
+    """
+    ItemCreator, ItemUpdater = aliased(models.User), aliased(models.User)
+    CategoryCreator, CategoryUpdater = aliased(models.User), aliased(models.User)
+    return db.execute(
+        select(
+            models.Item.id, models.Item.name, models.Item.note, models.Item.price_match, models.Item.is_ticked,
+            models.Item.created_at, models.Item.updated_at, models.Item.version, models.Item.category_id,
+            ItemCreator.id.label("creator_id"), ItemCreator.username.label("creator_username"),
+            ItemUpdater.id.label("updater_id"), ItemUpdater.username.label("updater_username"),
+            models.Category.name.label("category_name"), models.Category.list_id,
+            models.Category.created_at.label("category_created_at"), models.Category.updated_at.label("category_updated_at"),
+            models.Category.version.label("category_version"),
+            CategoryCreator.id.label("category_creator_id"), CategoryCreator.username.label("category_creator_username"),
+            CategoryUpdater.id.label("category_updater_id"), CategoryUpdater.username.label("category_updater_username"),
+        )
+        .join(models.Category, models.Category.id == models.Item.category_id)
+        .join(ItemCreator, ItemCreator.id == models.Item.created_by_user_id)
+        .outerjoin(ItemUpdater, ItemUpdater.id == models.Item.updated_by_user_id)
+        .join(CategoryCreator, CategoryCreator.id == models.Category.created_by_user_id)
+        .outerjoin(CategoryUpdater, CategoryUpdater.id == models.Category.updated_by_user_id)
+        .where(models.Category.list_id == list_id)
+        .order_by(models.Category.name, models.Item.name)
+    ).all()
+
+def stream_item_export_rows(db: Session, list_id: int, chunk_size: int = 1000):
+    """
+    (category_name, name, note, price_match, is_ticked) of every item of the list, ordered by
+    category, fetched `chunk_size` rows at a time from a server-side cursor where supported.
+    """
+    return db.execute(
+        select(models.Category.name, models.Item.name, models.Item.note, models.Item.price_match, models.Item.is_ticked)
+        .join(models.Category, models.Category.id == models.Item.category_id)
+        .where(models.Category.list_id == list_id)
+        .order_by(models.Category.name, models.Item.id)
+        .execution_options(stream_results=True, yield_per=chunk_size)
+    )
+
 def create_item(db: Session, item_data: schemas.ItemCreate, user_id: int) -> models.Item:
     """Creates an item, ensuring category exists."""
     db_category = get_category(db, item_data.category_id)
@@ -244,6 +469,7 @@ def create_item(db: Session, item_data: schemas.ItemCreate, user_id: int) -> mod
         updated_by_user_id=user_id # Initially set updater
     )
     db.add(db_item)
+    bump_list_version(db, db_category.list_id)
     db.commit()
     db.refresh(db_item)
     # Eager load for response
@@ -251,8 +477,9 @@ def create_item(db: Session, item_data: schemas.ItemCreate, user_id: int) -> mod
     db.refresh(db_item.category, attribute_names=['list']) # Ensure list is loaded on category
     return db_item
 
-def update_item(db: Session, db_item: models.Item, item_update: schemas.ItemUpdate, user_id: int) -> models.Item:
-    """Updates an item."""
+def update_item(db: Session, db_item: models.Item, item_update: schemas.ItemUpdate, user_id: int, expected_version: Optional[int] = None) -> models.Item:
+    """Updates an item. Raises VersionConflictError if `expected_version` is stale."""
+    _check_version(db_item, expected_version)
     update_data = item_update.model_dump(exclude_unset=True)
     if not update_data:
         return db_item # No actual changes
@@ -269,8 +496,9 @@ def update_item(db: Session, db_item: models.Item, item_update: schemas.ItemUpda
     for key, value in update_data.items():
         setattr(db_item, key, value)
     db_item.updated_by_user_id = user_id # Track updater
+    bump_list_version(db, db_item.category.list_id)
 
-    db.commit()
+    _commit_versioned(db, lambda: get_item(db, item_id=db_item.id))
     db.refresh(db_item)
     # Eager load for response
     db.refresh(db_item, attribute_names=['category', 'creator', 'updater'])
@@ -278,15 +506,33 @@ def update_item(db: Session, db_item: models.Item, item_update: schemas.ItemUpda
     return db_item
 
 
-def delete_item(db: Session, db_item: models.Item):
-    """Deletes an item."""
+def delete_item(db: Session, db_item: models.Item, expected_version: Optional[int] = None):
+    """Deletes an item. Raises VersionConflictError if `expected_version` is stale."""
     # Permission check happens in the endpoint
+    _check_version(db_item, expected_version)
+    item_id = db_item.id
+    bump_list_version(db, db_item.category.list_id)
     db.delete(db_item)
+    _commit_versioned(db, lambda: get_item(db, item_id=item_id))
+
+def delete_items_for_list(db: Session, list_id: int, ticked_only: bool = False) -> int:
+    """Deletes all (or only ticked) items of a list in one statement. Returns the number of deleted items."""
+    # Permission check happens in the endpoint
+    stmt = delete(models.Item).where(
+        models.Item.category_id.in_(select(models.Category.id).where(models.Category.list_id == list_id))
+    )
+    if ticked_only:
+        stmt = stmt.where(models.Item.is_ticked.is_(True))
+    result = db.execute(stmt, execution_options={"synchronize_session": False})
+    if result.rowcount:
+        bump_list_version(db, list_id)
     db.commit()
+    return result.rowcount
 
 # --- Helper to find item by name within a list (for chat) ---
 def find_item_by_name_in_list(db: Session, list_id: int, item_name: str) -> Optional[models.Item]:
+     # Exact, case-insensitive match; ilike would treat '%' and '_' in the name as wildcards
      return db.query(models.Item).join(models.Item.category)\
-         .filter(models.Category.list_id == list_id, models.Item.name.ilike(item_name))\
+         .filter(models.Category.list_id == list_id, func.lower(models.Item.name) == item_name.lower())\
          .options(joinedload(models.Item.category))\
          .first()
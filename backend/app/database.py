@@ -1,23 +1,95 @@
-from sqlalchemy import create_engine
+import contextlib
+import logging
+import random
+from typing import Callable, Optional
+
+from sqlalchemy import Delete, Insert, Update, create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from app.core.config import settings
 
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False} if SQLALCHEMY_DATABASE_URL.startswith("sqlite") else {}
-)
+def _create_engine(url: str):
+    return create_engine(url, connect_args={"check_same_thread": False} if url.startswith("sqlite") else {})
+
+engine = _create_engine(SQLALCHEMY_DATABASE_URL)
+replica_engines = [_create_engine(url) for url in settings.DATABASE_REPLICA_URLS]
+
+
+# --- Read Replica Routing ---
+# Sessions use the primary unless marked with `use_replica` (read-only endpoints and chat
+# tools). Once a session writes, it stays on the primary for the rest of its life, so a
+# request reads its own writes even if the replicas lag.
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if not replica_engines:
+            return super().get_bind(mapper=mapper, clause=clause, **kw)
+        if self._flushing or isinstance(clause, (Insert, Update, Delete)):
+            self.info["wrote"] = True
+        if self.info.get("replica") and not self.info.get("wrote"):
+            if "replica_engine" not in self.info: # One replica per session, so its reads are consistent
+                self.info["replica_engine"] = random.choice(replica_engines)
+            return self.info["replica_engine"]
+        return engine
+
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, bind=engine)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def use_replica(db: Session):
+    """Routes the session's reads to a replica (if configured) until it writes."""
+    db.info["replica"] = True
+
+@contextlib.contextmanager
+def replica_reads(db: Session, caught_up: Optional[Callable[[Session], bool]] = None):
+    """
+    Routes the reads inside the block to a replica, unless the session has written or
+    `caught_up(db)` (run on the replica) says it lags behind what the caller already saw.
+    Objects loaded there are expired afterwards, so later writes work on primary data.
+    """
+    if not replica_engines or db.info.get("wrote") or db.info.get("replica"):
+        yield db
+        return
+    db.info["replica"] = True
+    try:
+        if caught_up is not None and not caught_up(db):
+            db.info["replica"] = False
+        yield db
+    finally:
+        db.info["replica"] = False
+        db.expire_all()
 
 Base = declarative_base()
 
+logger = logging.getLogger(__name__)
+
 def init_db():
-    print("Initializing database...")
+    """
+    Creates or upgrades the schema by running the migrations (see app.migrations). Failures
+    are logged and re-raised: nothing should start against a half-migrated schema.
+    """
+    from app.migrations import upgrade_database
+    logger.info("Initializing database...")
     try:
-        Base.metadata.create_all(bind=engine)
-        print("Database tables created successfully.")
-    except Exception as e:
-        print(f"Error creating database tables: {e}")
+        upgrade_database()
+    except Exception:
+        logger.exception("Error migrating the database")
+        raise
+    logger.info("Database schema is up to date.")
+
+def add_missing_columns(connection):
+    """
+    Adds the columns with a server default (e.g. the row `version`s) that databases created
+    by create_all before migrations existed may lack, so they match the baseline revision.
+    """
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or column.server_default is None or not isinstance(column.server_default.arg, str):
+                continue
+            column_type = column.type.compile(dialect=connection.dialect)
+            null = "" if column.nullable else " NOT NULL"
+            connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}{null} DEFAULT '{column.server_default.arg}'"))
+            logger.info("Added column %s.%s", table.name, column.name)
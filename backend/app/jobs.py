@@ -0,0 +1,17 @@
+from sqlalchemy.orm import Session
+
+from app import crud, models
+from app.core.background import job_queue
+
+# --- Background Job Handlers ---
+# Handlers receive their own session plus the JSON payload given to `job_queue.enqueue`.
+# They may run more than once (retries, reclaimed leases), so keep them idempotent.
+
+@job_queue.task("purge_shopping_list")
+def purge_shopping_list(db: Session, list_id: int):
+    """Deletes a list and its categories/items after it was detached in the request."""
+    db_list = db.get(models.ShoppingList, list_id) # No need for the eager loads of get_shopping_list
+    if db_list is None:
+        return # Already purged
+    crud.delete_shopping_list(db, db_list=db_list)
+
@@ -1,12 +1,36 @@
+import time
+_import_started = time.perf_counter() # Startup timing includes the imports below
+
+import logging
+import os
 import pathlib
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 
+from app.core import cache
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
-from app.database import init_db
-from app.api.endpoints import items, categories, chat, login, shopping_lists, users
+from app.core.events import broker, create_backend as create_events_backend, end_streams_on_exit_signal
+from app.core.log import RequestIdMiddleware, setup_logging
+from app.core.responses import FastJSONResponse
+from app.database import engine, init_db, replica_engines
+from app.api.endpoints import items, categories, chat, events, login, shopping_lists, sync, transfer, users
+from app.core.background import job_queue
+from app.core.metrics import MetricsMiddleware, instrument_engine, render_metrics
+from app.core.profiler import QueryProfilerMiddleware, install_profiler
+from app.core.static import FrontendFiles
+from app import jobs # noqa: F401 -- registers background job handlers
+
+_imports_done = time.perf_counter()
+
+# --------------------------
+# Logging Configuration
+# --------------------------
+setup_logging()
+settings.log_warnings()
+logger = logging.getLogger(__name__)
 
 # --------------------------
 # Frontend Configuration
@@ -14,7 +38,42 @@ from app.api.endpoints import items, categories, chat, login, shopping_lists, us
 APP_DIR = pathlib.Path(__file__).resolve().parent
 PROJECT_ROOT = APP_DIR.parent.parent
 FRONTEND_DIST_DIR = PROJECT_ROOT / "frontend" / "dist"
-INDEX_HTML_PATH = FRONTEND_DIST_DIR / "index.html"
+
+# --------------------------
+# Application Lifespan
+# --------------------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema work and background threads run here rather than at import, so importing
+    # the app (tests, tooling, the pre-fork launcher) stays cheap.
+    timings = {"imports": _imports_done - _import_started}
+
+    phase_started = time.perf_counter()
+    if settings.DB_INIT_ON_STARTUP:
+        init_db()
+    if settings.DB_SCHEMA_CHECK_ON_STARTUP:
+        from app.migrations import check_schema # Imports alembic; only needed here
+        check_schema() # Raises, so the worker doesn't start against a drifted schema
+    timings["db_init"] = time.perf_counter() - phase_started
+
+    phase_started = time.perf_counter()
+    job_queue.start()
+    timings["background_workers"] = time.perf_counter() - phase_started
+
+    cache.start(cache.create_backend(settings.CACHE_BACKEND_URL))
+    broker.start(create_events_backend(settings.EVENTS_BACKEND_URL))
+    end_streams_on_exit_signal()
+
+    total_ms = (time.perf_counter() - _import_started) * 1000
+    logger.info(
+        "Worker %s ready in %.0f ms", os.getpid(), total_ms,
+        extra={"startup_ms": {phase: round(seconds * 1000, 1) for phase, seconds in timings.items()}},
+    )
+    yield
+    logger.info("Worker %s shutting down", os.getpid())
+    job_queue.stop()
+    broker.stop()
+    cache.stop()
 
 # --------------------------
 # Application Configuration
@@ -23,14 +82,10 @@ app = FastAPI(
     title=settings.PROJECT_NAME,
     description="API for managing shared/private grocery lists with AI chat integration.",
     version=settings.PROJECT_VERSION,
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse if settings.FAST_JSON_ENABLED else JSONResponse,
 )
 
-# --------------------------
-# Database Initialization
-# --------------------------
-# TODO: Alembic migration
-init_db()
-
 # --------------------------
 # Middleware Configuration
 # --------------------------
@@ -49,6 +104,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compression Middleware
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
+# SQL Profiler Middleware
+if settings.SQL_PROFILER_ENABLED:
+    for db_engine in [engine, *replica_engines]:
+        install_profiler(db_engine)
+    app.add_middleware(QueryProfilerMiddleware)
+
+# Metrics Middleware (added last so it wraps everything else)
+if settings.METRICS_ENABLED:
+    instrument_engine(engine)
+    for replica_engine in replica_engines:
+        instrument_engine(replica_engine, pool_gauge=False)
+    app.add_middleware(MetricsMiddleware)
+
+# Request ID Middleware (outermost, so everything logged while serving a request carries its id)
+app.add_middleware(RequestIdMiddleware)
+
 # --------------------------
 # API Routes Configuration
 # --------------------------
@@ -78,6 +153,24 @@ app.include_router(
     tags=["Categories"]
 )
 
+app.include_router(
+    sync.router,
+    prefix=f"{api_prefix}/lists/{{list_id}}/sync",
+    tags=["Sync"]
+)
+
+app.include_router(
+    events.router,
+    prefix=f"{api_prefix}/lists/{{list_id}}/events",
+    tags=["Events"]
+)
+
+app.include_router(
+    transfer.router,
+    prefix=f"{api_prefix}/lists/{{list_id}}",
+    tags=["Export/Import"]
+)
+
 app.include_router(
     items.router,
     prefix=f"{api_prefix}/items",
@@ -91,25 +184,26 @@ app.include_router(
 )
 
 # --------------------------
-# Static Files Configuration
+# Metrics Endpoint
 # --------------------------
-# Serve React frontend build files
-app.mount("/", StaticFiles(directory=FRONTEND_DIST_DIR, html=True), name="static")
-
-# Catch-all route for client-side routing
-@app.get("/{full_path:path}")
-async def catch_all(full_path: str):
-    try:
-        return FileResponse(INDEX_HTML_PATH)
-    except FileNotFoundError:
-        raise HTTPException(status_code=404, detail="File not found")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
-    
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", tags=["Metrics"], response_class=PlainTextResponse, include_in_schema=False)
+    def metrics(): # Sync, so the queue gauges' database query runs in the threadpool
+        return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
 
 # --------------------------
-# Root Endpoint
+# Static Files Configuration
 # --------------------------
-@app.get("/", tags=["Root"])
-async def read_root():
-    return {"message": f"Welcome to the {settings.PROJECT_NAME}!"}
+# Serve React frontend build files (optional, e.g. API-only deployments and tests).
+# FrontendFiles also answers client-side routes with the in-memory SPA shell.
+if FRONTEND_DIST_DIR.is_dir():
+    app.mount("/", FrontendFiles(FRONTEND_DIST_DIR), name="frontend")
+else:
+    logger.warning("Frontend build not found at %s; serving the API only.", FRONTEND_DIST_DIR)
+
+    # --------------------------
+    # Root Endpoint
+    # --------------------------
+    @app.get("/", tags=["Root"])
+    async def read_root():
+        return {"message": f"Welcome to the {settings.PROJECT_NAME}!"}
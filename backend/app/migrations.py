@@ -0,0 +1,110 @@
+"""
+Schema migrations (Alembic, scripts in backend/migrations) and the startup schema check.
+
+The CLI is Alembic's own, run from the backend directory (`alembic upgrade head`,
+`alembic revision --autogenerate -m ...`, `alembic check`). The app uses this module to
+upgrade on startup (DB_INIT_ON_STARTUP) and to refuse to start on schema drift.
+"""
+import logging
+import pathlib
+
+from alembic import command, op
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect
+
+from app.database import Base, engine
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = pathlib.Path(__file__).resolve().parent.parent
+# Schema of databases created with create_all before migrations existed
+BASELINE_REVISION = "0001"
+
+
+def alembic_config(connection=None) -> Config:
+    config = Config(str(BACKEND_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(BACKEND_DIR / "migrations"))
+    config.attributes["configure_logger"] = False # Keep the app's logging setup
+    if connection is not None:
+        config.attributes["connection"] = connection
+    return config
+
+
+def upgrade_database():
+    """
+    Upgrades the database to the latest revision. A database created by create_all before
+    migrations existed is first brought to the baseline schema and stamped, so it is then
+    upgraded like any other.
+    """
+    from app import models # noqa: F401 -- registers the tables on Base.metadata
+    from app.database import add_missing_columns
+
+    with engine.begin() as connection:
+        inspector = inspect(connection)
+        if inspector.has_table("users") and not inspector.has_table("alembic_version"):
+            logger.info("Adopting a database created without migrations (stamping revision %s)", BASELINE_REVISION)
+            Base.metadata.create_all(bind=connection) # Tables added since it was created
+            add_missing_columns(connection)
+            command.stamp(alembic_config(connection), BASELINE_REVISION)
+    # Not engine.begin(): Alembic manages the transactions (one per migration), which
+    # online index builds need to step out of
+    with engine.connect() as connection:
+        command.upgrade(alembic_config(connection), "head")
+
+
+def schema_problems() -> list:
+    """
+    Differences between the database and the models/migrations, as readable strings:
+    a revision other than the latest one, then whatever autogenerate would change.
+    """
+    from app import models # noqa: F401
+
+    head = ScriptDirectory.from_config(alembic_config()).get_current_head()
+    with engine.connect() as connection:
+        context = MigrationContext.configure(connection, opts={"compare_type": True})
+        current = context.get_current_revision()
+        problems = []
+        if current != head:
+            problems.append(f"database is at revision {current or 'none'}, the latest is {head} (run 'alembic upgrade head')")
+        problems.extend(_describe(diff) for diff in compare_metadata(context, Base.metadata))
+    return problems
+
+def _describe(diff) -> str:
+    """'add_index ix_items_name', 'modify_nullable items note True False', ... from an autogenerate diff."""
+    if isinstance(diff, list): # Changes to one column come grouped
+        return "; ".join(_describe(part) for part in diff)
+    kind, *args = diff
+    return " ".join([kind] + [str(getattr(arg, "name", arg)) for arg in args if arg is not None and not isinstance(arg, dict)])
+
+
+def check_schema():
+    """Raises RuntimeError if the database schema doesn't match the code, so the app doesn't start on it."""
+    problems = schema_problems()
+    if problems:
+        raise RuntimeError(
+            "Database schema does not match the application (set DB_SCHEMA_CHECK_ON_STARTUP=false to skip this check):\n- "
+            + "\n- ".join(problems)
+        )
+
+
+# --- Online Schema Changes (for use in migration scripts) ---
+# Postgres builds these without blocking writes (CONCURRENTLY), which can't run inside a
+# transaction, so they run in an autocommit block: keep them in their own migration,
+# apart from other changes. Other databases use a plain (blocking) CREATE/DROP INDEX.
+
+def create_index_online(index_name: str, table_name: str, columns: list, **kw):
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.create_index(index_name, table_name, columns, postgresql_concurrently=True, if_not_exists=True, **kw)
+    else:
+        op.create_index(index_name, table_name, columns, if_not_exists=True, **kw)
+
+def drop_index_online(index_name: str, table_name: str, **kw):
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.drop_index(index_name, table_name=table_name, postgresql_concurrently=True, if_exists=True, **kw)
+    else:
+        op.drop_index(index_name, table_name=table_name, if_exists=True, **kw)
@@ -1,5 +1,5 @@
 from sqlalchemy import (
-    Boolean, Column, ForeignKey, Integer, String, DateTime, func,
+    Boolean, Column, ForeignKey, Integer, String, DateTime, Text, func,
     UniqueConstraint
 )
 from sqlalchemy.orm import relationship
@@ -50,6 +50,10 @@ class ShoppingList(Base):
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
+    # Row version for optimistic concurrency: every ORM UPDATE/DELETE is issued as
+    # "... WHERE id = ? AND version = ?" and increments it (StaleDataError if it changed)
+    version = Column(Integer, nullable=False, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
 
     # Relationships
     categories = relationship("Category", back_populates="list", cascade="all, delete-orphan", lazy="dynamic") # Use lazy loading if lists can have many categories
@@ -63,7 +67,7 @@ class ListMember(Base):
     __tablename__ = "list_members"
 
     list_id = Column(Integer, ForeignKey("lists.id", ondelete="CASCADE"), primary_key=True)
-    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True, index=True) # The PK only covers lookups by list_id
     added_at = Column(DateTime(timezone=True), server_default=func.now())
 
     list = relationship("ShoppingList", back_populates="members")
@@ -73,6 +77,41 @@ class ListMember(Base):
         return f"<ListMember(list_id={self.list_id}, user_id={self.user_id})>"
 
 
+class ListVersion(Base):
+    """
+    Counter bumped by every crud mutation of a list or its categories/items, so caches can
+    key on (list_id, version) instead of being invalidated explicitly.
+    """
+    __tablename__ = "list_versions"
+
+    list_id = Column(Integer, ForeignKey("lists.id", ondelete="CASCADE"), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ListVersion(list_id={self.list_id}, version={self.version})>"
+
+
+class SyncOperation(Base):
+    """
+    Client operations applied through the sync endpoint, keyed by the client-generated op id.
+    A retried batch (lost response, flaky connection) finds its ops here and gets the original
+    results back instead of applying them twice. `row_id` also resolves references to rows
+    created by earlier ops.
+    """
+    __tablename__ = "sync_operations"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    op_id = Column(String(64), primary_key=True)
+    list_id = Column(Integer, nullable=False)
+    status = Column(String, nullable=False) # 'applied', 'merged' or 'rejected'
+    row_id = Column(Integer, nullable=True) # Row created or changed by the op
+    detail = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+    def __repr__(self):
+        return f"<SyncOperation(user_id={self.user_id}, op_id='{self.op_id}', status='{self.status}')>"
+
+
 class Category(Base):
     __tablename__ = "categories"
     __table_args__ = (UniqueConstraint('list_id', 'name', name='uq_category_list_name'),) # Unique name within a list
@@ -80,7 +119,7 @@ class Category(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True, nullable=False)
 
-    list_id = Column(Integer, ForeignKey("lists.id"), nullable=False)
+    list_id = Column(Integer, ForeignKey("lists.id"), nullable=False, index=True)
     list = relationship("ShoppingList", back_populates="categories")
 
     created_by_user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -90,6 +129,8 @@ class Category(Base):
     updated_by_user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     updater = relationship("User", back_populates="updated_categories", foreign_keys=[updated_by_user_id])
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
+    version = Column(Integer, nullable=False, server_default="1") # See ShoppingList.version
+    __mapper_args__ = {"version_id_col": version}
 
     items = relationship("Item", back_populates="category", cascade="all, delete-orphan", lazy="dynamic") # Use lazy loading
 
@@ -110,7 +151,7 @@ class Item(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
 
-    category_id = Column(Integer, ForeignKey("categories.id"), nullable=False)
+    category_id = Column(Integer, ForeignKey("categories.id"), nullable=False, index=True)
     category = relationship("Category", back_populates="items")
 
     # Creator (replaces owner)
@@ -121,9 +162,31 @@ class Item(Base):
     updated_by_user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     updater = relationship("User", back_populates="updated_items", foreign_keys=[updated_by_user_id])
 
+    version = Column(Integer, nullable=False, server_default="1") # See ShoppingList.version
+    __mapper_args__ = {"version_id_col": version}
+
     def __repr__(self):
         return f"<Item(id={self.id}, name='{self.name}', ticked={self.is_ticked}, category_id={self.category_id}, creator_id={self.created_by_user_id})>"
 
+class BackgroundJob(Base):
+    __tablename__ = "background_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False, index=True)
+    payload = Column(Text, nullable=False, default="{}") # JSON-encoded keyword arguments
+    status = Column(String, nullable=False, default='pending', index=True) # 'pending', 'running', 'done' or 'failed'
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    last_error = Column(Text, nullable=True)
+
+    run_at = Column(DateTime(timezone=True), nullable=False, index=True) # Not picked up before this time (used for retry backoff)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<BackgroundJob(id={self.id}, name='{self.name}', status='{self.status}', attempts={self.attempts})>"
+
 # Drop old columns if necessary (using migrations is better)
 # Note: If you are just recreating the DB via init_db, these renames won't matter as much,
 # but it's good practice. The key is the ForeignKey and relationship setup.
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, ConfigDict, Field
-from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, Field, StrictInt
+from typing import Any, Dict, List, Literal, Optional, Union
 import datetime
 
 # --- User Schemas (Minor adjustments maybe needed for nesting) ---
@@ -55,6 +55,7 @@ class ShoppingList(ShoppingListBase):
     owner: UserInfo # Nested owner info
     created_at: datetime.datetime
     updated_at: datetime.datetime
+    version: int # Send back in If-Match to update only if unchanged
     members: List[ShoppingListMemberInfo] = [] # Include members
     model_config = ConfigDict(from_attributes=True)
 
@@ -83,6 +84,7 @@ class Category(CategoryBase):
     list_id: int
     created_at: datetime.datetime
     updated_at: Optional[datetime.datetime] = None
+    version: int # Send back in If-Match to update only if unchanged
     creator: UserInfo
     updater: Optional[UserInfo] = None
     # list: SimpleListInfo # Avoid deep nesting unless needed
@@ -115,6 +117,7 @@ class Item(ItemBase):
     id: int
     created_at: datetime.datetime
     updated_at: Optional[datetime.datetime] = None # Make optional if not updated yet
+    version: int # Send back in If-Match to update only if unchanged
     category: Category # Nested category info
     creator: UserInfo # Nested creator info
     updater: Optional[UserInfo] = None # Nested updater info (optional)
@@ -140,3 +143,50 @@ class ChatMessageOutput(BaseModel):
 
 class ChatResponse(BaseModel):
     message: ChatMessageOutput
+
+# --- Sync Schemas ---
+SyncOperationType = Literal["add_item", "update_item", "delete_item", "add_category", "update_category", "delete_category"]
+
+class SyncOperationIn(BaseModel):
+    op_id: str = Field(min_length=1, max_length=64) # Client-generated (e.g. a UUID), unique per user
+    type: SyncOperationType
+    # Target row of update/delete ops: a server id, or the op_id of the op that created the row.
+    # `data.category_id` may reference a category created by an earlier op the same way.
+    id: Optional[Union[StrictInt, str]] = None # Strict: true/false are not ids
+    version: Optional[int] = None # Row version the update/delete is based on; a mismatch is a conflict
+    data: Dict[str, Any] = {}
+
+class SyncRequest(BaseModel):
+    base_version: Optional[int] = None # List version of the client's last sync; None on first sync
+    operations: List[SyncOperationIn] = []
+
+class SyncOperationResult(BaseModel):
+    op_id: str
+    status: str # 'applied', 'merged' (matched an existing row), 'conflict' or 'rejected'
+    id: Optional[int] = None # Server id of the created/changed row
+    version: Optional[int] = None # Row version after the op (not repeated for duplicates)
+    detail: Optional[str] = None
+    duplicate: bool = False # Op id seen in an earlier sync: not applied again, status is the original one
+
+class SyncResponse(BaseModel):
+    version: int # Pass as base_version next time
+    results: List[SyncOperationResult]
+    # Server state of the list, sent only when others changed it since base_version
+    changed: bool
+    categories: Optional[List[Category]] = None
+    items: Optional[List[Item]] = None
+
+# --- List Export/Import Schemas ---
+# One record per NDJSON line; items refer to their category by name, so files move between instances
+class ListExportCategory(CategoryBase):
+    type: Literal["category"] = "category"
+
+class ListExportItem(ItemBase):
+    type: Literal["item"] = "item"
+    category: str
+
+class ListImportResult(BaseModel):
+    categories_created: int
+    items_created: int
+    items_skipped: int # Already in the list (same name in the same category)
+    version: int
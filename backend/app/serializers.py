@@ -0,0 +1,85 @@
+"""
+Direct row-to-dict serializers for the hot collection endpoints.
+
+They take the column-projected `Row`s of the `crud.get_*_rows_*` queries and produce
+exactly the shape of the matching pydantic schemas (`schemas.Item`, `schemas.ShoppingList`,
+...) without building an ORM entity or pydantic model per row. With FAST_JSON_ENABLED they
+are rendered by `FastJSONResponse` directly. Keep them in sync when a schema changes.
+"""
+
+def _user(id_, username):
+    return {"username": username, "id": id_} if id_ is not None else None
+
+
+# Rows are unpacked positionally (much faster than attribute access on `Row`), so the
+# tuples below must follow the column order of the matching crud query.
+
+def category_row_to_dict(row) -> dict:
+    """Row from `crud.get_category_rows_for_list`."""
+    id_, name, list_id, created_at, updated_at, version, creator_id, creator_username, updater_id, updater_username = row
+    return {
+        "name": name,
+        "id": id_,
+        "list_id": list_id,
+        "created_at": created_at,
+        "updated_at": updated_at,
+        "version": version,
+        "creator": _user(creator_id, creator_username),
+        "updater": _user(updater_id, updater_username),
+    }
+
+def item_rows_to_dict(rows) -> dict:
+    """Rows from `crud.get_item_rows_for_list`, in the shape of `schemas.ItemListResponse`."""
+    categories = {}
+    items = []
+    for (
+        id_, name, note, price_match, is_ticked, created_at, updated_at, version, category_id,
+        creator_id, creator_username, updater_id, updater_username,
+        category_name, list_id, category_created_at, category_updated_at, category_version,
+        category_creator_id, category_creator_username, category_updater_id, category_updater_username,
+    ) in rows:
+        category = categories.get(category_id)
+        if category is None: # Shared by every item of the category
+            category = categories[category_id] = {
+                "name": category_name,
+                "id": category_id,
+                "list_id": list_id,
+                "created_at": category_created_at,
+                "updated_at": category_updated_at,
+                "version": category_version,
+                "creator": _user(category_creator_id, category_creator_username),
+                "updater": _user(category_updater_id, category_updater_username),
+            }
+        items.append({
+            "name": name,
+            "note": note,
+            "price_match": price_match,
+            "is_ticked": is_ticked,
+            "id": id_,
+            "created_at": created_at,
+            "updated_at": updated_at,
+            "version": version,
+            "category": category,
+            "creator": _user(creator_id, creator_username),
+            "updater": _user(updater_id, updater_username),
+        })
+    return {"items": items}
+
+def shopping_list_rows_to_dicts(list_rows, member_rows) -> list:
+    """Rows from `crud.get_shopping_list_rows_for_user` and `crud.get_member_rows_for_lists`."""
+    members = {}
+    for list_id, added_at, user_id, username in member_rows:
+        members.setdefault(list_id, []).append({"user": {"username": username, "id": user_id}, "added_at": added_at})
+    return [
+        {
+            "name": name,
+            "list_type": list_type,
+            "id": id_,
+            "owner": {"username": owner_username, "id": owner_id},
+            "created_at": created_at,
+            "updated_at": updated_at,
+            "version": version,
+            "members": members.get(id_, []),
+        }
+        for id_, name, list_type, created_at, updated_at, version, owner_id, owner_username in list_rows
+    ]
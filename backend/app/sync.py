@@ -0,0 +1,220 @@
+"""
+Applies batches of offline client operations to a list (see the sync endpoint).
+
+Operations are applied in order in the caller's transaction; nothing is committed here.
+Conflicts with changes made by others while the client was offline are resolved per operation:
+
+- an update or delete carrying the row `version` it was based on is a 'conflict' if the
+  row changed since (the current row is in the delta);
+- otherwise updates apply only the fields they carry, so edits of different fields both
+  survive (the last sync wins for the same field);
+- deleting a row that is already gone succeeds;
+- updating a row that was deleted is rejected (the delta tells the client it is gone);
+- adding a category or an item whose name already exists merges into the existing row.
+
+Each op id is recorded in `sync_operations`, so a retried batch is not applied twice; retried
+ops get their original status back, flagged `duplicate`.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import delete, func
+from sqlalchemy.orm import Session
+
+from app import crud, models, schemas
+from app.core.config import settings
+
+
+class Rejected(Exception):
+    """An operation that cannot be applied; reported to the client, the rest of the batch goes on."""
+    status = "rejected"
+
+class Conflict(Rejected):
+    status = "conflict"
+
+
+def _validate(schema, data: dict):
+    try:
+        return schema(**data)
+    except ValidationError as e:
+        raise Rejected("Invalid data: " + "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+
+def _resolve(value, created: Dict[str, Optional[int]], kind: str) -> int:
+    """Server id for a target given as a server id or as the op id of the op that created it."""
+    if isinstance(value, bool): # bool is an int subclass: true would mean id 1
+        raise Rejected(f"Invalid {kind} id {value!r}.")
+    if isinstance(value, int):
+        return value
+    if value is None:
+        raise Rejected(f"Missing {kind} id.")
+    row_id = created.get(value)
+    if row_id is None:
+        raise Rejected(f"Unknown {kind} reference '{value}'.")
+    return row_id
+
+def _check_version(row, op):
+    if op.version is not None and row.version != op.version:
+        raise Conflict(f"Changed by someone else (now at version {row.version}, the change was based on {op.version}).")
+
+def _category(db: Session, list_id: int, category_id: int) -> Optional[models.Category]:
+    category = db.get(models.Category, category_id)
+    return category if category is not None and category.list_id == list_id else None
+
+def _item(db: Session, list_id: int, item_id: int) -> Optional[models.Item]:
+    return db.query(models.Item).join(models.Item.category)\
+        .filter(models.Item.id == item_id, models.Category.list_id == list_id).first()
+
+
+# --- Operation Handlers ---
+# Each returns (status, row id, row version, whether the list changed) or raises Rejected.
+# Flushing a changed row runs its compare-and-swap UPDATE (see ShoppingList.version).
+
+def _add_category(db, user, list_id, op, created):
+    category_in = _validate(schemas.CategoryCreate, op.data)
+    existing = crud.get_category_by_name(db, list_id=list_id, name=category_in.name)
+    if existing is not None:
+        return "merged", existing.id, existing.version, False
+    category = models.Category(name=category_in.name, list_id=list_id, created_by_user_id=user.id, updated_by_user_id=user.id)
+    db.add(category)
+    db.flush()
+    return "applied", category.id, category.version, True
+
+def _update_category(db, user, list_id, op, created):
+    category = _category(db, list_id, _resolve(op.id, created, "category"))
+    if category is None:
+        raise Rejected("Category no longer exists.")
+    _check_version(category, op)
+    update_data = _validate(schemas.CategoryUpdate, op.data).model_dump(exclude_unset=True)
+    if update_data.get("name") is None or update_data["name"] == category.name:
+        return "applied", category.id, category.version, False
+    if crud.get_category_by_name(db, list_id=list_id, name=update_data["name"]) is not None:
+        raise Rejected(f"Category name '{update_data['name']}' already exists in this list.")
+    category.name = update_data["name"]
+    category.updated_by_user_id = user.id
+    db.flush()
+    return "applied", category.id, category.version, True
+
+def _delete_category(db, user, list_id, op, created):
+    category = _category(db, list_id, _resolve(op.id, created, "category"))
+    if category is None:
+        return "applied", None, None, False # Already deleted
+    _check_version(category, op)
+    if crud.category_has_items(db, category.id):
+        raise Rejected("Cannot delete category: it has associated items.")
+    db.delete(category)
+    db.flush()
+    return "applied", category.id, None, True
+
+def _add_item(db, user, list_id, op, created):
+    data = dict(op.data)
+    data["category_id"] = _resolve(data.get("category_id"), created, "category")
+    item_in = _validate(schemas.ItemCreate, data)
+    if _category(db, list_id, item_in.category_id) is None:
+        raise Rejected("Category no longer exists.")
+    existing = db.query(models.Item).filter(
+        models.Item.category_id == item_in.category_id, func.lower(models.Item.name) == item_in.name.lower()
+    ).first()
+    if existing is not None:
+        # Added again while offline: the item is needed, so put it back on the list
+        if existing.is_ticked and not item_in.is_ticked:
+            existing.is_ticked = False
+            existing.updated_by_user_id = user.id
+            db.flush()
+            return "merged", existing.id, existing.version, True
+        return "merged", existing.id, existing.version, False
+    item = models.Item(**item_in.model_dump(), created_by_user_id=user.id, updated_by_user_id=user.id)
+    db.add(item)
+    db.flush()
+    return "applied", item.id, item.version, True
+
+def _update_item(db, user, list_id, op, created):
+    item = _item(db, list_id, _resolve(op.id, created, "item"))
+    if item is None:
+        raise Rejected("Item no longer exists.")
+    _check_version(item, op)
+    data = dict(op.data)
+    if "category_id" in data:
+        data["category_id"] = _resolve(data["category_id"], created, "category")
+    update_data = _validate(schemas.ItemUpdate, data).model_dump(exclude_unset=True)
+    if update_data.get("category_id") is not None and _category(db, list_id, update_data["category_id"]) is None:
+        raise Rejected("Category no longer exists.")
+    # Fields the op sent as null are cleared if the column allows it (e.g. note); otherwise ignored
+    update_data = {
+        key: value for key, value in update_data.items()
+        if (value is not None or models.Item.__table__.c[key].nullable) and getattr(item, key) != value
+    }
+    if not update_data:
+        return "applied", item.id, item.version, False
+    for key, value in update_data.items():
+        setattr(item, key, value)
+    item.updated_by_user_id = user.id
+    db.flush()
+    return "applied", item.id, item.version, True
+
+def _delete_item(db, user, list_id, op, created):
+    item = _item(db, list_id, _resolve(op.id, created, "item"))
+    if item is None:
+        return "applied", None, None, False # Already deleted
+    _check_version(item, op)
+    db.delete(item)
+    db.flush()
+    return "applied", item.id, None, True
+
+_HANDLERS = {
+    "add_category": _add_category,
+    "update_category": _update_category,
+    "delete_category": _delete_category,
+    "add_item": _add_item,
+    "update_item": _update_item,
+    "delete_item": _delete_item,
+}
+
+
+def apply_operations(db: Session, user: models.User, list_id: int, operations: List[schemas.SyncOperationIn]) -> Tuple[List[dict], bool]:
+    """
+    Applies `operations` in order without committing. Returns one result dict per operation
+    (in the shape of `schemas.SyncOperationResult`) and whether any of them changed the list.
+    """
+    # Ops seen before (retries) and rows created by earlier syncs that this batch refers to
+    referenced = {op.op_id for op in operations}
+    for op in operations:
+        for value in (op.id, op.data.get("category_id")):
+            if isinstance(value, str):
+                referenced.add(value)
+    previous = {
+        row.op_id: row for row in db.query(models.SyncOperation).filter(
+            models.SyncOperation.user_id == user.id, models.SyncOperation.op_id.in_(referenced)
+        )
+    }
+    created = {op_id: row.row_id for op_id, row in previous.items() if row.status not in ("rejected", "conflict")}
+
+    results = []
+    changed = False
+    for op in operations:
+        if op.op_id in previous:
+            prior = previous[op.op_id]
+            # Reported with the status it got the first time, so the client knows whether it ever applied
+            results.append({"op_id": op.op_id, "status": prior.status, "id": prior.row_id, "version": None, "detail": prior.detail, "duplicate": True})
+            continue
+        try:
+            status, row_id, version, op_changed = _HANDLERS[op.type](db, user, list_id, op, created)
+            detail = None
+        except Rejected as e:
+            status, row_id, version, op_changed, detail = e.status, None, None, False, str(e)
+        changed = changed or op_changed
+        if status in ("applied", "merged"):
+            created[op.op_id] = row_id
+        record = models.SyncOperation(user_id=user.id, op_id=op.op_id, list_id=list_id, status=status, row_id=row_id, detail=detail)
+        db.add(record)
+        previous[op.op_id] = record # The same op id twice in one batch is applied once
+        results.append({"op_id": op.op_id, "status": status, "id": row_id, "version": version, "detail": detail, "duplicate": False})
+    return results, changed
+
+def prune_operations(db: Session, user_id: int):
+    """Forgets the user's op ids older than SYNC_OP_RETENTION_DAYS (in the caller's transaction)."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.SYNC_OP_RETENTION_DAYS)
+    db.execute(
+        delete(models.SyncOperation).where(models.SyncOperation.user_id == user_id, models.SyncOperation.created_at < cutoff),
+        execution_options={"synchronize_session": False},
+    )
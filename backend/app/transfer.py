@@ -0,0 +1,189 @@
+"""
+List export and import (see the list transfer endpoints), in two formats:
+
+- NDJSON: a `{"type": "list", ...}` header line, then one line per category and per item
+  (`schemas.ListExportCategory` / `schemas.ListExportItem`);
+- CSV: `category,name,note,price_match,is_ticked` rows, one per item; a row without a name
+  is an empty category.
+
+Items refer to their category by name, so a file can be imported into any list on any
+instance. Exports stream from the database cursor and imports insert in chunks, so neither
+holds a whole list in memory.
+"""
+import csv
+import io
+import json
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from app import crud, models, schemas
+
+CSV_COLUMNS = ["category", "name", "note", "price_match", "is_ticked"]
+# Spreadsheets run cells starting with these as formulas; exported text cells get a leading
+# quote, which the import strips again. Text already starting with a quote gets another one, so
+# stripping is exact.
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+ESCAPED_PREFIXES = FORMULA_PREFIXES + ("'",)
+
+def _csv_text(value: str) -> str:
+    return "'" + value if value.startswith(ESCAPED_PREFIXES) else value
+
+def _csv_unescape(value: str) -> str:
+    return value[1:] if value.startswith("'") and value[1:].startswith(ESCAPED_PREFIXES) else value
+
+
+# --- Export ---
+
+def _category_names(db: Session, list_id: int, empty_only: bool = False) -> Iterator[str]:
+    query = select(models.Category.name).where(models.Category.list_id == list_id)
+    if empty_only:
+        query = query.where(~select(models.Item.id).where(models.Item.category_id == models.Category.id).exists())
+    return db.scalars(query.order_by(models.Category.name))
+
+def export_ndjson(db: Session, db_list: models.ShoppingList, chunk_size: int) -> Iterator[bytes]:
+    header = {"type": "list", "name": db_list.name, "list_type": db_list.list_type, "version": crud.get_list_version(db, db_list.id)}
+    yield (json.dumps(header) + "\n").encode("utf-8")
+    for name in _category_names(db, db_list.id):
+        yield (json.dumps({"type": "category", "name": name}) + "\n").encode("utf-8")
+    lines = []
+    for category, name, note, price_match, is_ticked in crud.stream_item_export_rows(db, db_list.id, chunk_size):
+        lines.append(json.dumps({"type": "item", "category": category, "name": name, "note": note,
+                                 "price_match": price_match, "is_ticked": is_ticked}))
+        if len(lines) >= chunk_size:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+def export_csv(db: Session, db_list: models.ShoppingList, chunk_size: int) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    for name in _category_names(db, db_list.id, empty_only=True):
+        writer.writerow([_csv_text(name), "", "", "", ""])
+    rows = 0
+    for category, name, note, price_match, is_ticked in crud.stream_item_export_rows(db, db_list.id, chunk_size):
+        writer.writerow([_csv_text(category), _csv_text(name), _csv_text(note or ""), str(price_match).lower(), str(is_ticked).lower()])
+        rows += 1
+        if rows % chunk_size == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+# --- Import ---
+
+def read_ndjson(text: Iterable[str]) -> Iterator[Tuple[int, dict]]:
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError:
+            raise ValueError(f"Line {line_number}: not valid JSON.")
+
+def read_csv(text: Iterable[str]) -> Iterator[Tuple[int, dict]]:
+    reader = csv.DictReader(text)
+    try:
+        if reader.fieldnames is None or not {"category", "name"} <= set(reader.fieldnames):
+            raise ValueError(f"CSV header must include 'category' and 'name' (columns: {', '.join(CSV_COLUMNS)}).")
+        for row in reader:
+            record = {key: _csv_unescape(value) for key, value in row.items() if key in CSV_COLUMNS and value not in (None, "")}
+            record["type"] = "item" if record.get("name") else "category"
+            if record["type"] == "category":
+                record = {"type": "category", "name": record.get("category", "")}
+            yield reader.line_num, record
+    except csv.Error as e: # Malformed CSV, e.g. an oversized field, in the row after the last one read
+        raise ValueError(f"Line {reader.line_num + 1}: invalid CSV ({e}).")
+
+def _parse(line_number: int, record) -> BaseModel:
+    if not isinstance(record, dict):
+        raise ValueError(f"Line {line_number}: expected an object.")
+    schema = {"category": schemas.ListExportCategory, "item": schemas.ListExportItem}.get(record.get("type"))
+    if schema is None:
+        raise ValueError(f"Line {line_number}: unknown record type {record.get('type')!r}.")
+    try:
+        parsed = schema(**record)
+    except ValidationError as e:
+        raise ValueError(f"Line {line_number}: " + "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+    if not parsed.name.strip() or (schema is schemas.ListExportItem and not parsed.category.strip()):
+        raise ValueError(f"Line {line_number}: names must not be empty.")
+    return parsed
+
+
+class _Importer:
+    """Adds records to a list in the caller's transaction, inserting items `chunk_size` at a time."""
+
+    def __init__(self, db: Session, list_id: int, user_id: int, chunk_size: int):
+        self.db = db
+        self.list_id = list_id
+        self.user_id = user_id
+        self.chunk_size = chunk_size
+        self.categories: Dict[str, int] = dict(self.db.execute(
+            select(models.Category.name, models.Category.id).where(models.Category.list_id == list_id)
+        ).all())
+        self.pending: List[schemas.ListExportItem] = []
+        self.result = {"categories_created": 0, "items_created": 0, "items_skipped": 0}
+
+    def category_id(self, name: str) -> int:
+        if name not in self.categories:
+            category = models.Category(name=name, list_id=self.list_id, created_by_user_id=self.user_id, updated_by_user_id=self.user_id)
+            self.db.add(category)
+            self.db.flush()
+            self.categories[name] = category.id
+            self.result["categories_created"] += 1
+        return self.categories[name]
+
+    def add(self, record):
+        if isinstance(record, schemas.ListExportCategory):
+            self.category_id(record.name)
+            return
+        self.pending.append(record)
+        if len(self.pending) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        chunk, self.pending = self.pending, []
+        keyed = [(self.category_id(item.category), item) for item in chunk]
+        # Items already in the list (same name, case-insensitive, same category) are skipped, as in sync
+        existing = set(self.db.execute(
+            select(models.Item.category_id, func.lower(models.Item.name)).where(
+                models.Item.category_id.in_({category_id for category_id, _ in keyed}),
+                func.lower(models.Item.name).in_({item.name.lower() for _, item in keyed}),
+            )
+        ).all())
+        rows = []
+        for category_id, item in keyed:
+            key = (category_id, item.name.lower())
+            if key in existing:
+                self.result["items_skipped"] += 1
+                continue
+            existing.add(key) # Also skips repeats within the file
+            rows.append({"name": item.name, "note": item.note, "price_match": item.price_match, "is_ticked": item.is_ticked,
+                         "category_id": category_id, "created_by_user_id": self.user_id, "updated_by_user_id": self.user_id})
+        if rows:
+            self.db.execute(insert(models.Item), rows)
+            self.result["items_created"] += len(rows)
+
+
+def import_records(db: Session, list_id: int, user_id: int, records: Iterable[Tuple[int, dict]], chunk_size: int) -> dict:
+    """
+    Adds the records' categories and items to the list without committing: categories are
+    matched by name and created if missing, items already in their category are skipped.
+    Raises ValueError (naming the line) on the first invalid record.
+    """
+    importer = _Importer(db, list_id, user_id, chunk_size)
+    for line_number, record in records:
+        if isinstance(record, dict) and record.get("type") == "list":
+            continue # Export header
+        importer.add(_parse(line_number, record))
+    importer.flush()
+    if importer.result["categories_created"] or importer.result["items_created"]:
+        crud.bump_list_version(db, list_id)
+    return importer.result
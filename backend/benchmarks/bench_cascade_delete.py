@@ -0,0 +1,93 @@
+"""
+Compares deleting a large shopping list through the ORM cascade with the
+set-based `crud.delete_shopping_list`.
+
+Usage: python benchmarks/bench_cascade_delete.py --items 5000 --categories 20
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Point the app at a throwaway database before anything from 'app' is imported
+_tmp_dir = tempfile.mkdtemp(prefix="bench_cascade_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp_dir, 'bench.db')}"
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from sqlalchemy import event, insert
+
+from app import crud, models
+from app.database import Base, SessionLocal, engine
+
+
+def seed_list(db, owner_id: int, n_categories: int, n_items: int) -> int:
+    db_list = models.ShoppingList(name="Bench list", list_type="shared", owner_id=owner_id)
+    db.add(db_list)
+    db.flush()
+    db.add(models.ListMember(list_id=db_list.id, user_id=owner_id))
+    categories = [models.Category(name=f"Category {i}", list_id=db_list.id, created_by_user_id=owner_id) for i in range(n_categories)]
+    db.add_all(categories)
+    db.flush()
+    db.execute(insert(models.Item), [
+        {"name": f"Item {i}", "category_id": categories[i % n_categories].id, "created_by_user_id": owner_id}
+        for i in range(n_items)
+    ])
+    db.commit()
+    return db_list.id
+
+
+def orm_cascade_delete(db, db_list):
+    """The previous implementation: let the ORM cascade walk every child row."""
+    db.delete(db_list)
+    db.commit()
+
+
+def measure(label: str, delete_func, owner_id: int, n_categories: int, n_items: int):
+    db = SessionLocal()
+    try:
+        list_id = seed_list(db, owner_id, n_categories, n_items)
+        db_list = db.get(models.ShoppingList, list_id)
+
+        statements = 0
+        def count_statement(*args):
+            nonlocal statements
+            statements += 1
+        event.listen(engine, "before_cursor_execute", count_statement)
+        start = time.perf_counter()
+        try:
+            delete_func(db, db_list)
+        finally:
+            elapsed = time.perf_counter() - start
+            event.remove(engine, "before_cursor_execute", count_statement)
+
+        assert db.query(models.Item).count() == 0, "items left behind"
+        print(f"{label:<14} {elapsed * 1000:>10.1f} ms {statements:>10} statements")
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark shopping list deletion.")
+    parser.add_argument("--items", type=int, default=5000, help="Items in the list")
+    parser.add_argument("--categories", type=int, default=20, help="Categories the items are spread over")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    owner = models.User(username="bench", hashed_password="-")
+    db.add(owner)
+    db.commit()
+    owner_id = owner.id
+    db.close()
+
+    print(f"Deleting a list with {args.categories} categories and {args.items} items ({engine.url})")
+    print(f"{'strategy':<14} {'time':>13} {'queries':>21}")
+    measure("orm cascade", orm_cascade_delete, owner_id, args.categories, args.items)
+    measure("set-based", crud.delete_shopping_list, owner_id, args.categories, args.items)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Measures response compression on the largest list payloads: the items of one big
+list (ItemListResponse), one list with its members and GET /lists/ (List[ShoppingList])
+for a user on many lists. For every payload it reports the compressed size and the
+time to compress it at several gzip levels and brotli qualities (if `brotli` is
+installed), plus end-to-end latency through CompressionMiddleware at the configured
+settings.
+
+Usage: python benchmarks/bench_compression.py --items 1000 --lists 50
+"""
+import argparse
+import asyncio
+import gzip
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Point the app at a throwaway database before anything from 'app' is imported
+_tmp_dir = tempfile.mkdtemp(prefix="bench_compression_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp_dir, 'bench.db')}"
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import seed as seeding # noqa: E402
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+API = "/api/v1"
+GZIP_LEVELS = (1, 4, 6, 9)
+BROTLI_QUALITIES = (1, 4, 6, 11)
+
+
+def time_ms(func, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def report_payload(label: str, body: bytes, repeat: int):
+    print(f"\n{label}: {len(body) / 1024:.1f} KiB uncompressed")
+    print(f"  {'codec':<12} {'size KiB':>10} {'ratio':>8} {'compress ms':>13}")
+    for level in GZIP_LEVELS:
+        size = len(gzip.compress(body, compresslevel=level))
+        ms = time_ms(lambda: gzip.compress(body, compresslevel=level), repeat)
+        print(f"  {f'gzip -{level}':<12} {size / 1024:>10.1f} {len(body) / size:>7.1f}x {ms:>13.3f}")
+    if brotli is None:
+        print("  brotli: not installed (pip install brotli), skipped")
+        return
+    for quality in BROTLI_QUALITIES:
+        size = len(brotli.compress(body, quality=quality))
+        ms = time_ms(lambda: brotli.compress(body, quality=quality), repeat)
+        print(f"  {f'br q{quality}':<12} {size / 1024:>10.1f} {len(body) / size:>7.1f}x {ms:>13.3f}")
+
+
+async def fetch(client, url, token, encoding, repeat):
+    headers = {"Authorization": f"Bearer {token}", "Accept-Encoding": encoding}
+    latencies, wire_size = [], 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = await client.get(url, headers=headers)
+        latencies.append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+        wire_size = int(response.headers.get("content-length", len(response.content)))
+    return statistics.median(latencies), wire_size, response.content
+
+
+async def run(args):
+    import httpx
+
+    from app.core.config import settings
+    from app.main import app
+
+    # A user who is a member of every list gets the largest GET /lists/ payload
+    manifest = seeding.seed(
+        users=args.lists, lists_per_user=1, members_per_list=args.lists,
+        categories_per_list=args.categories, items_per_category=max(1, args.items // args.categories), seed=42,
+    )
+    big_list = manifest["lists"][0]
+    username = big_list["owner"]
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            response = await client.post(f"{API}/login/token", data={"username": username, "password": manifest["password"]})
+            token = response.json()["access_token"]
+
+            endpoints = {
+                f"GET /items/ ({len(big_list['item_ids'])} items)": f"{API}/items/?list_id={big_list['id']}",
+                f"GET /lists/{{id}} ({args.lists} members)": f"{API}/lists/{big_list['id']}",
+                f"GET /lists/ ({len(manifest['lists'])} lists)": f"{API}/lists/",
+            }
+            print(f"Middleware settings: min size {settings.COMPRESSION_MINIMUM_SIZE} B, gzip level "
+                  f"{settings.COMPRESSION_GZIP_LEVEL}, brotli quality {settings.COMPRESSION_BROTLI_QUALITY} "
+                  f"({'available' if brotli else 'not installed'})")
+            encodings = ["identity", "gzip"] + (["br"] if brotli else [])
+            for label, url in endpoints.items():
+                body = None
+                print(f"\n{label}")
+                for encoding in encodings:
+                    ms, wire_size, content = await fetch(client, url, token, encoding, args.repeat)
+                    body = body or content
+                    print(f"  {encoding:<10} {wire_size / 1024:>9.1f} KiB on the wire {ms:>9.2f} ms median")
+                report_payload(label, body, args.repeat)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark response compression on large list payloads.")
+    parser.add_argument("--items", type=int, default=1000, help="Items in the largest list")
+    parser.add_argument("--categories", type=int, default=20, help="Categories the items are spread over")
+    parser.add_argument("--lists", type=int, default=50, help="Lists (and members per list) for GET /lists/")
+    parser.add_argument("--repeat", type=int, default=20, help="Repetitions per measurement (median reported)")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Microbenchmark of the item collection response encoding at 10, 100 and 1000 items:
+
+- pydantic:  ORM entities -> schemas.ItemListResponse -> dict -> stdlib json (FastAPI's default path)
+- direct:    column-projected rows -> app.serializers dicts -> FastJSONResponse (orjson if installed)
+
+Data is loaded once per size, so only the conversion and encoding are timed. Both
+paths are checked to produce the same JSON document.
+
+Usage: python benchmarks/bench_json_encoding.py --sizes 10,100,1000 --repeat 50
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Point the app at a throwaway database before anything from 'app' is imported
+_tmp_dir = tempfile.mkdtemp(prefix="bench_json_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp_dir, 'bench.db')}"
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from fastapi.responses import JSONResponse
+from sqlalchemy import insert
+
+from app import crud, models, schemas, serializers
+from app.core import responses
+from app.core.responses import FastJSONResponse
+from app.database import Base, SessionLocal, engine
+
+
+def seed_list(db, owner_id: int, n_items: int, n_categories: int = 8) -> int:
+    db_list = models.ShoppingList(name=f"Bench list {n_items}", list_type="shared", owner_id=owner_id)
+    db.add(db_list)
+    db.flush()
+    categories = [models.Category(name=f"Category {i}", list_id=db_list.id, created_by_user_id=owner_id) for i in range(n_categories)]
+    db.add_all(categories)
+    db.flush()
+    db.execute(insert(models.Item), [
+        {"name": f"Item {i}", "note": "note" if i % 5 == 0 else None, "category_id": categories[i % n_categories].id,
+         "created_by_user_id": owner_id, "updated_by_user_id": owner_id if i % 3 == 0 else None}
+        for i in range(n_items)
+    ])
+    db.commit()
+    return db_list.id
+
+
+def pydantic_path(items) -> bytes:
+    model = schemas.ItemListResponse.model_validate({"items": items}, from_attributes=True)
+    return JSONResponse(model.model_dump(mode="json")).body
+
+def direct_path(rows) -> bytes:
+    return FastJSONResponse(serializers.item_rows_to_dict(rows)).body
+
+
+def time_ms(func, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark item collection JSON encoding.")
+    parser.add_argument("--sizes", default="10,100,1000", help="Comma separated item counts")
+    parser.add_argument("--repeat", type=int, default=50, help="Repetitions per measurement (median reported)")
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    owner = models.User(username="bench", hashed_password="-")
+    db.add(owner)
+    db.commit()
+
+    print(f"Encoder for the direct path: {'orjson' if responses.orjson is not None else 'stdlib json (orjson not installed)'}")
+    print(f"{'items':>6} {'pydantic ms':>13} {'direct ms':>11} {'speedup':>9} {'bytes':>10}")
+    for size in sizes:
+        list_id = seed_list(db, owner.id, size)
+        items = crud.get_items_for_list(db, list_id=list_id)
+        for item in items: # Load lazy relationships up front so only encoding is timed
+            item.category.creator, item.category.updater
+        rows = crud.get_item_rows_for_list(db, list_id=list_id)
+
+        slow, fast = pydantic_path(items), direct_path(rows)
+        assert json.loads(slow) == json.loads(fast), "direct serializer output differs from the pydantic schema"
+
+        slow_ms = time_ms(lambda: pydantic_path(items), args.repeat)
+        fast_ms = time_ms(lambda: direct_path(rows), args.repeat)
+        print(f"{size:>6} {slow_ms:>13.3f} {fast_ms:>11.3f} {slow_ms / fast_ms:>8.1f}x {len(fast):>10}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
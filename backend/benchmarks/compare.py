@@ -0,0 +1,48 @@
+"""
+Compares two load_test.py result files scenario by scenario.
+
+Usage: python benchmarks/compare.py results/<before>.json results/<after>.json
+"""
+import argparse
+import json
+
+
+def _delta(before, after):
+    if before in (None, 0) or after is None:
+        return "    n/a"
+    return f"{(after - before) / before * 100:>+6.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    print(f"before: {before['meta']['commit']} {before['meta']['timestamp']} {before['meta']['label']}")
+    print(f"after:  {after['meta']['commit']} {after['meta']['timestamp']} {after['meta']['label']}")
+    if before["meta"]["dataset"] != after["meta"]["dataset"] or before["meta"]["concurrency"] != after["meta"]["concurrency"]:
+        print("WARNING: runs used different datasets or concurrency; deltas are not comparable.")
+    print(f"{'scenario':<16} {'rps':>20} {'p50 ms':>22} {'p95 ms':>22} {'queries':>16}")
+
+    for name, a in after["scenarios"].items():
+        b = before["scenarios"].get(name)
+        if b is None:
+            print(f"{name:<16} (new)")
+            continue
+        print(
+            f"{name:<16} "
+            f"{b['throughput_rps'] or 0:>7.1f} -> {a['throughput_rps'] or 0:>7.1f} {_delta(b['throughput_rps'], a['throughput_rps'])}  "
+            f"{b['latency_ms']['p50'] or 0:>6.2f} -> {a['latency_ms']['p50'] or 0:>6.2f} {_delta(b['latency_ms']['p50'], a['latency_ms']['p50'])}  "
+            f"{b['latency_ms']['p95'] or 0:>6.2f} -> {a['latency_ms']['p95'] or 0:>6.2f} {_delta(b['latency_ms']['p95'], a['latency_ms']['p95'])}  "
+            f"{b['queries_per_request'] if b['queries_per_request'] is not None else '-':>5} -> {a['queries_per_request'] if a['queries_per_request'] is not None else '-':>5}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""
+Drives every REST endpoint at a controlled concurrency and reports throughput,
+latency percentiles and database queries per request. Results are written as
+JSON (one file per run, tagged with the git commit) so runs can be compared
+with benchmarks/compare.py.
+
+In-process (default): seeds a throwaway SQLite database and calls the app through
+httpx's ASGI transport with the SQL profiler on, so queries per request are exact.
+
+    python benchmarks/load_test.py --concurrency 16 --requests 500
+
+Against a running server (seed it first with benchmarks/seed.py; start the server
+with SQL_PROFILER_ENABLED=true to get query counts and RATE_LIMIT_ENABLED=false so
+the login scenario isn't throttled):
+
+    python benchmarks/load_test.py --base-url http://127.0.0.1:8000 --manifest bench_manifest.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import seed as seeding # noqa: E402
+
+API = "/api/v1"
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+# --------------------------
+# Scenarios
+# --------------------------
+# Each scenario builds one request from (context, request number) and returns
+# (method, url, kwargs, username). Write scenarios draw from pools in the context
+# so they never collide with each other.
+
+def _list_for(ctx, n):
+    return ctx["lists"][n % len(ctx["lists"])]
+
+def _member_of(ctx, entry):
+    return ctx["usernames"][entry["member_ids"][0]]
+
+def scenario_login(ctx, n):
+    user = ctx["manifest"]["users"][n % len(ctx["manifest"]["users"])]
+    return "POST", f"{API}/login/token", {"data": {"username": user["username"], "password": ctx["manifest"]["password"]}}, None
+
+def scenario_users_me(ctx, n):
+    entry = _list_for(ctx, n)
+    return "GET", f"{API}/users/me", {}, _member_of(ctx, entry)
+
+def scenario_read_lists(ctx, n):
+    entry = _list_for(ctx, n)
+    return "GET", f"{API}/lists/", {}, _member_of(ctx, entry)
+
+def scenario_read_list(ctx, n):
+    entry = _list_for(ctx, n)
+    return "GET", f"{API}/lists/{entry['id']}", {}, _member_of(ctx, entry)
+
+def scenario_read_categories(ctx, n):
+    entry = _list_for(ctx, n)
+    return "GET", f"{API}/lists/{entry['id']}/categories/", {}, _member_of(ctx, entry)
+
+def scenario_read_items(ctx, n):
+    entry = _list_for(ctx, n)
+    return "GET", f"{API}/items/", {"params": {"list_id": entry["id"]}}, _member_of(ctx, entry)
+
+def scenario_read_item(ctx, n):
+    entry = _list_for(ctx, n)
+    return "GET", f"{API}/items/{entry['item_ids'][n % len(entry['item_ids'])]}", {}, _member_of(ctx, entry)
+
+def scenario_create_item(ctx, n):
+    entry = _list_for(ctx, n)
+    category_id = entry["category_ids"][n % len(entry["category_ids"])]
+    return "POST", f"{API}/items/", {"json": {"name": f"Load item {n}", "category_id": category_id}}, _member_of(ctx, entry)
+
+def scenario_update_item(ctx, n):
+    entry = _list_for(ctx, n)
+    item_id = entry["item_ids"][n % len(entry["item_ids"])]
+    return "PUT", f"{API}/items/{item_id}", {"json": {"is_ticked": n % 2 == 0}}, _member_of(ctx, entry)
+
+def scenario_delete_item(ctx, n):
+    # Deletes the items created by the create_item scenario
+    if not ctx["created_items"]:
+        return None
+    item_id, username = ctx["created_items"].pop()
+    return "DELETE", f"{API}/items/{item_id}", {}, username
+
+def scenario_add_member(ctx, n):
+    if not ctx["membership_pool"]:
+        return None
+    entry, user_id = ctx["membership_pool"].pop()
+    ctx["added_members"].append((entry, user_id))
+    return "POST", f"{API}/lists/{entry['id']}/members", {"json": {"username": ctx["usernames"][user_id]}}, entry["owner"]
+
+def scenario_remove_member(ctx, n):
+    if not ctx["added_members"]:
+        return None
+    entry, user_id = ctx["added_members"].pop()
+    return "DELETE", f"{API}/lists/{entry['id']}/members/{user_id}", {}, entry["owner"]
+
+SCENARIOS = {
+    "login": scenario_login,
+    "users_me": scenario_users_me,
+    "read_lists": scenario_read_lists,
+    "read_list": scenario_read_list,
+    "read_categories": scenario_read_categories,
+    "read_items": scenario_read_items,
+    "read_item": scenario_read_item,
+    "create_item": scenario_create_item,
+    "update_item": scenario_update_item,
+    "delete_item": scenario_delete_item,
+    "add_member": scenario_add_member,
+    "remove_member": scenario_remove_member,
+}
+
+
+# --------------------------
+# Runner
+# --------------------------
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+async def run_scenario(client, ctx, name, requests, concurrency):
+    build = SCENARIOS[name]
+    counter = itertools.count()
+    latencies, queries, statuses = [], [], {}
+
+    async def worker():
+        while True:
+            n = next(counter)
+            if n >= requests:
+                return
+            spec = build(ctx, n)
+            if spec is None:
+                return # Pool exhausted
+            method, url, kwargs, username = spec
+            headers = {"Authorization": f"Bearer {ctx['tokens'][username]}"} if username else {}
+            start = time.perf_counter()
+            response = await client.request(method, url, headers=headers, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if "x-db-queries" in response.headers:
+                queries.append(int(response.headers["x-db-queries"]))
+            if name == "create_item" and response.status_code == 201:
+                ctx["created_items"].append((response.json()["id"], username))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    ms = lambda v: round(v * 1000, 3) if v is not None else None
+    return {
+        "requests": len(latencies),
+        "errors": sum(c for s, c in statuses.items() if s >= 400),
+        "status_codes": {str(s): c for s, c in sorted(statuses.items())},
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else None,
+        "latency_ms": {
+            "mean": ms(sum(latencies) / len(latencies)) if latencies else None,
+            "p50": ms(percentile(latencies, 50)),
+            "p95": ms(percentile(latencies, 95)),
+            "p99": ms(percentile(latencies, 99)),
+            "max": ms(latencies[-1] if latencies else None),
+        },
+        "queries_per_request": round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+async def login_all(client, manifest, usernames):
+    tokens = {}
+    for username in usernames:
+        response = await client.post(f"{API}/login/token", data={"username": username, "password": manifest["password"]})
+        response.raise_for_status()
+        tokens[username] = response.json()["access_token"]
+    return tokens
+
+def build_context(manifest, rng):
+    usernames = {u["id"]: u["username"] for u in manifest["users"]}
+    lists = [entry for entry in manifest["lists"] if entry["item_ids"] and entry["category_ids"]]
+    membership_pool = [(entry, uid) for entry in manifest["lists"] for uid in entry["non_member_ids"]]
+    rng.shuffle(membership_pool)
+    return {
+        "manifest": manifest,
+        "usernames": usernames,
+        "lists": lists,
+        "created_items": [],
+        "membership_pool": membership_pool,
+        "added_members": [],
+    }
+
+async def run_all(client, manifest, scenarios, requests, concurrency, seed):
+    ctx = build_context(manifest, random.Random(seed))
+    needed = {ctx["usernames"][e["member_ids"][0]] for e in ctx["lists"]} | {e["owner"] for e in manifest["lists"]}
+    ctx["tokens"] = await login_all(client, manifest, sorted(needed))
+    results = {}
+    for name in scenarios:
+        results[name] = await run_scenario(client, ctx, name, requests, concurrency)
+        r = results[name]
+        print(f"{name:<16} {r['requests']:>6} req {r['throughput_rps'] or 0:>9.1f} rps  "
+              f"p50 {r['latency_ms']['p50'] or 0:>8.2f} ms  p95 {r['latency_ms']['p95'] or 0:>8.2f} ms  "
+              f"p99 {r['latency_ms']['p99'] or 0:>8.2f} ms  queries {r['queries_per_request'] if r['queries_per_request'] is not None else '-':>6}  "
+              f"errors {r['errors']}")
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)), text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the REST API.")
+    parser.add_argument("--base-url", help="Benchmark a running server instead of the app in-process")
+    parser.add_argument("--manifest", help="Manifest written by seed.py (required with --base-url)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent in-flight requests")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma separated subset of: " + ", ".join(SCENARIOS))
+    parser.add_argument("--output", default=RESULTS_DIR, help="Directory for the JSON result file")
+    parser.add_argument("--label", default="", help="Free text stored with the results")
+    seeding.add_dataset_arguments(parser)
+    args = parser.parse_args()
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    import httpx
+
+    if args.base_url:
+        if not args.manifest:
+            parser.error("--manifest is required with --base-url")
+        with open(args.manifest) as f:
+            manifest = json.load(f)
+        target = args.base_url
+
+        async def run():
+            limits = httpx.Limits(max_connections=args.concurrency)
+            async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+                return await run_all(client, manifest, scenarios, args.requests, args.concurrency, args.seed)
+    else:
+        # Configure the app before it is imported: throwaway database, exact query counts, quiet logs
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_load_'), 'bench.db')}"
+        os.environ["SQL_PROFILER_ENABLED"] = "true"
+        os.environ["SQL_PROFILER_SLOW_REQUEST_MS"] = "1e9"
+        os.environ.setdefault("LOG_LEVEL", "ERROR")
+        os.environ["RATE_LIMIT_ENABLED"] = "false" # Every request comes from one client IP
+        manifest = seeding.seed(**seeding.dataset_from_args(args))
+        target = "in-process"
+
+        from app.main import app
+
+        async def run():
+            async with app.router.lifespan_context(app):
+                transport = httpx.ASGITransport(app=app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+                    return await run_all(client, manifest, scenarios, args.requests, args.concurrency, args.seed)
+
+    print(f"Target: {target}, concurrency {args.concurrency}, {args.requests} requests per scenario")
+    results = asyncio.run(run())
+
+    commit = git_commit()
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": commit,
+            "label": args.label,
+            "target": target,
+            "database": manifest.get("database_url"),
+            "python": platform.python_version(),
+            "concurrency": args.concurrency,
+            "requests_per_scenario": args.requests,
+            "dataset": manifest["dataset"],
+        },
+        "scenarios": results,
+    }
+    os.makedirs(args.output, exist_ok=True)
+    path = os.path.join(args.output, f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{commit}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Seeds a database with a synthetic, reproducible dataset for benchmarking and
+writes a manifest (usernames, password, ids) the load test uses to build requests.
+
+Usage: python benchmarks/seed.py --database-url sqlite:///./bench.db --users 50 --items-per-category 20 --manifest manifest.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+BENCH_PASSWORD = "bench-password"
+
+DEFAULT_DATASET = {
+    "users": 20,
+    "lists_per_user": 2,
+    "members_per_list": 3, # Including the owner
+    "categories_per_list": 8,
+    "items_per_category": 15,
+    "seed": 42,
+}
+
+
+def seed(users: int, lists_per_user: int, members_per_list: int, categories_per_list: int,
+         items_per_category: int, seed: int = 42) -> dict:
+    """
+    Creates the tables (if needed) and inserts the dataset with batched inserts.
+    DATABASE_URL must be set before calling, as `app` reads it at import time.
+    """
+    from sqlalchemy import insert, select
+
+    from app import models
+    from app.core.security import get_password_hash
+    from app.database import Base, SessionLocal, engine
+
+    rng = random.Random(seed)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        run_tag = f"{int(time.time())}"
+        hashed_password = get_password_hash(BENCH_PASSWORD) # bcrypt once, shared by every bench user
+        usernames = [f"bench_{run_tag}_{i}" for i in range(users)]
+        db.execute(insert(models.User), [{"username": u, "hashed_password": hashed_password} for u in usernames])
+        user_ids = dict(db.execute(select(models.User.username, models.User.id).where(models.User.username.in_(usernames))).all())
+        id_list = [user_ids[u] for u in usernames]
+
+        lists = []
+        for owner in usernames:
+            for n in range(lists_per_user):
+                db_list = models.ShoppingList(name=f"{owner} list {n}", list_type="shared", owner_id=user_ids[owner])
+                db.add(db_list)
+                lists.append((db_list, owner))
+        db.flush()
+
+        member_rows, manifest_lists = [], []
+        for db_list, owner in lists:
+            others = [u for u in id_list if u != user_ids[owner]]
+            members = [user_ids[owner]] + rng.sample(others, min(len(others), members_per_list - 1))
+            member_rows.extend({"list_id": db_list.id, "user_id": uid} for uid in members)
+            manifest_lists.append({
+                "id": db_list.id,
+                "owner": owner,
+                "member_ids": members,
+                "non_member_ids": [uid for uid in id_list if uid not in members],
+            })
+        db.execute(insert(models.ListMember), member_rows)
+
+        category_rows = [
+            {"name": f"Category {c}", "list_id": entry["id"], "created_by_user_id": user_ids[entry["owner"]]}
+            for entry in manifest_lists for c in range(categories_per_list)
+        ]
+        db.execute(insert(models.Category), category_rows)
+        categories_by_list = {}
+        for cat_id, list_id in db.execute(
+            select(models.Category.id, models.Category.list_id).where(models.Category.list_id.in_([e["id"] for e in manifest_lists]))
+        ):
+            categories_by_list.setdefault(list_id, []).append(cat_id)
+
+        item_rows = []
+        for entry in manifest_lists:
+            entry["category_ids"] = categories_by_list.get(entry["id"], [])
+            for cat_id in entry["category_ids"]:
+                for i in range(items_per_category):
+                    item_rows.append({
+                        "name": f"Item {cat_id}-{i}",
+                        "note": "bench" if rng.random() < 0.2 else None,
+                        "is_ticked": rng.random() < 0.3,
+                        "category_id": cat_id,
+                        "created_by_user_id": rng.choice(entry["member_ids"]),
+                    })
+        if item_rows:
+            db.execute(insert(models.Item), item_rows)
+        db.commit()
+
+        items_by_category = {}
+        for item_id, cat_id in db.execute(
+            select(models.Item.id, models.Item.category_id).where(models.Item.category_id.in_([c for e in manifest_lists for c in e["category_ids"]]))
+        ):
+            items_by_category.setdefault(cat_id, []).append(item_id)
+        for entry in manifest_lists:
+            entry["item_ids"] = [i for c in entry["category_ids"] for i in items_by_category.get(c, [])]
+    finally:
+        db.close()
+
+    return {
+        "database_url": os.environ.get("DATABASE_URL"),
+        "password": BENCH_PASSWORD,
+        "users": [{"id": user_ids[u], "username": u} for u in usernames],
+        "lists": manifest_lists,
+        "dataset": {
+            "users": users,
+            "lists_per_user": lists_per_user,
+            "members_per_list": members_per_list,
+            "categories_per_list": categories_per_list,
+            "items_per_category": items_per_category,
+            "seed": seed,
+        },
+    }
+
+
+def add_dataset_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--users", type=int, default=DEFAULT_DATASET["users"])
+    parser.add_argument("--lists-per-user", type=int, default=DEFAULT_DATASET["lists_per_user"])
+    parser.add_argument("--members-per-list", type=int, default=DEFAULT_DATASET["members_per_list"])
+    parser.add_argument("--categories-per-list", type=int, default=DEFAULT_DATASET["categories_per_list"])
+    parser.add_argument("--items-per-category", type=int, default=DEFAULT_DATASET["items_per_category"])
+    parser.add_argument("--seed", type=int, default=DEFAULT_DATASET["seed"], help="Random seed for reproducible datasets")
+
+def dataset_from_args(args) -> dict:
+    return {
+        "users": args.users,
+        "lists_per_user": args.lists_per_user,
+        "members_per_list": args.members_per_list,
+        "categories_per_list": args.categories_per_list,
+        "items_per_category": args.items_per_category,
+        "seed": args.seed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a database with benchmark data.")
+    parser.add_argument("--database-url", help="Target database (defaults to DATABASE_URL / app settings)")
+    parser.add_argument("--manifest", default="bench_manifest.json", help="Where to write the manifest")
+    add_dataset_arguments(parser)
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+
+    start = time.perf_counter()
+    manifest = seed(**dataset_from_args(args))
+    with open(args.manifest, "w") as f:
+        json.dump(manifest, f)
+    n_items = sum(len(entry["item_ids"]) for entry in manifest["lists"])
+    print(f"Seeded {len(manifest['users'])} users, {len(manifest['lists'])} lists, {n_items} items "
+          f"in {time.perf_counter() - start:.1f}s. Manifest: {args.manifest}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Alembic environment, wired to the app's models and DATABASE_URL.
+
+Used both by the `alembic` CLI and by `app.migrations` at startup; the latter passes its
+own connection and keeps the app's logging setup.
+
+- SQLite can't ALTER most things in place, so migrations run in batch mode there
+  (`op.batch_alter_table` copies the table); on other databases batch ops alter directly.
+- Index changes on busy tables should use `app.migrations.create_index_online` /
+  `drop_index_online`, which build them CONCURRENTLY on Postgres.
+"""
+from logging.config import fileConfig
+
+from alembic import context
+
+from app import models # noqa: F401 -- registers the tables on Base.metadata
+from app.core.config import settings
+from app.database import Base, engine
+
+config = context.config
+
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def _configure_options(dialect_name: str) -> dict:
+    return {
+        "target_metadata": target_metadata,
+        "render_as_batch": dialect_name == "sqlite",
+        "compare_type": True,
+        "transaction_per_migration": True, # Online index builds commit what ran before them
+    }
+
+
+def run_migrations_offline():
+    """Emits the SQL instead of running it (`alembic upgrade head --sql`)."""
+    context.configure(
+        url=settings.DATABASE_URL,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        **_configure_options(engine.dialect.name),
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    connection = config.attributes.get("connection")
+    if connection is not None: # Called from app.migrations
+        context.configure(connection=connection, **_configure_options(connection.dialect.name))
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+    with engine.connect() as connection:
+        context.configure(connection=connection, **_configure_options(connection.dialect.name))
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
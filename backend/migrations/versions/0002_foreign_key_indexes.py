@@ -0,0 +1,31 @@
+"""index the foreign keys used by the hot list/item queries
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 07:20:00.000000
+
+categories.list_id and items.category_id are the join path of every list read, and
+list_members.user_id is how a user's lists are found; none of them were indexed.
+Built online (CONCURRENTLY on Postgres) so writes continue while the indexes build.
+"""
+from alembic import op
+
+from app.migrations import create_index_online, drop_index_online
+
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    create_index_online(op.f('ix_categories_list_id'), 'categories', ['list_id'])
+    create_index_online(op.f('ix_items_category_id'), 'items', ['category_id'])
+    create_index_online(op.f('ix_list_members_user_id'), 'list_members', ['user_id'])
+
+
+def downgrade():
+    drop_index_online(op.f('ix_list_members_user_id'), 'list_members')
+    drop_index_online(op.f('ix_items_category_id'), 'items')
+    drop_index_online(op.f('ix_categories_list_id'), 'categories')
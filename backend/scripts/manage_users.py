@@ -1,4 +1,20 @@
+"""
+User administration for the Grocery App.
+
+Usage:
+    python scripts/manage_users.py add alice
+    python scripts/manage_users.py import users.csv            # columns: username,password[,is_active]
+    python scripts/manage_users.py export users.jsonl --with-hashes
+    python scripts/manage_users.py deactivate bob carol         # or --file usernames.txt
+    python scripts/manage_users.py list --format csv
+
+Files are CSV or JSON Lines, chosen by extension (.jsonl/.ndjson) or --format; '-' is stdin/stdout.
+Imports may carry `hashed_password` (from an export) instead of `password`.
+"""
 import argparse
+import csv
+import json
+from concurrent.futures import ProcessPoolExecutor
 from getpass import getpass # For securely typing password
 import sys
 import os
@@ -7,10 +23,15 @@ import os
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 sys.path.insert(0, project_root)
 
+from sqlalchemy import insert, select, update
+
 from app.database import SessionLocal
 from app import crud, schemas, models
 from app.core.security import get_password_hash
 
+BATCH_SIZE = 500 # Usernames per IN (...) lookup/update
+STREAM_CHUNK = 1000 # Rows fetched at a time by list/export
+
 def add_user(db_session, username, password):
     """Adds a new user to the database."""
     user = crud.get_user_by_username(db_session, username=username)
@@ -25,18 +46,190 @@ def add_user(db_session, username, password):
         print(f"Error creating user: {e}")
         db_session.rollback() # Rollback in case of error during commit
 
-def list_users(db_session):
-    """Lists all users in the database."""
-    users = db_session.query(models.User).all()
-    if not users:
+# --- Files ---
+def _format(path: str, fmt: str = None) -> str:
+    if fmt:
+        return fmt
+    return "jsonl" if path.lower().endswith((".jsonl", ".ndjson")) else "csv"
+
+def _open(path: str, mode: str):
+    if path == "-":
+        return sys.stdin if mode == "r" else sys.stdout
+    return open(path, mode, newline="", encoding="utf-8")
+
+def _read_records(path: str, fmt: str):
+    """Yields (line number, dict) from a CSV (with a header row) or JSON Lines file."""
+    f = _open(path, "r")
+    try:
+        if fmt == "csv":
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record
+        else:
+            for line_number, line in enumerate(f, start=1):
+                if line.strip():
+                    try:
+                        yield line_number, json.loads(line)
+                    except ValueError:
+                        yield line_number, None
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+def _is_true(value) -> bool:
+    return value if isinstance(value, bool) else str(value).strip().lower() in ("1", "true", "yes", "")
+
+
+def _stream_users(db_session, with_hashes: bool = False):
+    """Yields user rows in id order, fetched STREAM_CHUNK at a time instead of loading every User."""
+    columns = [models.User.id, models.User.username, models.User.is_active]
+    if with_hashes:
+        columns.append(models.User.hashed_password)
+    result = db_session.execute(select(*columns).order_by(models.User.id).execution_options(yield_per=STREAM_CHUNK))
+    for row in result:
+        yield row._asdict()
+
+
+def list_users(db_session, fmt: str = "text"):
+    """Lists all users in the database (streamed)."""
+    if fmt != "text":
+        export_users(db_session, "-", fmt)
+        return
+    count = 0
+    for user in _stream_users(db_session):
+        if count == 0:
+            print("Users:")
+            print("-" * 20)
+        print(f"ID: {user['id']}, Username: {user['username']}, Active: {user['is_active']}")
+        count += 1
+    if count == 0:
         print("No users found.")
         return
-    print("Users:")
-    print("-" * 20)
-    for user in users:
-        print(f"ID: {user.id}, Username: {user.username}, Active: {user.is_active}")
     print("-" * 20)
 
+def export_users(db_session, path: str, fmt: str = None, with_hashes: bool = False) -> int:
+    """Writes every user to a CSV or JSON Lines file (or stdout), streaming the rows."""
+    fmt = _format(path, fmt)
+    fieldnames = ["id", "username", "is_active"] + (["hashed_password"] if with_hashes else [])
+    f = _open(path, "w")
+    count = 0
+    try:
+        writer = csv.DictWriter(f, fieldnames=fieldnames) if fmt == "csv" else None
+        if writer:
+            writer.writeheader()
+        for user in _stream_users(db_session, with_hashes):
+            if writer:
+                writer.writerow(user)
+            else:
+                f.write(json.dumps(user) + "\n")
+            count += 1
+    finally:
+        if f is not sys.stdout:
+            f.close()
+    if path != "-":
+        print(f"Exported {count} user(s) to {path}.")
+    return count
+
+
+# --- Bulk Import ---
+def _hash_passwords(passwords: list, workers: int) -> list:
+    """bcrypt is deliberately slow (~0.25 s per hash), so hashes are computed in parallel processes."""
+    if workers <= 1 or len(passwords) <= 1:
+        return [get_password_hash(password) for password in passwords]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(get_password_hash, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+
+def import_users(db_session, path: str, fmt: str = None, workers: int = None) -> bool:
+    """
+    Creates the users of a CSV/JSON Lines file in one transaction. Usernames that already
+    exist are skipped, so an interrupted import can simply be run again. Nothing is written
+    if any row is invalid.
+    """
+    fmt = _format(path, fmt)
+    rows, errors, seen = [], [], set()
+    for line_number, record in _read_records(path, fmt):
+        if not isinstance(record, dict):
+            errors.append(f"line {line_number}: not a JSON object")
+            continue
+        username = (record.get("username") or "").strip()
+        password, hashed_password = record.get("password"), record.get("hashed_password")
+        if not username:
+            errors.append(f"line {line_number}: missing username")
+        elif username in seen:
+            errors.append(f"line {line_number}: duplicate username '{username}'")
+        elif not password and not hashed_password:
+            errors.append(f"line {line_number}: '{username}' has no password")
+        seen.add(username)
+        rows.append({"username": username, "password": password, "hashed_password": hashed_password,
+                     "is_active": _is_true(record.get("is_active", True))})
+    if errors:
+        print(f"Error: {len(errors)} invalid row(s); nothing was imported.")
+        for error in errors[:20]:
+            print(f"  {error}")
+        if len(errors) > 20:
+            print(f"  ... and {len(errors) - 20} more")
+        return False
+
+    usernames = [row["username"] for row in rows]
+    existing = set()
+    for start in range(0, len(usernames), BATCH_SIZE):
+        existing.update(db_session.scalars(
+            select(models.User.username).where(models.User.username.in_(usernames[start:start + BATCH_SIZE]))
+        ))
+    rows = [row for row in rows if row["username"] not in existing]
+    if existing:
+        print(f"Skipping {len(existing)} existing user(s).")
+    if not rows:
+        print("No new users to import.")
+        return True
+
+    to_hash = [row for row in rows if not row["hashed_password"]]
+    workers = workers or os.cpu_count() or 1
+    if to_hash:
+        print(f"Hashing {len(to_hash)} password(s) with {min(workers, len(to_hash))} process(es)...")
+    for row, hashed in zip(to_hash, _hash_passwords([row["password"] for row in to_hash], workers)):
+        row["hashed_password"] = hashed
+
+    try:
+        db_session.execute(insert(models.User), [
+            {"username": row["username"], "hashed_password": row["hashed_password"], "is_active": row["is_active"]} for row in rows
+        ])
+        db_session.commit()
+    except Exception as e:
+        db_session.rollback()
+        print(f"Error importing users: {e}")
+        return False
+    print(f"Imported {len(rows)} user(s).")
+    return True
+
+
+# --- Bulk Activation ---
+def set_users_active(db_session, usernames: list, active: bool) -> bool:
+    """(De)activates the users in one transaction. Deactivated users can't log in or use existing tokens."""
+    usernames = list(dict.fromkeys(u.strip() for u in usernames if u.strip()))
+    found = set()
+    for start in range(0, len(usernames), BATCH_SIZE):
+        batch = usernames[start:start + BATCH_SIZE]
+        found.update(db_session.scalars(select(models.User.username).where(models.User.username.in_(batch))))
+        db_session.execute(update(models.User).where(models.User.username.in_(batch)).values(is_active=active))
+    db_session.commit()
+    missing = [u for u in usernames if u not in found]
+    print(f"{'Activated' if active else 'Deactivated'} {len(found)} user(s).")
+    if missing:
+        print(f"Not found: {', '.join(missing[:20])}{' ...' if len(missing) > 20 else ''}")
+    return not missing
+
+def _usernames_from(args) -> list:
+    usernames = list(args.usernames)
+    if args.file:
+        f = _open(args.file, "r")
+        try:
+            usernames.extend(line.strip() for line in f if line.strip())
+        finally:
+            if f is not sys.stdin:
+                f.close()
+    return usernames
+
 def delete_user(db_session, username):
     """Deletes a user from the database."""
     user = crud.get_user_by_username(db_session, username=username)
@@ -69,11 +262,28 @@ def main():
 
     # List users command
     parser_list = subparsers.add_parser("list", help="List all users")
+    parser_list.add_argument("--format", choices=["text", "csv", "jsonl"], default="text")
 
     # Delete user command
     parser_delete = subparsers.add_parser("delete", help="Delete a user")
     parser_delete.add_argument("username", help="Username of the user to delete")
 
+    # Bulk commands
+    parser_import = subparsers.add_parser("import", help="Create users from a CSV or JSON Lines file")
+    parser_import.add_argument("path", help="File to read ('-' for stdin)")
+    parser_import.add_argument("--format", choices=["csv", "jsonl"], help="Default: from the file extension")
+    parser_import.add_argument("--workers", type=int, help="Password hashing processes (default: CPU count)")
+
+    parser_export = subparsers.add_parser("export", help="Write all users to a CSV or JSON Lines file")
+    parser_export.add_argument("path", help="File to write ('-' for stdout)")
+    parser_export.add_argument("--format", choices=["csv", "jsonl"], help="Default: from the file extension")
+    parser_export.add_argument("--with-hashes", action="store_true", help="Include password hashes (for importing elsewhere)")
+
+    for command, help_text in (("deactivate", "Deactivate users"), ("activate", "Reactivate users")):
+        parser_active = subparsers.add_parser(command, help=help_text)
+        parser_active.add_argument("usernames", nargs="*", help="Usernames")
+        parser_active.add_argument("--file", help="File with one username per line ('-' for stdin)")
+
     args = parser.parse_args()
 
     db = SessionLocal()
@@ -88,9 +298,21 @@ def main():
             else:
                 add_user(db, args.username, password)
         elif args.command == "list":
-            list_users(db)
+            list_users(db, args.format)
         elif args.command == "delete":
             delete_user(db, args.username)
+        elif args.command == "import":
+            if not import_users(db, args.path, args.format, args.workers):
+                sys.exit(1)
+        elif args.command == "export":
+            export_users(db, args.path, args.format, args.with_hashes)
+        elif args.command in ("deactivate", "activate"):
+            usernames = _usernames_from(args)
+            if not usernames:
+                print("Error: No usernames given.")
+                sys.exit(1)
+            if not set_users_active(db, usernames, active=args.command == "activate"):
+                sys.exit(1)
         else:
             parser.print_help()
     finally:
@@ -0,0 +1,88 @@
+"""
+Writes .gz (and .br, if the `brotli` package is installed) siblings next to the
+compressible files of the frontend build, so the server never compresses static
+files per request. Run after `npm run build`; files that are already up to date
+are skipped.
+
+Usage: python scripts/precompress_static.py [--dist ../frontend/dist]
+"""
+import argparse
+import gzip
+import os
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULT_DIST = Path(__file__).resolve().parents[2] / "frontend" / "dist"
+COMPRESSIBLE = {".html", ".js", ".mjs", ".css", ".json", ".webmanifest", ".svg", ".txt", ".xml", ".map", ".wasm"}
+MIN_SIZE = 1024 # Smaller files don't gain enough to be worth a second request path
+
+
+def _up_to_date(source: Path, target: Path) -> bool:
+    return target.exists() and target.stat().st_mtime >= source.stat().st_mtime
+
+
+def _write(source: Path, target: Path, data: bytes, original_size: int) -> bool:
+    if len(data) >= original_size:
+        return False # Compression didn't help; let the server send the original
+    target.write_bytes(data)
+    os.utime(target, (source.stat().st_atime, source.stat().st_mtime))
+    return True
+
+
+def precompress(dist: Path) -> dict:
+    stats = {"files": 0, "gzip": 0, "br": 0, "skipped": 0, "bytes_in": 0, "bytes_gzip": 0, "bytes_br": 0}
+    for root, _, files in os.walk(dist):
+        for name in files:
+            source = Path(root) / name
+            if source.suffix.lower() not in COMPRESSIBLE or source.stat().st_size < MIN_SIZE:
+                continue
+            stats["files"] += 1
+            raw = None
+            size = source.stat().st_size
+            stats["bytes_in"] += size
+
+            gz_path = Path(f"{source}.gz")
+            if _up_to_date(source, gz_path):
+                stats["skipped"] += 1
+            else:
+                raw = source.read_bytes()
+                if _write(source, gz_path, gzip.compress(raw, compresslevel=9, mtime=0), size):
+                    stats["gzip"] += 1
+            if gz_path.exists():
+                stats["bytes_gzip"] += gz_path.stat().st_size
+
+            if brotli is None:
+                continue
+            br_path = Path(f"{source}.br")
+            if not _up_to_date(source, br_path):
+                raw = raw if raw is not None else source.read_bytes()
+                if _write(source, br_path, brotli.compress(raw, quality=11), size):
+                    stats["br"] += 1
+            if br_path.exists():
+                stats["bytes_br"] += br_path.stat().st_size
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompress the frontend build for static serving.")
+    parser.add_argument("--dist", type=Path, default=DEFAULT_DIST, help=f"Frontend build directory (default: {DEFAULT_DIST})")
+    args = parser.parse_args()
+
+    if not args.dist.is_dir():
+        parser.error(f"{args.dist} does not exist; build the frontend first (npm run build)")
+
+    stats = precompress(args.dist)
+    print(f"{stats['files']} compressible files, {stats['bytes_in'] / 1024:.0f} KiB")
+    print(f"gzip: wrote {stats['gzip']}, total {stats['bytes_gzip'] / 1024:.0f} KiB")
+    if brotli is None:
+        print("brotli: not installed (pip install brotli), skipped")
+    else:
+        print(f"brotli: wrote {stats['br']}, total {stats['bytes_br'] / 1024:.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Simulates a lagging read replica of a local SQLite database, for trying out replica
+routing (DATABASE_REPLICA_URLS) without a real replicated setup.
+
+Every --interval seconds the primary is snapshotted, and each snapshot is copied over the
+replica file --lag seconds after it was taken, so the replica always shows the primary as
+it was between `lag` and `lag + interval` seconds ago.
+
+Usage (from the project root, where run.py keeps grocery_app.db; in two terminals):
+    python backend/scripts/simulate_replica_lag.py --primary grocery_app.db --replica replica.db --lag 2
+    DATABASE_REPLICA_URLS=sqlite:///./replica.db python run.py
+
+Then e.g. tick an item and reload: the write and reads in the same request use the primary,
+while GET /api/v1/items/?list_id=... shows the old state until the lag has passed.
+"""
+import argparse
+import collections
+import sqlite3
+import time
+from pathlib import Path
+
+
+def snapshot(primary: Path) -> sqlite3.Connection:
+    """Consistent in-memory copy of the primary (the backup API reads it in one transaction)."""
+    source = sqlite3.connect(f"file:{primary}?mode=ro", uri=True)
+    copy = sqlite3.connect(":memory:", check_same_thread=False)
+    try:
+        source.backup(copy)
+    finally:
+        source.close()
+    return copy
+
+
+def publish(copy: sqlite3.Connection, replica: Path):
+    """Overwrites the replica with a snapshot; readers see either the old or the new state."""
+    target = sqlite3.connect(replica, timeout=30)
+    try:
+        copy.backup(target, sleep=0.05)
+    finally:
+        target.close()
+        copy.close()
+
+
+def run(primary: Path, replica: Path, lag: float, interval: float):
+    if not primary.exists():
+        raise SystemExit(f"Primary database {primary} not found (start the app once to create it).")
+    pending = collections.deque() # (time to publish, snapshot), oldest first
+    publish(snapshot(primary), replica) # Replica starts out in sync
+    print(f"Replicating {primary} -> {replica} with {lag}s lag (snapshot every {interval}s). Ctrl+C to stop.")
+    next_snapshot = time.monotonic()
+    while True:
+        now = time.monotonic()
+        if now >= next_snapshot:
+            pending.append((now + lag, snapshot(primary)))
+            next_snapshot = now + interval
+        while pending and pending[0][0] <= now:
+            publish(pending.popleft()[1], replica)
+        due = [next_snapshot] + ([pending[0][0]] if pending else [])
+        time.sleep(max(0.0, min(due) - time.monotonic()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep a SQLite replica of a database, lagging behind it.")
+    parser.add_argument("--primary", type=Path, default=Path("grocery_app.db"))
+    parser.add_argument("--replica", type=Path, default=Path("replica.db"))
+    parser.add_argument("--lag", type=float, default=2.0, help="Seconds the replica lags behind the primary")
+    parser.add_argument("--interval", type=float, default=0.5, help="Seconds between snapshots of the primary")
+    args = parser.parse_args()
+    try:
+        run(args.primary, args.replica, args.lag, args.interval)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
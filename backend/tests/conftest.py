@@ -0,0 +1,56 @@
+"""
+Shared fixtures. The app reads its settings at import time, so the environment is set up
+here before anything from `app` is imported: a throwaway SQLite database, no rate limits
+and no background workers (their polling would count against query budgets).
+"""
+import os
+import sys
+import tempfile
+
+_tmp_dir = tempfile.mkdtemp(prefix="grocery-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp_dir}/test.db"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["BACKGROUND_WORKERS"] = "0"
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import profiler
+from app.database import engine
+from app.main import app
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client: # Runs the lifespan (migrations)
+        yield test_client
+
+@pytest.fixture(scope="session")
+def dataset(client):
+    """A few users sharing lists with several categories and items (see benchmarks/seed.py)."""
+    import seed
+    return seed.seed(users=4, lists_per_user=1, members_per_list=3, categories_per_list=4, items_per_category=5)
+
+@pytest.fixture(scope="session")
+def owner_list(dataset):
+    return dataset["lists"][0]
+
+@pytest.fixture(scope="session")
+def auth_headers(client, dataset, owner_list):
+    response = client.post("/api/v1/login/token", data={"username": owner_list["owner"], "password": dataset["password"]})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+@pytest.fixture
+def query_budget():
+    """
+    `profiler.query_budget`, with the profiler listeners installed on the engine:
+
+        with query_budget(4):
+            client.get("/api/v1/items/?list_id=1", headers=auth_headers)
+    """
+    profiler.install_profiler(engine)
+    return profiler.query_budget
@@ -0,0 +1,28 @@
+"""
+Query budgets of the read endpoints. The counts don't depend on how many lists, categories
+or items there are; a failure prints the statements, usually an N+1 to fix.
+"""
+
+def test_read_lists(client, auth_headers, query_budget):
+    with query_budget(3, allow_duplicates=False):
+        response = client.get("/api/v1/lists/", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()
+
+def test_read_list(client, auth_headers, owner_list, query_budget):
+    # User, access check, list with owner, then members and their users (selectin loads)
+    with query_budget(6, allow_duplicates=False):
+        response = client.get(f"/api/v1/lists/{owner_list['id']}", headers=auth_headers)
+    assert response.status_code == 200
+
+def test_read_categories(client, auth_headers, owner_list, query_budget):
+    with query_budget(3, allow_duplicates=False):
+        response = client.get(f"/api/v1/lists/{owner_list['id']}/categories/", headers=auth_headers)
+    assert response.status_code == 200
+    assert len(response.json()["categories"]) == len(owner_list["category_ids"])
+
+def test_read_items(client, auth_headers, owner_list, query_budget):
+    with query_budget(3, allow_duplicates=False):
+        response = client.get(f"/api/v1/items/?list_id={owner_list['id']}", headers=auth_headers)
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == len(owner_list["item_ids"])
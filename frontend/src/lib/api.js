@@ -1,6 +1,17 @@
 // src/lib/api.js
 import apiClient from '../services/apiClient'; // Import the configured Axios instance
 
+// Thrown for 409 responses, e.g. to conditional updates (If-Match) of a row that changed meanwhile.
+// `current` is the server's copy of the row when the response includes it (null otherwise).
+export class ConflictError extends Error {
+    constructor(message, current = null) {
+        super(message);
+        this.name = 'ConflictError';
+        this.status = 409;
+        this.current = current;
+    }
+}
+
 // Axios handles JSON parsing and throws errors for non-2xx responses by default.
 // Adjust the error handling slightly.
 async function handleAxiosResponse(axiosPromise) {
@@ -15,8 +26,14 @@ async function handleAxiosResponse(axiosPromise) {
     } catch (error) {
         console.error('API Error (Axios):', error.response?.status, error.response?.data || error.message);
         // Extract detail message if available, otherwise use generic error message
-        const detail = error.response?.data?.detail || error.message || `HTTP error! status: ${error.response?.status}`;
-        throw new Error(detail);
+        const detail = error.response?.data?.detail;
+        // Some details are objects, e.g. { message, current } for edit conflicts
+        const message = (typeof detail === 'object' && detail !== null ? detail.message : detail)
+            || error.message || `HTTP error! status: ${error.response?.status}`;
+        if (error.response?.status === 409) {
+            throw new ConflictError(message, detail?.current ?? null);
+        }
+        throw new Error(message);
     }
 }
 
@@ -74,14 +91,77 @@ export async function addItem(payload) {
     return handleAxiosResponse(apiClient.post('/items/', payload));
 }
 
-export async function updateItem(itemId, payload) {
-    return handleAxiosResponse(apiClient.put(`/items/${itemId}`, payload));
+// Pass the item's `version` to update only if nobody changed it meanwhile (ConflictError otherwise)
+export async function updateItem(itemId, payload, version) {
+    const headers = version != null ? { 'If-Match': `"${version}"` } : {};
+    return handleAxiosResponse(apiClient.put(`/items/${itemId}`, payload, { headers }));
 }
 
 export async function deleteItem(itemId) {
     return handleAxiosResponse(apiClient.delete(`/items/${itemId}`));
 }
 
+// --- Offline Sync ---
+// Sends operations queued while offline in one request, e.g.
+//   { op_id: crypto.randomUUID(), type: 'add_item', data: { name: 'Milk', category_id: 3 } }
+// `id`/`category_id` may be the op_id of an earlier add op instead of a server id.
+// Pass the returned `version` as baseVersion next time; `categories`/`items` are only
+// included when someone else changed the list.
+export async function syncList(listId, baseVersion, operations) {
+    const payload = { base_version: baseVersion ?? null, operations };
+    return handleAxiosResponse(apiClient.post(`/lists/${listId}/sync/`, payload));
+}
+
+// --- Export/Import ---
+// format is 'ndjson' or 'csv'; exportList resolves to a Blob to offer as a download
+export async function exportList(listId, format = 'ndjson') {
+    return handleAxiosResponse(apiClient.get(`/lists/${listId}/export`, { params: { format }, responseType: 'blob' }));
+}
+
+// file: a File/Blob from an earlier export. Resolves to { categories_created, items_created, items_skipped, version }
+export async function importList(listId, file, format = 'ndjson') {
+    const headers = { 'Content-Type': format === 'csv' ? 'text/csv' : 'application/x-ndjson' };
+    return handleAxiosResponse(apiClient.post(`/lists/${listId}/import`, file, { params: { format }, headers }));
+}
+
+// --- Live Updates ---
+// Streams the list's change events (server-sent events) and calls onEvent(type, data), e.g.
+// ('changed', { version: 42 }); refetch (or syncList) on 'changed'. fetch is used instead of
+// EventSource so the Authorization header can be sent. Returns a function that stops the stream.
+// The stream ends after 'deleted', 'overflow' or 'shutdown', or if the connection drops; reconnect and resync.
+export function subscribeToListEvents(listId, onEvent, onClose) {
+    const controller = new AbortController();
+    const url = `${apiClient.defaults.baseURL}/lists/${listId}/events/`;
+    const headers = { Authorization: apiClient.defaults.headers.common['Authorization'] };
+
+    (async () => {
+        try {
+            const response = await fetch(url, { headers, signal: controller.signal });
+            if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+            const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+            let buffer = '';
+            for (;;) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += value;
+                let end;
+                while ((end = buffer.indexOf('\n\n')) !== -1) {
+                    const block = buffer.slice(0, end);
+                    buffer = buffer.slice(end + 2);
+                    const type = block.match(/^event: (.*)$/m)?.[1];
+                    const data = block.match(/^data: (.*)$/m)?.[1];
+                    if (type && data) onEvent(type, JSON.parse(data)); // Lines starting with ':' are keep-alives
+                }
+            }
+            onClose?.(null);
+        } catch (error) {
+            if (error.name !== 'AbortError') onClose?.(error);
+        }
+    })();
+
+    return () => controller.abort();
+}
+
 // --- Users ---
 export async function fetchCurrentUser() {
     return handleAxiosResponse(apiClient.get('/users/me'));
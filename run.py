@@ -1,7 +1,12 @@
-import uvicorn
+import argparse
+import logging
+import os
 import sys
+import time
 from pathlib import Path
 
+import uvicorn
+
 # --- Calculate project root and backend directory ---
 PROJECT_ROOT = Path(__file__).resolve().parent
 BACKEND_DIR = PROJECT_ROOT / "backend"
@@ -12,11 +17,13 @@ if str(BACKEND_DIR) not in sys.path:
     print(f"INFO: Added '{BACKEND_DIR}' to sys.path")
 # ---------------------------------------------------
 
-# --- Configuration ---
-HOST = "127.0.0.1"
-PORT = 8000
-LOG_LEVEL = "info"
-RELOAD = True
+# --- Configuration (overridable via environment or command line) ---
+HOST = os.getenv("HOST", "127.0.0.1")
+PORT = int(os.getenv("PORT", 8000))
+LOG_LEVEL = os.getenv("UVICORN_LOG_LEVEL", "info")
+WORKERS = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+# Seconds in-flight requests get to finish after SIGTERM before workers are killed
+GRACEFUL_SHUTDOWN_TIMEOUT = int(os.getenv("GRACEFUL_SHUTDOWN_TIMEOUT", 30))
 
 # --- App Location ---
 APP_LOCATION = "app.main:app"
@@ -24,24 +31,95 @@ APP_LOCATION = "app.main:app"
 # --- Reload Directories ---
 RELOAD_DIRS = [str(BACKEND_DIR)]
 
-if __name__ == "__main__":
+
+def _has_module(name: str) -> bool:
+    try:
+        __import__(name)
+        return True
+    except ImportError:
+        return False
+
+
+def run_development(args):
     print(f"--- Starting FastAPI Development Server ---")
     print(f"Project Root: {PROJECT_ROOT}")
     print(f"Watching for changes in: {BACKEND_DIR}")
     print(f"App location (relative to backend dir): {APP_LOCATION}")
-    print(f"URL: http://{HOST}:{PORT}")
-    print(f"Auto-Reload: {'Enabled' if RELOAD else 'Disabled'}")
-    print(f"Log Level: {LOG_LEVEL}")
+    print(f"URL: http://{args.host}:{args.port}")
+    print(f"Auto-Reload: Enabled")
+    print(f"Log Level: {args.log_level}")
     print(f"Current Working Directory: {Path.cwd()}")
     print("-" * 40)
 
     # Run the Uvicorn server programmatically
     uvicorn.run(
         APP_LOCATION,
-        host=HOST,
-        port=PORT,
-        log_level=LOG_LEVEL,
-        reload=RELOAD,
+        host=args.host,
+        port=args.port,
+        log_level=args.log_level,
+        reload=True,
         reload_dirs=RELOAD_DIRS,
-        # workers=1
-    )
\ No newline at end of file
+        app_dir=str(BACKEND_DIR),
+    )
+
+
+def run_production(args):
+    from app.core.log import setup_logging
+    setup_logging()
+    logger = logging.getLogger("run")
+    started = time.perf_counter()
+
+    # One-time database setup before forking, so workers don't race each other on create_all
+    from app.database import engine, init_db
+    try:
+        init_db()
+    except Exception: # Already logged with its traceback
+        logger.critical("Database migration failed; not starting any workers.")
+        sys.exit(1)
+    engine.dispose() # Workers open their own connections
+    os.environ["DB_INIT_ON_STARTUP"] = "false" # Inherited by the spawned workers
+    init_ms = (time.perf_counter() - started) * 1000
+
+    loop = "uvloop" if _has_module("uvloop") else "asyncio"
+    http = "httptools" if _has_module("httptools") else "h11"
+    logger.info(
+        "Starting %d worker(s) on http://%s:%d (loop=%s, http=%s); pre-fork database init took %.0f ms",
+        args.workers, args.host, args.port, loop, http, init_ms,
+    )
+
+    uvicorn.run(
+        APP_LOCATION,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop=loop,
+        http=http,
+        log_level=args.log_level,
+        access_log=args.access_log,
+        proxy_headers=True,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        app_dir=str(BACKEND_DIR),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Grocery List API.")
+    parser.add_argument("--prod", action="store_true", default=os.getenv("RUN_MODE") == "production",
+                        help="Production mode: multiple workers, no reload (or set RUN_MODE=production)")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Worker processes in production mode (default: CPU count)")
+    parser.add_argument("--log-level", default=LOG_LEVEL)
+    parser.add_argument("--graceful-timeout", type=int, default=GRACEFUL_SHUTDOWN_TIMEOUT)
+    parser.add_argument("--no-access-log", dest="access_log", action="store_false",
+                        help="Disable uvicorn's per-request access log (request metrics are available at /metrics)")
+    args = parser.parse_args()
+
+    if args.prod:
+        run_production(args)
+    else:
+        run_development(args)
+
+
+if __name__ == "__main__":
+    main()